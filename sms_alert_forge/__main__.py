@@ -7,34 +7,73 @@ progress monitor. The user can configure the simulation parameters through a YAM
 Modules:
 - producer: Contains the MessageProducer class responsible for generating and placing messages into a queue.
 - sender: Contains the MessageSender class responsible for sending messages from the queue to simulate SMS alerts.
+- async_sender: Contains the AsyncMessageSender class that runs many concurrent simulated sends on one asyncio event
+  loop.
+- pipeline: Builds the message queue, producer and senders from the configuration.
+- sharding: Contains the ShardedSenderPool class that splits the workload across worker processes and shares their
+  counters through shared memory.
+- bench: Throughput benchmark over a parameter grid with baseline regression checks.
+- sweep: Runs a parameter grid in parallel worker processes and tabulates every run's sms_report.
+- logpipeline: Queue-based logging pipeline that keeps handler I/O off the producer and sender threads.
+- simulation: Contains the DiscreteEventSimulation class that runs the same workload in virtual time.
 - progressmonitor: Contains the ProgressMonitor class that monitors and displays the progress of the message sending
   process.
+- profiling: Per-thread cProfile, stack sampling and per-phase span timers behind --profile.
+- shutdown: Drains a run on SIGINT or SIGTERM and checkpoints what is left unsent.
+- tracing: Per-message enqueue, dequeue and completion times in array columns, exported to CSV or Parquet.
 
 Usage:
 Run the main script with a specified configuration file:
 
     python main.py --config <config_file.yaml>
 
+Once installed (pip install .), the same entry point is available as the smsalertforge command. --headless runs
+without curses, the banner or the final keypress, and logs progress instead:
+
+    smsalertforge --config <config_file.yaml> --headless
+
+SIGINT or SIGTERM drains the queue for up to shutdown.drain_timeout seconds and writes the unsent messages and counters
+to shutdown.checkpoint_path; --resume continues from that checkpoint:
+
+    smsalertforge --config <config_file.yaml> --headless --resume
+
+Measure throughput over a parameter grid (see sms_alert_forge/bench.py):
+
+    python -m sms_alert_forge bench --config <config_file.yaml> --num-senders 1,4,16
+
+Run a parameter grid in parallel and write one row per run (see sms_alert_forge/sweep.py):
+
+    python -m sms_alert_forge sweep --config <config_file.yaml> --num-senders 1:64:x2 --output sweep.csv
+
+Profile a run, writing pstats, collapsed stacks and a per-phase breakdown to the given directory:
+
+    python -m sms_alert_forge --config <config_file.yaml> --profile profile [--profile-memory]
+
 """
 
-import curses
-import queue
+import time
+
+# Taken before the other imports, so time_to_first_message includes them
+STARTED = time.perf_counter()
+
 import sys
 import threading
 import logging
-import yaml
 import argparse
+import functools
 import os
 import signal
-import time
 from datetime import datetime
-from sms_alert_forge.producer import MessageProducer
-from sms_alert_forge.sender import MessageSender
+from sms_alert_forge.logpipeline import BufferedFileHandler, flush_logging, start_logging
+from sms_alert_forge.pipeline import build_pipeline
+from sms_alert_forge.queues import DurableQueue
 from sms_alert_forge.progressmonitor import ProgressMonitor
+from sms_alert_forge.queues import put_many
+from sms_alert_forge.shutdown import GracefulShutdown, read_checkpoint, save_checkpoint
 
+# Modules only some runs need (curses, yaml, the HTTP metrics exporters, worker processes, the discrete event
+# simulation and the profiler) are imported where they are used, to keep startup of short headless runs fast.
 log_dir = 'logs'
-os.makedirs(log_dir, exist_ok=True)
-log_file = os.path.join(log_dir, f'main_{time.strftime("%Y%m%d_%H%M%S")}.log')
 
 
 def read_config(config_file):
@@ -47,6 +86,8 @@ def read_config(config_file):
     Returns:
         dict: Configuration parameters.
     """
+    import yaml
+
     try:
         with open(config_file, 'r') as f:
             config = yaml.safe_load(f)
@@ -67,6 +108,9 @@ def setup_logging(config):
     """
     Set up logging based on the configuration.
 
+    Log calls only enqueue their records; a listener thread formats them and writes them to the console and file
+    handlers, so sender and producer threads never wait on handler locks or file I/O.
+
     Args:
         config (dict): Configuration parameters.
     """
@@ -84,29 +128,36 @@ def setup_logging(config):
     # Create formatter
     formatter = logging.Formatter('%(asctime)s - %(filename)s:%(lineno)d - %(levelname)s - %(message)s')
 
+    handlers = []
     # Add console handler if configured
     if config['logging'].get('to_console', False):
         console_handler = logging.StreamHandler()
         console_handler.setFormatter(formatter)
-        logger.addHandler(console_handler)
+        handlers.append(console_handler)
 
     # Add file handler if configured
     if config['logging'].get('to_file', False):
-        file_handler = logging.FileHandler(log_file_path)
+        os.makedirs(log_dir, exist_ok=True)
+        file_handler = BufferedFileHandler(log_file_path)
         file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
+        handlers.append(file_handler)
+
+    start_logging(handlers, rate_limit=config['logging'].get('rate_limit'))
 
 
-def signal_handler(signum, frame):
+def signal_handler(signum, frame, shutdown=None):
     """
     Handle signals to stop the application gracefully.
 
     Args:
         signum (int): Signal number.
         frame (frame): Current stack frame.
+        shutdown (GracefulShutdown): Drains the running pipeline; without one, the process exits at once.
     """
     logging.info(f"Received signal {signum}. Stopping gracefully.")
-    os._exit(0)
+    if shutdown is None:
+        os._exit(0)
+    shutdown.request()
 
 
 def display_fancy_text(stdscr):
@@ -139,68 +190,184 @@ def display_fancy_text(stdscr):
         logging.error(f"Error reading ASCII art file: {e}", exc_info=True)
 
 
-def main(stdscr, config):
+def run_pipeline(stdscr, config, profiler=None, started=None, resume=False):
+    """
+    Run the producer, senders and progress monitor threads (or worker processes) until every message is handled.
+
+    Args:
+        stdscr (curses.window): Curses window object, or None to run headless.
+        config (dict): Configuration parameters.
+        profiler (Profiler): Profiles the run's threads when given; its results are added to sms_report['profile'].
+        started (float): time.perf_counter() that startup_time and time_to_first_message are measured from; defaults
+            to the call of this function.
+        resume (bool): Whether to continue from the checkpoint of an interrupted run, if there is one.
+
+    Returns:
+        dict: The sms_report filled in by the progress monitor.
+    """
+    if started is None:
+        started = time.perf_counter()
+    stop_event = threading.Event()
+
+    num_processes = config['senders'].get('num_processes', 1)
+    shutdown_config = config.get('shutdown') or {}
+    checkpoint_path = shutdown_config.get('checkpoint_path', 'checkpoint.bin')
+    shard_pool = None
+    message_queue = None
+    retry_scheduler = None
+    autoscaler = None
+    backlog = []
+    previous = None
+    if num_processes > 1:
+        from sms_alert_forge.sharding import ShardedSenderPool
+        # Every worker process runs its own producer and senders, and keeps its own checkpoint; the monitor watches
+        # one view per worker
+        shard_pool = ShardedSenderPool(config, num_processes, resume=resume)
+        producer = None
+        senders = shard_pool.shards
+    else:
+        if resume:
+            if os.path.exists(checkpoint_path):
+                backlog, previous = read_checkpoint(checkpoint_path)
+                logging.info(f"Resuming from {checkpoint_path}: {len(backlog)} unsent messages queued again, "
+                             f"{previous['messages_produced']} messages already produced.")
+            else:
+                logging.warning(f"No checkpoint found at {checkpoint_path}. Starting from the beginning.")
+        message_queue, producer, senders, retry_scheduler, autoscaler = build_pipeline(
+            config, stop_event, produced=previous['messages_produced'] if previous else 0)
+
+    sms_report = {}
+    progress_monitor_config = {
+        'stdscr': stdscr,
+        'senders': senders,
+        'update_interval': config['progress_monitor']['update_interval'],
+        'refresh_interval': config['progress_monitor'].get('refresh_interval', 1.0),
+        'stop_event': stop_event,
+        'sms_report': sms_report,
+        'message_queue': message_queue,
+        'retry_scheduler': retry_scheduler,
+        'autoscaler': autoscaler,
+        'deduplicator': getattr(producer, 'deduplicator', None),
+    }
+    progress_monitor = ProgressMonitor(**progress_monitor_config)
+
+    exporters = []
+    if config.get('metrics'):
+        from sms_alert_forge.metrics import MetricsRegistry, pipeline_collector, start_exporters
+        registry = MetricsRegistry()
+        registry.register(pipeline_collector(senders, message_queue, producer, retry_scheduler))
+        exporters = start_exporters(config, registry)
+
+    shutdown = GracefulShutdown(stop_event, producer, senders, shutdown_config.get('drain_timeout', 10.0), shard_pool)
+    handler = functools.partial(signal_handler, shutdown=shutdown)
+    previous_handlers = {signum: signal.signal(signum, handler) for signum in (signal.SIGINT, signal.SIGTERM)}
+
+    if profiler:
+        if shard_pool:
+            logging.warning("Profiling only covers the threads of the main process, not the sender processes.")
+        for thread in (producer, retry_scheduler, autoscaler, progress_monitor):
+            if thread:
+                profiler.instrument(thread)
+        if not shard_pool:
+            for sender in senders:
+                profiler.instrument(sender)
+        if autoscaler:
+            sender_factory = autoscaler.sender_factory
+            autoscaler.sender_factory = lambda: profiler.instrument(sender_factory())
+        profiler.start()
+
+    for sender in senders:
+        sender.start()
+    if backlog:
+        # Queued before whichever thread ends the run is started, so it cannot see an empty run and finish early
+        put_many(message_queue, backlog)
+    if producer:
+        producer.start()
+    if retry_scheduler:
+        retry_scheduler.start()
+    if autoscaler:
+        autoscaler.start()
+    progress_monitor.start()
+    sms_report['startup_time'] = time.perf_counter() - started
+
+    if producer:
+        producer.join()
+    if retry_scheduler:
+        retry_scheduler.join()
+    if autoscaler:
+        autoscaler.join()
+    for sender in senders:
+        sender.join()
+
+    progress_monitor.join()
+    progress_monitor.stop()
+    first_sent = [sender.first_sent_at for sender in senders if getattr(sender, 'first_sent_at', None) is not None]
+    if first_sent:
+        sms_report['time_to_first_message'] = min(first_sent) - started
+    tracing_config = config.get('tracing') or {}
+    if tracing_config.get('enabled') and not shard_pool:
+        from sms_alert_forge.tracing import trace_report
+        sms_report['latency_breakdown'] = trace_report([sender.trace for sender in senders], tracing_config.get('path'))
+    if profiler:
+        sms_report['profile'] = profiler.stop()
+    for signum, previous_handler in previous_handlers.items():
+        signal.signal(signum, previous_handler)
+    if previous:
+        sms_report['resumed'] = previous
+    if shutdown.requested.is_set() and producer:
+        sms_report['checkpoint'] = save_checkpoint(checkpoint_path, message_queue, retry_scheduler, producer, senders,
+                                                   previous)
+        sms_report['checkpoint']['drained'] = not shutdown.timed_out
+    elif previous:
+        # The resumed run completed, so its checkpoint must not be resumed again
+        os.remove(checkpoint_path)
+    for exporter in exporters:
+        exporter.stop()
+    if shard_pool:
+        shard_pool.close()
+    if isinstance(message_queue, DurableQueue):
+        message_queue.close()
+    transport = getattr(senders[0], 'transport', None) if senders else None
+    if transport:
+        transport.close()
+    return sms_report
+
+
+def main(stdscr, config, profiler=None, started=None, resume=False):
     """
     Main function to run the SMS alert simulation.
 
+    With the 'simulated' sender engine the run is computed in virtual time by DiscreteEventSimulation instead of
+    starting any threads.
+
     Args:
         stdscr (curses.window): Curses window object.
         config (dict): Configuration parameters.
+        profiler (Profiler): Profiles the run's threads when given.
+        started (float): time.perf_counter() that the startup timings in sms_report are measured from.
+        resume (bool): Whether to continue from the checkpoint of an interrupted run.
     """
     try:
         if stdscr:
             stdscr.clear()
             # Display fancy text
             display_fancy_text(stdscr)
-            time.sleep(2)  # Sleep for 2 seconds to show the fancy text before starting the simulation
+            # Show the fancy text for up to 2 seconds before starting the simulation; any key skips it
+            stdscr.timeout(2000)
+            stdscr.getch()
+            stdscr.timeout(-1)
 
         logging.info("Main started.")
 
-        stop_event = threading.Event()
-
-        message_queue = queue.Queue()
-        num_senders = config.get('senders', {}).get('num_senders')
-
-        producer_config = {
-            'num_messages': config['messages']['num_messages'],
-            'message_queue': message_queue,
-            'stop_event': stop_event,
-            'num_senders': num_senders,
-        }
-        producer = MessageProducer(**producer_config)
-
-        sender_config = {
-            'message_queue': message_queue,
-            'failure_rate': config['senders']['failure_rate'],
-            'mean_processing_time': config['senders']['mean_processing_time'],
-            'stop_event': stop_event,
-        }
-        senders = [MessageSender(**sender_config) for _ in range(config['senders']['num_senders'])]
-
-        sms_report = {}
-        progress_monitor_config = {
-            'stdscr': stdscr,
-            'senders': senders,
-            'update_interval': config['progress_monitor']['update_interval'],
-            'stop_event': stop_event,
-            'sms_report': sms_report,
-        }
-        progress_monitor = ProgressMonitor(**progress_monitor_config)
-
-        signal.signal(signal.SIGINT, signal_handler)
-        signal.signal(signal.SIGTERM, signal_handler)
-
-        producer.start()
-        for sender in senders:
-            sender.start()
-        progress_monitor.start()
-
-        producer.join()
-        for sender in senders:
-            sender.join()
-
-        progress_monitor.join()
-        progress_monitor.stop()
+        if config['senders'].get('engine') == 'simulated':
+            from sms_alert_forge.simulation import DiscreteEventSimulation
+            sms_report = DiscreteEventSimulation.from_config(config).run()
+            if stdscr:
+                stdscr.clear()
+                for row, (key, value) in enumerate(sms_report.items()):
+                    stdscr.addstr(row, 0, f"{key}: {value}")
+        else:
+            sms_report = run_pipeline(stdscr, config, profiler, started, resume)
 
         if stdscr:
             # Display a message and wait for user input before exiting
@@ -213,23 +380,64 @@ def main(stdscr, config):
                     break
         logging.info(f'sms_report: {sms_report}')
         logging.info("Main completed.")
+        flush_logging()
         return sms_report
 
     except Exception as e:
         logging.error(f"Error in main: {e}", exc_info=True)
+        flush_logging()
         raise e
 
 
-if __name__ == "__main__":
+def cli(argv=None):
+    """
+    Command line entry point, installed as the smsalertforge command.
+
+    Args:
+        argv (list): Command line arguments; defaults to sys.argv[1:].
+
+    Returns:
+        int: Exit status.
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ['bench']:
+        from sms_alert_forge.bench import run_bench
+        return run_bench(argv[1:])
+    if argv[:1] == ['sweep']:
+        from sms_alert_forge.sweep import run_sweep_command
+        return run_sweep_command(argv[1:])
+
     parser = argparse.ArgumentParser(description='Simulate sending SMS alerts.')
     parser.add_argument('--config', default='config.yaml', help='Path to the configuration file in YAML format.')
+    parser.add_argument('--headless', action='store_true',
+                        help='Run without the curses display, logging progress instead.')
+    parser.add_argument('--resume', action='store_true',
+                        help='Continue from the checkpoint written when an earlier run was interrupted.')
+    parser.add_argument('--profile', nargs='?', const='profile', default=None, metavar='DIR',
+                        help='Profile the run and write the results to DIR (default: profile).')
+    parser.add_argument('--profile-memory', action='store_true',
+                        help='With --profile, also trace memory allocations with tracemalloc.')
 
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
 
     app_config = read_config(args.config)
 
     if not app_config:
         logging.error("Unable to read configurations. Exiting.")
+        return 1
+
+    setup_logging(app_config)  # Set up logging based on the configuration
+    app_profiler = None
+    if args.profile:
+        from sms_alert_forge.profiling import Profiler
+        app_profiler = Profiler(args.profile, memory=args.profile_memory)
+    if args.headless:
+        main(None, app_config, app_profiler, STARTED, args.resume)
     else:
-        setup_logging(app_config)  # Set up logging based on the configuration
-        curses.wrapper(main, app_config)
+        import curses
+        curses.wrapper(main, app_config, app_profiler, STARTED, args.resume)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(cli())
@@ -0,0 +1,124 @@
+import asyncio
+import logging
+import queue
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sms_alert_forge.histogram import ClassStats, LatencyHistogram
+from sms_alert_forge.queues import mark_done
+from sms_alert_forge.sender import sample_processing_time
+
+
+class AsyncMessageSender(threading.Thread):
+    """
+    Class responsible for simulating the sending of SMS messages with many concurrent sends on one asyncio event loop.
+
+    It uses the same failure and latency model as MessageSender and exposes the same counters, so ProgressMonitor can
+    watch it like any other sender. Failed messages are handed to the retry_scheduler, when there is one, as in
+    MessageSender.
+
+    Attributes:
+    - message_queue: The queue from which messages are retrieved for sending.
+    - failure_rate: The rate at which message sending can fail.
+    - mean_processing_time: The mean time taken to process a message.
+    - concurrency: Maximum number of sends in flight on the event loop.
+    - messages_sent: Number of messages successfully sent.
+    - messages_failed: Number of messages that failed to be sent.
+    - total_processing_time: Total time taken to process all messages.
+    - latency_histogram: Latencies of all sent and failed messages.
+    - class_stats: Counts and end-to-end latencies per priority class.
+    - stop_event: Event to signal the thread to stop gracefully.
+    - retry_scheduler: RetryScheduler that failed messages are handed to, or None to drop them.
+    - messages_retried: Number of failed attempts handed to the retry scheduler.
+    - retry_successes: Number of messages sent successfully after at least one retry.
+    """
+
+    def __init__(self, message_queue, failure_rate, mean_processing_time, stop_event, concurrency=1000,
+                 retry_scheduler=None):
+        super(AsyncMessageSender, self).__init__()
+        self.message_queue = message_queue
+        self.failure_rate = failure_rate
+        self.mean_processing_time = mean_processing_time
+        self.concurrency = max(1, concurrency)
+        self.messages_sent = 0
+        self.messages_failed = 0
+        self.total_processing_time = 0
+        self.latency_histogram = LatencyHistogram()
+        self.class_stats = ClassStats()
+        self.stop_event = stop_event
+        self.retry_scheduler = retry_scheduler
+        self.messages_retried = 0
+        self.retry_successes = 0
+
+    def run(self):
+        try:
+            logging.info("AsyncMessageSender started.")
+            asyncio.run(self._serve())
+            logging.info("AsyncMessageSender completed.")
+
+        except Exception as e:
+            logging.error(f"Error in AsyncMessageSender: {e}", exc_info=True)
+
+    async def _serve(self):
+        pending = asyncio.Queue(maxsize=self.concurrency)
+        workers = [asyncio.create_task(self._send_messages(pending)) for _ in range(self.concurrency)]
+        # A single helper thread does the blocking waits on the shared queue so the event loop never blocks.
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            await self._pump(pending, executor)
+
+        if self.stop_event.is_set():
+            for worker in workers:
+                worker.cancel()
+        else:
+            for _ in workers:
+                await pending.put(None)
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    async def _pump(self, pending, executor):
+        loop = asyncio.get_running_loop()
+        while not self.stop_event.is_set():
+            try:
+                message = self.message_queue.get_nowait()
+            except queue.Empty:
+                try:
+                    message = await loop.run_in_executor(executor, self.message_queue.get, True, 0.1)
+                except queue.Empty:
+                    continue
+
+            if message is None:
+                break  # No more messages to send
+
+            await pending.put(message)
+
+    async def _send_messages(self, pending):
+        while True:
+            message = await pending.get()
+            if message is None:
+                break
+
+            phone_number = message[0]
+
+            processing_time = sample_processing_time(self.mean_processing_time)
+            await asyncio.sleep(max(processing_time, 0))
+            self.latency_histogram.record(processing_time)
+
+            failed = random.random() < self.failure_rate
+            if failed and self.retry_scheduler is not None and self.retry_scheduler.schedule(message):
+                self.messages_retried += 1
+                logging.debug("Message to %s failed, retry scheduled", phone_number)
+            else:
+                self.class_stats.record(message, failed, time.monotonic())
+                if failed:
+                    self.messages_failed += 1
+                    logging.warning("Message sending failed.")
+                    logging.debug("Debug statement: Failed to send message to %s", phone_number)
+                else:
+                    self.messages_sent += 1
+                    self.total_processing_time += processing_time
+                    if getattr(message, 'attempts', 0):
+                        self.retry_successes += 1
+                    logging.debug("Message sent successfully to %s. Processing time: %s", phone_number,
+                                  processing_time)
+            mark_done(self.message_queue, (message,))
@@ -0,0 +1,168 @@
+import logging
+import math
+import threading
+import time
+from typing import NamedTuple
+
+POLICIES = ('littles', 'aimd')
+
+
+class ScaleEvent(NamedTuple):
+    """
+    A change of the number of active senders.
+    """
+    time: float
+    senders_before: int
+    senders_after: int
+    reason: str
+
+
+class SenderAutoscaler(threading.Thread):
+    """
+    Class responsible for growing and shrinking the sender pool with the load.
+
+    Every interval it measures the queue depth, the completion rate, the arrival rate (completions plus queue growth)
+    and the mean service time per message (sender busy time over messages handled), and sets the number of active
+    senders between min_senders and max_senders:
+
+    - 'littles': by Little's law, keeping up with an arrival rate λ at a service time W takes λW busy senders. The
+      pool is sized to serve the arrivals plus the backlog drained within latency_target, at the target utilization,
+      and shrinks by at most half per interval.
+    - 'aimd': additive increase, multiplicative decrease. The pool grows by increase senders while the estimated
+      latency (queue wait by Little's law plus service time) is above latency_target, and is multiplied by decrease
+      when the queue is empty and senders are busy less than the target utilization.
+
+    New senders are started with sender_factory and appended to senders; removed senders are retired and exit after
+    their current message. Because the pool size changes, the autoscaler rather than the producer or retry scheduler
+    puts the None sentinels on the queue, one per running sender, once upstream has finished and the queue is empty.
+
+    Attributes:
+    - message_queue: The queue the senders take messages from.
+    - senders: The sender list, shared with the progress monitor; senders are appended and never removed.
+    - sender_factory: Callable that returns a new, unstarted sender.
+    - stop_event: Event to signal the thread to stop gracefully.
+    - upstream: The thread that puts the last messages on the queue: the retry scheduler, or else the producer.
+    - min_senders: Lower bound of the number of active senders.
+    - max_senders: Upper bound of the number of active senders.
+    - policy: 'littles' or 'aimd'.
+    - interval: Time between scaling decisions in seconds.
+    - latency_target: Latency in seconds, queue wait included, that the pool is sized to meet.
+    - utilization: Target fraction of time each sender is busy.
+    - increase: Senders added per interval by 'aimd'.
+    - decrease: Factor applied to the pool by 'aimd' when shrinking.
+    - scale_events: Every change of the number of active senders, as ScaleEvent records.
+    - peak_senders: Largest number of active senders.
+    """
+
+    def __init__(self, message_queue, senders, sender_factory, stop_event, upstream, min_senders=1, max_senders=64,
+                 policy='littles', interval=0.5, latency_target=1.0, utilization=0.8, increase=1, decrease=0.5):
+        super(SenderAutoscaler, self).__init__()
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown autoscaling policy '{policy}'. Expected 'littles' or 'aimd'.")
+        self.message_queue = message_queue
+        self.senders = senders
+        self.sender_factory = sender_factory
+        self.stop_event = stop_event
+        self.upstream = upstream
+        self.min_senders = max(1, min_senders)
+        self.max_senders = max(self.min_senders, max_senders)
+        self.policy = policy
+        self.interval = interval
+        self.latency_target = latency_target
+        self.utilization = utilization
+        self.increase = max(1, increase)
+        self.decrease = decrease
+        self.scale_events = []
+        self.peak_senders = len(senders)
+        self._start_time = None
+        self._service_time = None
+
+    @property
+    def active_senders(self):
+        """
+        Senders that are running and not retired.
+        """
+        return [sender for sender in self.senders if sender.is_alive() and not sender.retired]
+
+    def run(self):
+        try:
+            logging.info(f"SenderAutoscaler started with policy '{self.policy}' and "
+                         f"{self.min_senders}-{self.max_senders} senders.")
+            self._start_time = time.monotonic()
+            last = self._measure()
+
+            while not self.stop_event.wait(self.interval):
+                if not self.upstream.is_alive() and self.message_queue.qsize() == 0:
+                    break
+                current = self._measure()
+                self._scale(last, current)
+                last = current
+
+            logging.info(f"SenderAutoscaler completed with {len(self.active_senders)} senders after "
+                         f"{len(self.scale_events)} scale events (peak {self.peak_senders}).")
+            # Signal that no more messages will be produced or retried. Retired senders waiting for a message need a
+            # sentinel too.
+            for sender in self.senders:
+                if sender.is_alive():
+                    self.message_queue.put(None)
+
+        except Exception as e:
+            logging.error(f"Error in SenderAutoscaler: {e}", exc_info=True)
+
+    def _measure(self):
+        completed = sum(sender.messages_sent + sender.messages_failed + sender.messages_retried
+                        for sender in self.senders)
+        busy_time = sum(sender.busy_time for sender in self.senders)
+        return time.monotonic(), completed, busy_time, self.message_queue.qsize()
+
+    def _scale(self, last, current):
+        elapsed = current[0] - last[0]
+        completed = current[1] - last[1]
+        busy_time = current[2] - last[2]
+        depth = current[3]
+        if elapsed <= 0:
+            return
+        if completed:
+            self._service_time = busy_time / completed
+        if self._service_time is None:
+            return  # Nothing to size the pool on until the first messages are handled
+
+        active = len(self.active_senders)
+        throughput = completed / elapsed
+        arrival_rate = max(0.0, throughput + (depth - last[3]) / elapsed)
+        # Little's law again: the mean wait in the queue is its depth divided by the completion rate
+        queue_wait = depth / throughput if throughput > 0 else (math.inf if depth else 0.0)
+        utilization = busy_time / (active * elapsed) if active else 1.0
+
+        if self.policy == 'littles':
+            demand = arrival_rate + depth / self.latency_target
+            target = math.ceil(demand * self._service_time / self.utilization)
+            target = max(target, active // 2)
+        elif queue_wait + self._service_time > self.latency_target:
+            target = active + self.increase
+        elif depth == 0 and utilization < self.utilization:
+            target = math.floor(active * self.decrease)
+        else:
+            target = active
+        target = min(max(target, self.min_senders), self.max_senders)
+
+        if target != active:
+            reason = (f"queue {depth}, arrivals {arrival_rate:.1f}/s, service {self._service_time * 1000:.1f}ms, "
+                      f"queue wait {queue_wait:.3f}s, utilization {utilization:.0%}")
+            self._resize(active, target, reason)
+
+    def _resize(self, active, target, reason):
+        if target > active:
+            for _ in range(target - active):
+                sender = self.sender_factory()
+                self.senders.append(sender)
+                sender.start()
+        else:
+            # Retire the newest senders first
+            for sender in self.active_senders[target - active:]:
+                sender.retire()
+
+        event = ScaleEvent(time.monotonic() - self._start_time, active, target, reason)
+        self.scale_events.append(event)
+        self.peak_senders = max(self.peak_senders, target)
+        logging.info(f"Scaled senders from {active} to {target} ({reason}).")
@@ -0,0 +1,272 @@
+"""
+Throughput benchmark for SMSAlertForge.
+
+Runs the simulation once per point of a parameter grid, each run in a fresh worker process so that peak RSS and CPU
+time belong to that run alone, and writes the measurements as JSON. When a baseline file is given, every point is
+compared with the matching baseline point and the exit status is 1 if any point regressed by more than the threshold.
+
+Usage:
+
+    python -m sms_alert_forge bench --config conf/config.yaml --num-senders 1,4,16 --engine thread,asyncio \\
+        --output bench.json --baseline baseline.json --threshold 0.1
+
+With --queue-memory, it instead measures the memory held by queued messages, as Message records and as columnar
+MessageBatch items:
+
+    python -m sms_alert_forge bench --queue-memory 1000000
+
+"""
+
+import argparse
+import copy
+import itertools
+import json
+import logging
+import multiprocessing
+import platform
+import queue
+import resource
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+# Command line option -> (config section, config key, value type)
+SWEEP_PARAMETERS = {
+    'num_senders': ('senders', 'num_senders', int),
+    'failure_rate': ('senders', 'failure_rate', float),
+    'mean_processing_time': ('senders', 'mean_processing_time', float),
+    'engine': ('senders', 'engine', str),
+    'high_watermark': ('queue', 'high_watermark', int),
+}
+
+
+def expand_grid(base_config, grid, parameters=None):
+    """
+    Build one configuration per combination of the swept parameter values.
+
+    Args:
+        base_config (dict): Configuration the swept values are applied to.
+        grid (dict): Swept values keyed by parameter name, each mapping to a (section, key) pair in the configuration.
+        parameters (dict): (section, key, value type) per parameter name; defaults to SWEEP_PARAMETERS.
+
+    Returns:
+        list: (parameters, config) tuples, where parameters maps each swept parameter name to its value.
+    """
+    locations = SWEEP_PARAMETERS if parameters is None else parameters
+    names = [name for name in grid if grid[name]]
+    points = []
+    for values in itertools.product(*(grid[name] for name in names)):
+        point = dict(zip(names, values))
+        config = copy.deepcopy(base_config)
+        for name, value in point.items():
+            section, key = locations[name][:2]
+            config.setdefault(section, {})
+            config[section][key] = value
+        points.append((point, config))
+    return points
+
+
+def run_point(config):
+    """
+    Run the simulation once in the current process and measure it.
+
+    Args:
+        config (dict): Configuration parameters.
+
+    Returns:
+        dict: The run's sms_report merged with throughput, CPU and memory measurements.
+    """
+    from sms_alert_forge.__main__ import main
+
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    sms_report = main(None, config)
+    wall_time = time.perf_counter() - wall_start
+    cpu_time = time.process_time() - cpu_start
+
+    messages = sms_report.get('messages_sent', 0) + sms_report.get('messages_failed', 0)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    cpu_time += children.ru_utime + children.ru_stime
+    result = dict(sms_report)
+    result.update({
+        'wall_time': wall_time,
+        'messages_per_second': messages / wall_time if wall_time > 0 else 0,
+        'cpu_per_message': cpu_time / messages if messages else 0,
+        # ru_maxrss is reported in kilobytes on Linux
+        'peak_rss_kb': max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, children.ru_maxrss),
+    })
+    return result
+
+
+def measure_queue_memory(num_messages, columnar, batch_size=1000):
+    """
+    Measure the memory held by generated messages waiting on a queue.Queue.
+
+    Args:
+        num_messages (int): Number of messages to enqueue.
+        columnar (bool): Whether to enqueue MessageBatch items instead of one Message per message.
+        batch_size (int): Number of messages generated at a time, as the producer's batch_size.
+
+    Returns:
+        int: Bytes allocated and still held once every message is queued.
+    """
+    from sms_alert_forge.producer import generate_batches, generate_messages
+    from sms_alert_forge.queues import put_many
+
+    message_queue = queue.Queue()
+    tracemalloc.start()
+    try:
+        for start in range(0, num_messages, batch_size):
+            count = min(batch_size, num_messages - start)
+            put_many(message_queue, generate_batches(count) if columnar else generate_messages(count))
+        return tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+
+def _run_isolated(config, connection):
+    try:
+        connection.send(run_point(config))
+    except Exception as e:
+        connection.send({'error': str(e)})
+    finally:
+        connection.close()
+
+
+def run_isolated(config):
+    """
+    Run one benchmark point in a fresh worker process.
+
+    Args:
+        config (dict): Configuration parameters.
+
+    Returns:
+        dict: The measurements returned by run_point, or {'error': ...} if the run failed.
+    """
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    process = multiprocessing.Process(target=_run_isolated, args=(config, sender))
+    process.start()
+    sender.close()
+    try:
+        result = receiver.recv()
+    except EOFError:
+        result = {'error': f"benchmark process exited with code {process.exitcode}"}
+    process.join()
+    return result
+
+
+def compare(results, baseline, threshold):
+    """
+    Compare benchmark results with a baseline.
+
+    A point regresses when its throughput dropped, or its CPU time per message grew, by more than the threshold.
+
+    Args:
+        results (list): Result entries with 'parameters' and 'metrics'.
+        baseline (list): Baseline entries in the same format.
+        threshold (float): Allowed relative change, e.g. 0.1 for 10%.
+
+    Returns:
+        list: Human-readable descriptions of the regressions found.
+    """
+    baseline_metrics = {json.dumps(entry['parameters'], sort_keys=True): entry['metrics'] for entry in baseline}
+    regressions = []
+    for entry in results:
+        reference = baseline_metrics.get(json.dumps(entry['parameters'], sort_keys=True))
+        if not reference or 'error' in reference or 'error' in entry['metrics']:
+            continue
+        metrics = entry['metrics']
+        if metrics['messages_per_second'] < reference['messages_per_second'] * (1 - threshold):
+            regressions.append(f"{entry['parameters']}: messages/s {reference['messages_per_second']:.1f} -> "
+                               f"{metrics['messages_per_second']:.1f}")
+        if metrics['cpu_per_message'] > reference['cpu_per_message'] * (1 + threshold):
+            regressions.append(f"{entry['parameters']}: CPU/message {reference['cpu_per_message'] * 1e6:.1f}us -> "
+                               f"{metrics['cpu_per_message'] * 1e6:.1f}us")
+    return regressions
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog='python -m sms_alert_forge bench',
+                                     description='Measure SMSAlertForge throughput over a parameter grid.')
+    parser.add_argument('--config', default='conf/config.yaml', help='Base configuration file in YAML format.')
+    parser.add_argument('--num-messages', type=int, help='Messages per run, overriding the configuration.')
+    for name, (_, _, value_type) in SWEEP_PARAMETERS.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", dest=name,
+                            type=lambda text, value_type=value_type: [value_type(value) for value in text.split(',')],
+                            help=f"Comma-separated {name} values to sweep.")
+    parser.add_argument('--queue-memory', type=int, metavar='NUM_MESSAGES',
+                        help='Measure the memory held by this many queued messages instead of running the grid.')
+    parser.add_argument('--output', default='bench.json', help='File the JSON results are written to.')
+    parser.add_argument('--baseline', help='JSON results of an earlier run to compare against.')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='Relative change treated as a regression (default 0.1).')
+    return parser.parse_args(argv)
+
+
+def run_bench(argv):
+    """
+    Entry point of the bench command.
+
+    Args:
+        argv (list): Command line arguments after 'bench'.
+
+    Returns:
+        int: Exit status, 1 when a regression against the baseline was found.
+    """
+    from sms_alert_forge.__main__ import read_config, setup_logging
+
+    args = parse_args(argv)
+    if args.queue_memory:
+        for columnar in (False, True):
+            held = measure_queue_memory(args.queue_memory, columnar)
+            per_message = held / args.queue_memory
+            print(f"{'MessageBatch' if columnar else 'Message'}: {per_message:.1f} bytes per message, "
+                  f"{per_message * 1000000 / (1 << 20):.1f} MiB per million queued messages")
+        return 0
+
+    base_config = read_config(args.config)
+    if args.num_messages is not None:
+        base_config['messages']['num_messages'] = args.num_messages
+    setup_logging(base_config)
+
+    grid = {name: getattr(args, name) for name in SWEEP_PARAMETERS}
+    results = []
+    for parameters, config in expand_grid(base_config, grid):
+        logging.info(f"Benchmarking {parameters}")
+        metrics = run_isolated(config)
+        results.append({'parameters': parameters, 'metrics': metrics})
+        if 'error' in metrics:
+            print(f"{parameters}: failed: {metrics['error']}")
+        else:
+            print(f"{parameters}: {metrics['messages_per_second']:.1f} messages/s, "
+                  f"{metrics['cpu_per_message'] * 1e6:.1f}us CPU/message, {metrics['peak_rss_kb']} KB peak RSS, "
+                  f"{metrics.get('mean_queue_wait', 0) * 1000:.2f}ms mean queue wait")
+
+    with open(args.output, 'w') as f:
+        json.dump({
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'num_messages': base_config['messages']['num_messages'],
+            'results': results,
+        }, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)['results']
+        baseline_points = {json.dumps(entry['parameters'], sort_keys=True) for entry in baseline}
+        unmatched = [entry['parameters'] for entry in results
+                     if json.dumps(entry['parameters'], sort_keys=True) not in baseline_points]
+        for parameters in unmatched:
+            print(f"{parameters}: no matching point in {args.baseline}")
+        regressions = compare(results, baseline, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.threshold:.0%} against {args.baseline}.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(run_bench(sys.argv[1:]))
@@ -0,0 +1,235 @@
+import collections
+import hashlib
+import math
+import time
+
+from sms_alert_forge.messages import MessageBatch
+
+MODES = ('exact', 'bloom')
+
+
+def message_digest(phone_number, body):
+    """
+    Hash a message's destination and content.
+
+    Args:
+        phone_number (int): Recipient phone number.
+        body (str or bytes): Message text, or its UTF-8 encoding.
+
+    Returns:
+        tuple: Two independent 64-bit hashes of (phone_number, body).
+    """
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    digest = hashlib.blake2b(b'%s\0%s' % (str(phone_number).encode('ascii'), body), digest_size=16).digest()
+    return int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little')
+
+
+class TtlCache:
+    """
+    Exact set of recently seen keys, each remembered for window seconds after it was first seen.
+
+    Keys are kept in an OrderedDict in the order they were first seen, which is also the order they expire in, so
+    expired keys are dropped from the front as later lookups pass. When max_entries keys are remembered, the oldest is
+    dropped early.
+
+    Attributes:
+    - window: Time in seconds a key is remembered.
+    - max_entries: Maximum number of keys remembered.
+    """
+
+    def __init__(self, window, max_entries=1000000):
+        self.window = window
+        self.max_entries = max(1, max_entries)
+        self._seen = collections.OrderedDict()
+
+    def check_and_add(self, key, now):
+        """
+        Return whether key was seen within the window, and remember it if it was not.
+        """
+        seen = self._seen
+        while seen:
+            oldest, first_seen = next(iter(seen.items()))
+            if now - first_seen < self.window:
+                break
+            del seen[oldest]
+        if key in seen:
+            return True
+        if len(seen) >= self.max_entries:
+            seen.popitem(last=False)
+        seen[key] = now
+        return False
+
+    @property
+    def memory(self):
+        """
+        Approximate memory taken by the remembered keys, in bytes.
+        """
+        # Key int, timestamp float and the OrderedDict entry with its linked-list node
+        return len(self._seen) * (36 + 24 + 100)
+
+
+class WindowedBloomFilter:
+    """
+    Approximate set of recently seen keys in constant memory.
+
+    Two Bloom filters of the same size take turns: keys are added to the current one, looked up in both, and every
+    window the current one becomes the previous one and an empty one takes its place. A key is therefore always
+    remembered for at least window seconds and at most twice that. A key that was never seen is reported as seen with
+    probability error_rate as long as no more than capacity keys are added per window. The bit positions of a key are
+    derived from its two hashes by double hashing.
+
+    Attributes:
+    - window: Minimum time in seconds a key is remembered.
+    - capacity: Number of keys per window the filters are sized for.
+    - error_rate: False positive rate at capacity.
+    - num_bits: Size of each filter in bits.
+    - num_hashes: Number of bits set per key.
+    """
+
+    def __init__(self, window, capacity=100000, error_rate=0.001):
+        self.window = window
+        self.capacity = max(1, capacity)
+        self.error_rate = error_rate
+        self.num_bits = max(64, math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / self.capacity * math.log(2)))
+        self._current = bytearray((self.num_bits + 7) // 8)
+        self._previous = bytearray(len(self._current))
+        self._rotated_at = None
+
+    def check_and_add(self, key, now):
+        """
+        Return whether key, a pair of 64-bit hashes, was probably seen within the window, and add it if it was not.
+        """
+        if self._rotated_at is None:
+            self._rotated_at = now
+        elif now - self._rotated_at >= self.window:
+            # After two windows without a rotation, the current filter is too old to keep as the previous one
+            fresh = now - self._rotated_at < 2 * self.window
+            self._previous = self._current if fresh else bytearray(len(self._current))
+            self._current = bytearray(len(self._previous))
+            self._rotated_at = now
+
+        h1, h2 = key
+        positions = [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+        current, previous = self._current, self._previous
+        if (all(current[p >> 3] & (1 << (p & 7)) for p in positions)
+                or all(previous[p >> 3] & (1 << (p & 7)) for p in positions)):
+            return True
+        for p in positions:
+            current[p >> 3] |= 1 << (p & 7)
+        return False
+
+    @property
+    def memory(self):
+        """
+        Memory taken by the two filters, in bytes.
+        """
+        return 2 * len(self._current)
+
+
+class Deduplicator:
+    """
+    Class responsible for dropping repeated alerts: messages with the same phone number and body as one accepted
+    within the last window seconds.
+
+    Producers pass every generated batch through filter() before it is queued. Only the first copy of an alert is
+    kept and a copy arriving during the window does not extend it, so during a long alert storm the alert still goes
+    out once per window. In 'exact' mode, recently seen messages are kept in a TtlCache; in 'bloom' mode, in a
+    WindowedBloomFilter of constant size, which occasionally drops a message that is not a duplicate.
+
+    Attributes:
+    - window: Time in seconds within which a repeated message is dropped.
+    - mode: 'exact' or 'bloom'.
+    - lookups: Number of messages checked.
+    - suppressed: Number of messages dropped as duplicates.
+    - lookup_time: Total time spent checking messages, in seconds.
+    """
+
+    def __init__(self, window=60.0, mode='exact', max_entries=1000000, capacity=100000, error_rate=0.001):
+        if mode not in MODES:
+            raise ValueError(f"Unknown dedup mode '{mode}'. Expected 'exact' or 'bloom'.")
+        self.window = window
+        self.mode = mode
+        if mode == 'exact':
+            self._seen = TtlCache(window, max_entries)
+        else:
+            self._seen = WindowedBloomFilter(window, capacity, error_rate)
+        self.lookups = 0
+        self.suppressed = 0
+        self.lookup_time = 0.0
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Create a deduplicator from the 'dedup' section of the configuration.
+
+        Args:
+            config (dict): Configuration parameters.
+
+        Returns:
+            Deduplicator: The deduplicator, or None when deduplication is not enabled.
+        """
+        dedup_config = config.get('dedup') or {}
+        if not dedup_config.get('enabled'):
+            return None
+        return cls(window=dedup_config.get('window', 60.0), mode=dedup_config.get('mode', 'exact'),
+                   max_entries=dedup_config.get('max_entries', 1000000),
+                   capacity=dedup_config.get('capacity', 100000), error_rate=dedup_config.get('error_rate', 0.001))
+
+    def filter(self, items):
+        """
+        Drop the messages that repeat one accepted within the window.
+
+        Args:
+            items (list): Messages and MessageBatch items, as put on the queue by a producer.
+
+        Returns:
+            list: The items without the duplicates; MessageBatch items are rebuilt with the remaining messages.
+        """
+        start = time.perf_counter()
+        now = time.monotonic()
+        exact = self.mode == 'exact'
+        kept = []
+        checked = dropped = 0
+        for item in items:
+            if isinstance(item, MessageBatch):
+                indexes = []
+                for index in range(len(item)):
+                    digest = message_digest(item.phone_numbers[index], item.body(index))
+                    if not self._seen.check_and_add(digest[0] if exact else digest, now):
+                        indexes.append(index)
+                checked += len(item)
+                dropped += len(item) - len(indexes)
+                if len(indexes) == len(item):
+                    kept.append(item)
+                elif indexes:
+                    kept.append(item.select(indexes))
+            else:
+                digest = message_digest(item[0], item[1])
+                checked += 1
+                if self._seen.check_and_add(digest[0] if exact else digest, now):
+                    dropped += 1
+                else:
+                    kept.append(item)
+
+        self.lookups += checked
+        self.suppressed += dropped
+        self.lookup_time += time.perf_counter() - start
+        return kept
+
+    def stats(self):
+        """
+        Return the deduplication measurements for sms_report.
+
+        Returns:
+            dict: Measurements keyed by name.
+        """
+        return {
+            'mode': self.mode,
+            'lookups': self.lookups,
+            'suppressed': self.suppressed,
+            'suppression_rate': self.suppressed / self.lookups if self.lookups else 0,
+            'mean_lookup_time': self.lookup_time / self.lookups if self.lookups else 0,
+            'memory': self._seen.memory,
+        }
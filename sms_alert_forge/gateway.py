@@ -0,0 +1,108 @@
+import json
+import logging
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from sms_alert_forge.sender import sample_processing_time
+
+
+class _GatewayHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 keeps connections open between requests, as a real gateway would
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written separately; without TCP_NODELAY every response waits for a delayed ACK
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        gateway = self.server.gateway
+        try:
+            payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            messages = payload['messages']
+        except (ValueError, KeyError, TypeError):
+            self._respond(400, {'error': 'expected {"messages": [...]}'})
+            return
+
+        time.sleep(max(sample_processing_time(gateway.latency), 0))
+        if random.random() < gateway.http_error_rate:
+            self._respond(503, {'error': 'gateway unavailable'})
+            return
+        results = [random.random() >= gateway.error_rate for _ in messages]
+        with gateway.lock:
+            gateway.requests += 1
+            gateway.messages_received += len(messages)
+        self._respond(200, {'results': results})
+
+    def _respond(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logging.debug("Gateway: " + format, *args)
+
+
+class GatewayServer:
+    """
+    Class responsible for standing in for an SMS gateway, for tests and local runs of HttpTransport.
+
+    It accepts the requests HttpTransport sends on keep-alive connections, waits a latency drawn like the simulated
+    processing time, and accepts or rejects each message at random.
+
+    Attributes:
+    - host: Interface to listen on.
+    - port: Port to listen on; 0 picks a free port, see url.
+    - latency: Mean time taken to answer a request.
+    - error_rate: Rate at which single messages are rejected.
+    - http_error_rate: Rate at which whole requests are answered with 503 Service Unavailable.
+    - requests: Number of requests answered with 200.
+    - messages_received: Number of messages in those requests.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.01, error_rate=0.0, http_error_rate=0.0):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.error_rate = error_rate
+        self.http_error_rate = http_error_rate
+        self.requests = 0
+        self.messages_received = 0
+        self.lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self):
+        """
+        Endpoint to send messages to, available once the server is started.
+        """
+        return f"http://{self.host}:{self.port}/send"
+
+    def start(self):
+        """
+        Start serving in a background thread.
+
+        Returns:
+            GatewayServer: The server itself.
+        """
+        self._server = ThreadingHTTPServer((self.host, self.port), _GatewayHandler)
+        self._server.daemon_threads = True
+        self._server.gateway = self
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True)
+        self._thread.start()
+        logging.info(f"Local gateway listening on {self.url}.")
+        return self
+
+    def stop(self):
+        """
+        Stop serving and close the listening socket.
+        """
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = None
@@ -0,0 +1,190 @@
+import bisect
+import itertools
+import operator
+from array import array
+
+# Each power-of-two range of microseconds is split into 2 ** SUB_BUCKET_BITS / 2 linear sub-buckets, which keeps the
+# relative error of any reported value below 1 / 2 ** (SUB_BUCKET_BITS - 1).
+SUB_BUCKET_BITS = 7
+SUB_BUCKET_COUNT = 1 << SUB_BUCKET_BITS
+SUB_BUCKET_HALF = SUB_BUCKET_COUNT >> 1
+# Latencies above 2 ** 37 microseconds (about 38 hours) are recorded in the last bucket.
+MAX_VALUE_BITS = 37
+BUCKET_COUNT = (MAX_VALUE_BITS - SUB_BUCKET_BITS + 2) * SUB_BUCKET_HALF
+REPORTED_PERCENTILES = (50, 90, 99, 99.9)
+
+
+def _bucket_index(microseconds):
+    if microseconds < SUB_BUCKET_COUNT:
+        return microseconds
+    shift = microseconds.bit_length() - SUB_BUCKET_BITS
+    return min(shift * SUB_BUCKET_HALF + (microseconds >> shift), BUCKET_COUNT - 1)
+
+
+def _bucket_value(index):
+    if index < SUB_BUCKET_COUNT:
+        return index
+    shift = index // SUB_BUCKET_HALF - 1
+    sub_bucket = index - shift * SUB_BUCKET_HALF
+    # Midpoint of the range of values that share this bucket
+    return (sub_bucket << shift) + ((1 << shift) >> 1)
+
+
+class LatencyHistogram:
+    """
+    Log-bucketed (HDR-style) latency histogram with constant memory and O(1) recording.
+
+    Latencies are recorded in seconds and stored as microsecond bucket counts. Every sender owns its own histogram
+    and is its only writer; the progress monitor merges them to report percentiles.
+
+    Attributes:
+    - counts: Number of recorded values per bucket.
+    - total_count: Number of recorded values.
+    - max_value: Largest recorded latency in seconds.
+    """
+
+    def __init__(self, counts=None):
+        self.counts = array('Q', bytes(8 * BUCKET_COUNT)) if counts is None else counts
+        self.total_count = sum(self.counts) if counts is not None else 0
+        self.max_value = 0.0
+
+    def record(self, seconds, count=1):
+        """
+        Record a latency.
+
+        Args:
+            seconds (float): The latency to record; negative values are recorded as zero.
+            count (int): Number of messages that saw this latency.
+        """
+        self.counts[_bucket_index(max(int(seconds * 1000000), 0))] += count
+        self.total_count += count
+        if seconds > self.max_value:
+            self.max_value = seconds
+
+    def merge(self, other):
+        """
+        Add the values recorded by another histogram to this one.
+
+        Args:
+            other (LatencyHistogram): The histogram to merge in.
+        """
+        self.counts = array('Q', map(operator.add, self.counts, other.counts))
+        self.total_count += other.total_count
+        if other.max_value > self.max_value:
+            self.max_value = other.max_value
+
+    def percentile(self, percentile):
+        """
+        Return the latency below which the given percentage of recorded values fall.
+
+        Args:
+            percentile (float): Percentile between 0 and 100.
+
+        Returns:
+            float: Latency in seconds, or 0 when nothing has been recorded.
+        """
+        if not self.total_count:
+            return 0.0
+        if percentile >= 100:
+            return self.max_value
+        target = max(1, -(-self.total_count * percentile // 100))
+        index = bisect.bisect_left(list(itertools.accumulate(self.counts)), target)
+        if index >= BUCKET_COUNT:
+            return self.max_value
+        return min(_bucket_value(index) / 1000000, self.max_value)
+
+    def cumulative_counts(self, boundaries):
+        """
+        Return the number of recorded values at or below each boundary, e.g. for Prometheus histogram buckets.
+
+        Args:
+            boundaries (list): Upper bounds in seconds, in increasing order.
+
+        Returns:
+            tuple: (counts, total) where counts has one cumulative count per boundary and total estimates the sum of
+            all recorded values in seconds.
+        """
+        counts = [0] * len(boundaries)
+        total = 0.0
+        for index, count in enumerate(self.counts):
+            if not count:
+                continue
+            value = _bucket_value(index) / 1000000
+            total += value * count
+            position = bisect.bisect_left(boundaries, value)
+            if position < len(boundaries):
+                counts[position] += count
+        return list(itertools.accumulate(counts)), total
+
+    def summary(self):
+        """
+        Return the reported percentiles and the maximum.
+
+        Returns:
+            dict: Latencies in seconds keyed 'p50', 'p90', 'p99', 'p99.9' and 'max'.
+        """
+        summary = {f"p{percentile:g}": self.percentile(percentile) for percentile in REPORTED_PERCENTILES}
+        summary['max'] = self.max_value
+        return summary
+
+
+class ClassStats:
+    """
+    Per-priority-class message counts and end-to-end latency histograms.
+
+    End-to-end latency runs from a message's created_at to the moment its send completed, so it includes the time
+    spent waiting in the queue. Messages without a priority are not tracked. Like LatencyHistogram, every sender owns
+    its own instance and the progress monitor merges them.
+
+    Attributes:
+    - classes: [messages_sent, messages_failed, LatencyHistogram] per priority class.
+    """
+
+    def __init__(self):
+        self.classes = {}
+
+    def record(self, message, failed, now):
+        """
+        Record one completed send.
+
+        Args:
+            message (tuple): The message; records without a priority attribute are ignored.
+            failed (bool): Whether the send failed.
+            now (float): time.monotonic() when the send completed.
+        """
+        priority = getattr(message, 'priority', None)
+        if priority is not None:
+            self.add(priority, 0 if failed else 1, 1 if failed else 0, now - message.created_at)
+
+    def add(self, priority, sent, failed, latency):
+        """
+        Record completed sends of one class that share the same end-to-end latency.
+
+        Args:
+            priority (str): The priority class.
+            sent (int): Number of messages sent.
+            failed (int): Number of messages that failed.
+            latency (float): End-to-end latency in seconds.
+        """
+        stats = self.classes.get(priority)
+        if stats is None:
+            stats = self.classes[priority] = [0, 0, LatencyHistogram()]
+        stats[0] += sent
+        stats[1] += failed
+        stats[2].record(latency, sent + failed)
+
+    def merge(self, other):
+        """
+        Add the counts and latencies recorded by another instance to this one.
+
+        Args:
+            other (ClassStats): The statistics to merge in.
+        """
+        # Copy the items first: the owning sender may add a class while the monitor is merging
+        for priority, (sent, failed, latency) in list(other.classes.items()):
+            stats = self.classes.get(priority)
+            if stats is None:
+                stats = self.classes[priority] = [0, 0, LatencyHistogram()]
+            stats[0] += sent
+            stats[1] += failed
+            stats[2].merge(latency)
@@ -0,0 +1,193 @@
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+
+_listener = None
+_queue_handler = None
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that hands records to the listener unformatted.
+
+    The stock QueueHandler formats every record in the logging thread before enqueuing it. Here message arguments
+    are merged only when the listener formats the record, which keeps formatting cost off the producer and sender
+    threads. Arguments must therefore not be mutated after the logging call, which holds for the ids, counts and
+    strings this application logs.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+class BatchingQueueListener(logging.handlers.QueueListener):
+    """
+    QueueListener that handles all queued records per wake-up and flushes its handlers once per batch.
+
+    Attributes:
+    - batch_size: Maximum number of records handled between two handler flushes.
+    """
+
+    def __init__(self, log_queue, *handlers, batch_size=1000):
+        super(BatchingQueueListener, self).__init__(log_queue, *handlers, respect_handler_level=True)
+        self.batch_size = batch_size
+
+    def flush(self, timeout=5.0):
+        """
+        Block until every record queued so far has been written and the handlers have been flushed.
+
+        Args:
+            timeout (float): Maximum time to wait in seconds.
+        """
+        if self._thread is None:
+            return
+        flushed = threading.Event()
+        self.queue.put_nowait(flushed)
+        flushed.wait(timeout)
+
+    def _monitor(self):
+        while True:
+            records = [self.dequeue(True)]
+            try:
+                while len(records) < self.batch_size:
+                    records.append(self.dequeue(False))
+            except queue.Empty:
+                pass
+
+            for record in records:
+                if record is self._sentinel:
+                    self._flush_handlers()
+                    return
+                if isinstance(record, threading.Event):
+                    self._flush_handlers()
+                    record.set()
+                else:
+                    self.handle(record)
+            self._flush_handlers()
+
+    def _flush_handlers(self):
+        for handler in self.handlers:
+            handler.flush()
+
+
+class BufferedFileHandler(logging.FileHandler):
+    """
+    FileHandler that writes through a large buffer and leaves flushing to BatchingQueueListener.
+
+    Attributes:
+    - buffer_size: Size of the file buffer in bytes.
+    """
+
+    def __init__(self, filename, buffer_size=1 << 16):
+        self.buffer_size = buffer_size
+        super(BufferedFileHandler, self).__init__(filename)
+
+    def _open(self):
+        return open(self.baseFilename, self.mode, buffering=self.buffer_size, encoding=self.encoding,
+                    errors=self.errors)
+
+    def emit(self, record):
+        try:
+            self.stream.write(self.format(record) + self.terminator)
+        except Exception:
+            self.handleError(record)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Filter that lets through at most max_per_second records with the same message template each second.
+
+    Records at ERROR level and above are never dropped. The first record let through after a suppressed period is
+    annotated with the number of records that were dropped. Counts are kept without a lock, so under heavy contention
+    the suppressed count is approximate.
+
+    Attributes:
+    - max_per_second: Maximum number of records per message template per second.
+    """
+
+    def __init__(self, max_per_second):
+        super(RateLimitFilter, self).__init__()
+        self.max_per_second = max_per_second
+        self._windows = {}
+
+    def filter(self, record):
+        if record.levelno >= logging.ERROR:
+            return True
+
+        second = int(time.monotonic())
+        window = self._windows.get(record.msg)
+        if window is None or window[0] != second:
+            suppressed = window[2] if window is not None else 0
+            self._windows[record.msg] = [second, 1, 0]
+            if suppressed:
+                record.msg = f"{record.msg} ({suppressed} similar messages suppressed)"
+            return True
+        if window[1] < self.max_per_second:
+            window[1] += 1
+            return True
+        window[2] += 1
+        return False
+
+
+def start_logging(handlers, rate_limit=None):
+    """
+    Route the root logger through a queue to a listener thread that owns the given handlers.
+
+    Any pipeline started earlier is stopped and flushed first.
+
+    Args:
+        handlers (list): Handlers that write the records, e.g. console and file handlers.
+        rate_limit (int): Maximum records per message template per second, or None for no limit.
+    """
+    global _listener, _queue_handler
+    stop_logging()
+
+    _queue_handler = DeferredQueueHandler(queue.SimpleQueue())
+    if rate_limit:
+        _queue_handler.addFilter(RateLimitFilter(rate_limit))
+    logging.getLogger().addHandler(_queue_handler)
+
+    _listener = BatchingQueueListener(_queue_handler.queue, *handlers)
+    _listener.start()
+
+
+def flush_logging():
+    """
+    Wait until every record logged so far has been written.
+    """
+    if _listener is not None:
+        _listener.flush()
+
+
+def stop_logging():
+    """
+    Flush and stop the logging pipeline and close its handlers.
+    """
+    global _listener, _queue_handler
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+def _restart_in_child():
+    # The listener thread does not survive a fork, and the inherited queue may still hold the parent's records.
+    # Forked worker processes get their own queue and listener writing through the inherited handlers.
+    global _listener
+    if _listener is None:
+        return
+    _queue_handler.queue = queue.SimpleQueue()
+    _listener = BatchingQueueListener(_queue_handler.queue, *_listener.handlers, batch_size=_listener.batch_size)
+    _listener.start()
+
+
+atexit.register(stop_logging)
+os.register_at_fork(after_in_child=_restart_in_child)
@@ -0,0 +1,80 @@
+from array import array
+from typing import NamedTuple
+
+
+class Message(NamedTuple):
+    """
+    One SMS alert.
+
+    Attributes:
+    - phone_number: Recipient phone number.
+    - body: Message text.
+    - priority: Name of the alert class, or None when no classes are configured.
+    - created_at: time.monotonic() when the message was generated, for end-to-end latency.
+    - attempts: Number of failed send attempts so far.
+    - deferred: Time in seconds the current attempt was held back by rate limits. A message coming back with deferred
+      set already holds its rate limit token.
+    """
+    phone_number: int
+    body: str
+    priority: str = None
+    created_at: float = 0.0
+    attempts: int = 0
+    deferred: float = 0.0
+
+
+class MessageBatch:
+    """
+    Columnar batch of messages that travels through the queue as a single item.
+
+    Phone numbers are kept in an array('q') column and bodies in one contiguous bytes buffer indexed by an
+    array('I') of offsets, so a batch costs a handful of objects however many messages it holds, instead of a tuple,
+    an int and a str per message. All messages in a batch share one priority class and creation time. Message
+    records are only built on demand, e.g. when a failed message is handed to the retry scheduler.
+
+    Attributes:
+    - phone_numbers: Phone number column.
+    - bodies: Encoded bodies of all messages, back to back.
+    - offsets: Start of each body in bodies, plus the end of the last one.
+    - priority: Name of the alert class of every message, or None.
+    - created_at: time.monotonic() when the batch was generated.
+    """
+
+    __slots__ = ('phone_numbers', 'bodies', 'offsets', 'priority', 'created_at')
+
+    def __init__(self, phone_numbers, bodies, offsets, priority=None, created_at=0.0):
+        self.phone_numbers = phone_numbers
+        self.bodies = bodies
+        self.offsets = offsets
+        self.priority = priority
+        self.created_at = created_at
+
+    def body(self, index):
+        return self.bodies[self.offsets[index]:self.offsets[index + 1]]
+
+    def message(self, index):
+        """
+        Build the Message record of one message in the batch.
+        """
+        return Message(self.phone_numbers[index], self.body(index).decode('ascii'), self.priority, self.created_at)
+
+    def select(self, indexes):
+        """
+        Build a batch holding only the messages at the given indexes.
+        """
+        bodies = b''.join(self.body(index) for index in indexes)
+        offsets = array('I', [0])
+        for index in indexes:
+            offsets.append(offsets[-1] + self.offsets[index + 1] - self.offsets[index])
+        return MessageBatch(array('q', (self.phone_numbers[index] for index in indexes)), bodies, offsets,
+                            self.priority, self.created_at)
+
+    def messages(self):
+        """
+        Yield the Message records of all messages in the batch.
+        """
+        for index in range(len(self)):
+            yield self.message(index)
+
+    def __len__(self):
+        return len(self.phone_numbers)
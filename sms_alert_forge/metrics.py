@@ -0,0 +1,261 @@
+import logging
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from sms_alert_forge.histogram import LatencyHistogram
+
+CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+PREFIX = 'smsalertforge'
+# Upper bounds of the exported latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{value}"' for name, value in labels.items()) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsRegistry:
+    """
+    Class responsible for collecting the run's metrics and rendering them in the OpenMetrics text format.
+
+    The registry keeps no counters of its own. Collectors registered with it read, at scrape time, the counters that
+    the producer, senders and other threads already keep: every counter has a single writer thread and is updated
+    without a lock, and a scrape only reads them, so exporting metrics adds nothing to the send path. Values read while
+    a thread updates them are at most one update old.
+    """
+
+    def __init__(self):
+        self._collectors = []
+
+    def register(self, collector):
+        """
+        Add a collector.
+
+        Args:
+            collector (callable): Returns a list of metric families, each a (name, type, help, samples) tuple where
+                samples is a list of (suffix, labels, value) tuples.
+        """
+        self._collectors.append(collector)
+
+    def collect(self):
+        """
+        Return the metric families of every collector.
+        """
+        families = []
+        for collector in self._collectors:
+            families.extend(collector())
+        return families
+
+    def render(self):
+        """
+        Render every metric in the OpenMetrics text exposition format.
+
+        Returns:
+            str: The exposition, ending with '# EOF'.
+        """
+        lines = []
+        for name, metric_type, help_text, samples in self.collect():
+            lines.append(f"# TYPE {name} {metric_type}")
+            lines.append(f"# HELP {name} {help_text}")
+            for suffix, labels, value in samples:
+                lines.append(f"{name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        lines.append('# EOF')
+        return '\n'.join(lines) + '\n'
+
+
+def pipeline_collector(senders, message_queue=None, producer=None, retry_scheduler=None):
+    """
+    Build a collector for the queue, producer and senders of a run.
+
+    Args:
+        senders (list): The senders; senders added later, e.g. by the autoscaler, are included.
+        message_queue (queue.Queue): The queue between producer and senders, or None.
+        producer (threading.Thread): The producer, or None.
+        retry_scheduler (RetryScheduler): The retry scheduler, or None.
+
+    Returns:
+        callable: A collector for MetricsRegistry.register.
+    """
+    def collect():
+        families = []
+        if producer is not None:
+            families.append((f'{PREFIX}_messages_produced', 'counter', 'Messages generated by the producer.',
+                             [('_total', {}, producer.messages_produced)]))
+            deduplicator = getattr(producer, 'deduplicator', None)
+            if deduplicator is not None:
+                families.append((f'{PREFIX}_duplicates_suppressed', 'counter', 'Messages dropped as duplicates.',
+                                 [('_total', {}, deduplicator.suppressed)]))
+        if message_queue is not None:
+            families.append((f'{PREFIX}_queue_depth', 'gauge', 'Items waiting in the message queue.',
+                             [('', {}, message_queue.qsize())]))
+        if retry_scheduler is not None:
+            families.append((f'{PREFIX}_retries_pending', 'gauge', 'Messages waiting for their next attempt.',
+                             [('', {}, retry_scheduler.pending)]))
+
+        families.append((f'{PREFIX}_senders_running', 'gauge', 'Sender threads or processes still running.',
+                         [('', {}, sum(1 for sender in senders if sender.is_alive()))]))
+        per_sender = (
+            ('messages_sent', 'counter', 'Messages sent successfully.', 'messages_sent'),
+            ('messages_failed', 'counter', 'Messages that failed to be sent.', 'messages_failed'),
+            ('messages_retried', 'counter', 'Failed attempts handed to the retry scheduler.', 'messages_retried'),
+            ('messages_throttled', 'counter', 'Sends deferred by a rate limit.', 'messages_throttled'),
+            ('sender_busy_seconds', 'counter', 'Time spent sending.', 'busy_time'),
+        )
+        for name, metric_type, help_text, attribute in per_sender:
+            samples = [('_total', {'sender': str(index)}, getattr(sender, attribute, 0))
+                       for index, sender in enumerate(senders) if hasattr(sender, attribute)]
+            if samples:
+                families.append((f'{PREFIX}_{name}', metric_type, help_text, samples))
+
+        latency = LatencyHistogram()
+        for sender in senders:
+            latency.merge(sender.latency_histogram)
+        counts, total = latency.cumulative_counts(LATENCY_BUCKETS)
+        samples = [('_bucket', {'le': str(bound)}, count) for bound, count in zip(LATENCY_BUCKETS, counts)]
+        samples.append(('_bucket', {'le': '+Inf'}, latency.total_count))
+        samples.append(('_count', {}, latency.total_count))
+        samples.append(('_sum', {}, total))
+        families.append((f'{PREFIX}_send_latency_seconds', 'histogram', 'Send latency per message.', samples))
+        return families
+
+    return collect
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = self.server.registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logging.debug("Metrics endpoint: " + format, *args)
+
+
+class MetricsServer:
+    """
+    Class responsible for serving a MetricsRegistry at /metrics over HTTP, for Prometheus or any OpenMetrics scraper.
+
+    Attributes:
+    - registry: The registry to serve.
+    - host: Interface to listen on.
+    - port: Port to listen on; 0 picks a free port.
+    """
+
+    def __init__(self, registry, host='127.0.0.1', port=9464):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        """
+        Start serving in a background thread.
+
+        Returns:
+            MetricsServer: The server itself.
+        """
+        self._server = ThreadingHTTPServer((self.host, self.port), _MetricsHandler)
+        self._server.daemon_threads = True
+        self._server.registry = self.registry
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.1,), daemon=True)
+        self._thread.start()
+        logging.info(f"Serving metrics on http://{self.host}:{self.port}/metrics.")
+        return self
+
+    def stop(self):
+        """
+        Stop serving and close the listening socket.
+        """
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = None
+
+
+class MetricsSnapshotWriter(threading.Thread):
+    """
+    Class responsible for writing a MetricsRegistry to an OpenMetrics file every interval, and once more when stopped.
+
+    Each snapshot is written to a temporary file and renamed over the previous one, so readers never see a partial
+    file.
+
+    Attributes:
+    - registry: The registry to write.
+    - path: File to write.
+    - interval: Time between snapshots in seconds.
+    """
+
+    def __init__(self, registry, path, interval=5.0):
+        super(MetricsSnapshotWriter, self).__init__(daemon=True)
+        self.registry = registry
+        self.path = path
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def run(self):
+        try:
+            while not self._stop_event.wait(self.interval):
+                self.write()
+        except Exception as e:
+            logging.error(f"Error in MetricsSnapshotWriter: {e}", exc_info=True)
+
+    def write(self):
+        """
+        Write one snapshot.
+        """
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary = f"{self.path}.tmp"
+        with open(temporary, 'w') as f:
+            f.write(self.registry.render())
+        os.replace(temporary, self.path)
+
+    def stop(self):
+        """
+        Stop the thread and write the final snapshot.
+        """
+        self._stop_event.set()
+        if self.is_alive():
+            self.join()
+        self.write()
+
+
+def start_exporters(config, registry):
+    """
+    Start the exporters configured in the 'metrics' section of the configuration.
+
+    Args:
+        config (dict): Configuration parameters.
+        registry (MetricsRegistry): The registry to export.
+
+    Returns:
+        list: The started MetricsServer and MetricsSnapshotWriter, if configured; stop() each at the end of the run.
+    """
+    metrics_config = config.get('metrics') or {}
+    exporters = []
+    if metrics_config.get('port') is not None:
+        server = MetricsServer(registry, metrics_config.get('host', '127.0.0.1'), metrics_config['port'])
+        exporters.append(server.start())
+    if metrics_config.get('snapshot_path'):
+        writer = MetricsSnapshotWriter(registry, metrics_config['snapshot_path'],
+                                       metrics_config.get('snapshot_interval', 5.0))
+        writer.start()
+        exporters.append(writer)
+    return exporters
@@ -0,0 +1,196 @@
+import logging
+import queue
+
+from sms_alert_forge.dedup import Deduplicator
+from sms_alert_forge.producer import MessageProducer
+from sms_alert_forge.ratelimit import RateLimiter
+from sms_alert_forge.queues import DurableQueue, WatermarkQueue, WeightedFairQueue
+from sms_alert_forge.retry import RetryScheduler
+from sms_alert_forge.sender import MessageSender
+
+
+def build_transport(config):
+    """
+    Build the transport described by the 'transport' section of the configuration.
+
+    With local_gateway set (or no url), a local GatewayServer is started with the senders' mean_processing_time and
+    failure_rate as its latency and error rate; it is stopped when the transport is closed.
+
+    Args:
+        config (dict): Configuration parameters.
+
+    Returns:
+        Transport: The transport shared by the senders, or None to simulate sending.
+    """
+    transport_config = config.get('transport') or {}
+    transport_type = transport_config.get('type', 'simulated')
+    if transport_type == 'simulated':
+        return None
+    if transport_type != 'http':
+        raise ValueError(f"Unknown transport '{transport_type}'. Expected 'simulated' or 'http'.")
+
+    # Imported here so runs without an HTTP transport do not pay for http.client and http.server at startup
+    from sms_alert_forge.gateway import GatewayServer
+    from sms_alert_forge.transport import HttpTransport
+
+    url = transport_config.get('url')
+    gateway = None
+    if transport_config.get('local_gateway') or not url:
+        gateway = GatewayServer(
+            latency=config['senders']['mean_processing_time'],
+            error_rate=config['senders']['failure_rate'],
+            http_error_rate=transport_config.get('http_error_rate', 0.0),
+        ).start()
+        url = gateway.url
+    return HttpTransport(url, pool_size=transport_config.get('pool_size', 8),
+                         timeout=transport_config.get('timeout', 5.0), gateway=gateway)
+
+
+def build_pipeline(config, stop_event, num_messages=None, produced=0):
+    """
+    Build the message queue, producer and senders described by the configuration.
+
+    Args:
+        config (dict): Configuration parameters.
+        stop_event (threading.Event): Event to signal the threads to stop gracefully.
+        num_messages (int): Number of messages to produce, overriding the configured value when given.
+        produced (int): Number of those messages an interrupted earlier run already produced, e.g. from a
+            checkpoint; a durable queue's own count takes precedence.
+
+    Returns:
+        tuple: (message_queue, producer, senders, retry_scheduler, autoscaler), with none of the threads started.
+        retry_scheduler is None unless retries or rate limits are configured, and autoscaler unless autoscaling is
+        enabled. The
+        autoscaler, if set, else the retry scheduler, if set, else the producer ends the senders.
+    """
+    # Alert classes: each gets its own queue lane with a scheduling weight and a share of the produced messages
+    priority_config = config.get('priorities') or {}
+    weights = {name: settings.get('weight', 1) for name, settings in priority_config.items()} or None
+    shares = {name: settings.get('share', 1) for name, settings in priority_config.items()} or None
+
+    queue_config = config.get('queue') or {}
+    if num_messages is None:
+        num_messages = config['messages'].get('num_messages')
+    already_produced = produced
+    if queue_config.get('durable_path'):
+        message_queue = DurableQueue(queue_config['durable_path'], queue_config.get('durable_capacity', 65536),
+                                     priorities=list(priority_config), stop_event=stop_event)
+        ring = message_queue.queue
+        if not ring.pending() and (ring.finished or (num_messages is not None and ring.produced >= num_messages)):
+            ring.reset()  # The previous run finished, so this one starts over
+        elif ring.produced:
+            logging.info(f"Resuming {queue_config['durable_path']}: {ring.resumed} unacknowledged messages queued "
+                         f"again, {ring.produced} messages already produced.")
+        already_produced = ring.produced
+    elif queue_config.get('high_watermark'):
+        message_queue = WatermarkQueue(queue_config['high_watermark'], queue_config.get('low_watermark'), stop_event,
+                                       weights=weights)
+    elif weights:
+        message_queue = WeightedFairQueue(weights)
+    else:
+        message_queue = queue.Queue()
+    num_senders = config.get('senders', {}).get('num_senders')
+    engine = config['senders'].get('engine', 'thread')
+    retry_config = config.get('retry') or {}
+    retries_enabled = retry_config.get('max_attempts', 1) > 1
+    rate_limiter = RateLimiter.from_config(config)
+    if rate_limiter and engine != 'thread':
+        raise ValueError("Rate limits are only supported by the thread engine.")
+    # Throttled messages are deferred through the retry scheduler
+    scheduler_enabled = retries_enabled or rate_limiter is not None
+    autoscaler_config = config.get('autoscaler') or {}
+    autoscaling = bool(autoscaler_config.get('enabled'))
+    if autoscaling:
+        if engine != 'thread':
+            raise ValueError("Autoscaling is only supported by the thread engine.")
+        num_senders = min(max(num_senders, autoscaler_config.get('min_senders', 1)),
+                          autoscaler_config.get('max_senders', 64))
+
+    producer_config = {
+        'message_queue': message_queue,
+        'stop_event': stop_event,
+        'num_senders': 0 if scheduler_enabled or autoscaling else num_senders,
+        'deduplicator': Deduplicator.from_config(config),
+    }
+    if config['messages'].get('trace'):
+        # Replay a recorded trace; num_messages, when set, caps the number of records replayed
+        from sms_alert_forge.replay import TraceProducer
+        producer_config.update({
+            'path': config['messages']['trace'],
+            'speed': config['messages'].get('trace_speed', 1.0),
+            'trace_format': config['messages'].get('trace_format'),
+            'num_messages': None if num_messages is None else max(0, num_messages - already_produced),
+            'skip': already_produced,
+            'shard': tuple(config['messages'].get('trace_shard', (0, 1))),
+            'batch_size': config['messages'].get('batch_size', 100),
+        })
+        producer = TraceProducer(**producer_config)
+    else:
+        producer_config.update({
+            'num_messages': max(0, num_messages - already_produced),
+            'batch_size': config['messages'].get('batch_size', 1),
+            'rate': config['messages'].get('rate'),
+            'priorities': shares,
+            # Only MessageSender consumes columnar batches
+            'columnar': bool(config['messages'].get('columnar')) and engine == 'thread',
+        })
+        producer = MessageProducer(**producer_config)
+
+    retry_scheduler = None
+    if scheduler_enabled:
+        retry_scheduler = RetryScheduler(
+            message_queue, stop_event, 0 if autoscaling else num_senders, producer=producer,
+            max_attempts=retry_config.get('max_attempts', 1),
+            base_delay=retry_config.get('base_delay', 0.1),
+            max_delay=retry_config.get('max_delay', 5.0),
+            jitter=retry_config.get('jitter', 0.5),
+        )
+
+    sender_config = {
+        'message_queue': message_queue,
+        'failure_rate': config['senders']['failure_rate'],
+        'mean_processing_time': config['senders']['mean_processing_time'],
+        'stop_event': stop_event,
+        'retry_scheduler': retry_scheduler,
+    }
+    tracing_config = config.get('tracing') or {}
+    tracing = bool(tracing_config.get('enabled'))
+    if tracing and engine != 'thread':
+        raise ValueError("Tracing is only supported by the thread engine.")
+
+    if engine == 'thread':
+        if tracing:
+            # Room for an even share of the messages, so the traces rarely have to grow
+            sender_config['trace_capacity'] = tracing_config.get('capacity') or (
+                -(-num_messages // max(1, num_senders)) if num_messages is not None else 65536)
+        sender_config['transport'] = build_transport(config)
+        sender_config['rate_limiter'] = rate_limiter
+        sender_config['batch_size'] = config['senders'].get('batch_size', 1)
+        sender_config['max_batch_wait'] = config['senders'].get('max_batch_wait', 0)
+        senders = [MessageSender(**sender_config) for _ in range(num_senders)]
+    elif engine == 'asyncio':
+        if (config.get('transport') or {}).get('type', 'simulated') != 'simulated':
+            raise ValueError("The asyncio engine only supports the simulated transport.")
+        from sms_alert_forge.async_sender import AsyncMessageSender
+        sender_config['concurrency'] = config['senders'].get('concurrency', 1000)
+        senders = [AsyncMessageSender(**sender_config) for _ in range(config['senders']['num_senders'])]
+    else:
+        raise ValueError(f"Unknown sender engine '{engine}'. Expected 'thread', 'asyncio' or 'simulated'.")
+
+    autoscaler = None
+    if autoscaling:
+        from sms_alert_forge.autoscaler import SenderAutoscaler
+        autoscaler = SenderAutoscaler(
+            message_queue, senders, lambda: MessageSender(**sender_config), stop_event,
+            upstream=retry_scheduler or producer,
+            min_senders=autoscaler_config.get('min_senders', 1),
+            max_senders=autoscaler_config.get('max_senders', 64),
+            policy=autoscaler_config.get('policy', 'littles'),
+            interval=autoscaler_config.get('interval', 0.5),
+            latency_target=autoscaler_config.get('latency_target', 1.0),
+            utilization=autoscaler_config.get('utilization', 0.8),
+            increase=autoscaler_config.get('increase', 1),
+            decrease=autoscaler_config.get('decrease', 0.5),
+        )
+
+    return message_queue, producer, senders, retry_scheduler, autoscaler
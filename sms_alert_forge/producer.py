@@ -1,7 +1,75 @@
+import itertools
 import logging
+import os
 import random
 import threading
 import time
+from array import array
+
+from sms_alert_forge.messages import Message, MessageBatch
+from sms_alert_forge.queues import message_count, put_many
+
+ALPHABET = b'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
+MESSAGE_LENGTH = 100
+PHONE_NUMBER_MIN = 1000000000
+PHONE_NUMBER_SPAN = 9000000000
+
+# Maps every random byte onto the alphabet so a whole batch of bodies is one bytes.translate() call.
+_BODY_TABLE = bytes(ALPHABET[i % len(ALPHABET)] for i in range(256))
+
+
+def generate_batches(count, priorities=None):
+    """
+    Generate random messages as columnar batches, one per alert class.
+
+    Args:
+        count (int): Number of messages to generate.
+        priorities (dict): Share of messages per alert class, or None to leave messages unclassified.
+
+    Returns:
+        list: MessageBatch objects holding count messages in total.
+    """
+    bodies = os.urandom(count * MESSAGE_LENGTH).translate(_BODY_TABLE)
+    phone_numbers = array('q', (PHONE_NUMBER_MIN + number % PHONE_NUMBER_SPAN
+                                for number in array('Q', os.urandom(count * 8))))
+    created_at = time.monotonic()
+    if not priorities:
+        return [MessageBatch(phone_numbers, bodies, array('I', range(0, len(bodies) + 1, MESSAGE_LENGTH)), None,
+                             created_at)] if count else []
+
+    indexes = {}
+    for index, priority in enumerate(random.choices(list(priorities), list(priorities.values()), k=count)):
+        indexes.setdefault(priority, []).append(index)
+    batches = []
+    for priority, class_indexes in indexes.items():
+        class_bodies = b''.join(bodies[i * MESSAGE_LENGTH:(i + 1) * MESSAGE_LENGTH] for i in class_indexes)
+        batches.append(MessageBatch(array('q', (phone_numbers[i] for i in class_indexes)), class_bodies,
+                                    array('I', range(0, len(class_bodies) + 1, MESSAGE_LENGTH)), priority,
+                                    created_at))
+    return batches
+
+
+def generate_messages(count, priorities=None):
+    """
+    Generate a batch of random messages from os.urandom byte tables.
+
+    Args:
+        count (int): Number of messages to generate.
+        priorities (dict): Share of messages per alert class, or None to leave messages unclassified.
+
+    Returns:
+        list: Message records.
+    """
+    bodies = os.urandom(count * MESSAGE_LENGTH).translate(_BODY_TABLE).decode('ascii')
+    phone_numbers = array('Q', os.urandom(count * 8))
+    if priorities:
+        classes = random.choices(list(priorities), list(priorities.values()), k=count)
+    else:
+        classes = itertools.repeat(None)
+    created_at = time.monotonic()
+    return [Message(PHONE_NUMBER_MIN + phone_numbers[i] % PHONE_NUMBER_SPAN,
+                    bodies[i * MESSAGE_LENGTH:(i + 1) * MESSAGE_LENGTH], priority, created_at)
+            for i, priority in zip(range(count), classes)]
 
 
 class MessageProducer(threading.Thread):
@@ -13,27 +81,64 @@ class MessageProducer(threading.Thread):
     - message_queue: The queue to which the produced messages are added.
     - stop_event: Event to signal the thread to stop gracefully.
     - num_senders: Number of sender threads.
+    - batch_size: Number of messages generated and enqueued together.
+    - rate: Maximum number of messages produced per second, or None to produce as fast as possible.
+    - priorities: Share of messages per alert class, or None to leave messages unclassified.
+    - columnar: Whether messages are enqueued as MessageBatch items (one per generated batch and class) instead of
+      one Message per message.
+    - deduplicator: Deduplicator that generated batches pass through before they are queued, or None.
+    - messages_produced: Number of messages generated so far, including any dropped as duplicates.
+    - finishing: Whether finish() was called.
+    - spans: SpanTimer splitting the producer's time into generate, enqueue and pace phases when profiling, else None.
     """
-    def __init__(self, num_messages, message_queue, stop_event, num_senders):
+    def __init__(self, num_messages, message_queue, stop_event, num_senders, batch_size=1, rate=None,
+                 priorities=None, columnar=False, deduplicator=None):
         super(MessageProducer, self).__init__()
         self.num_messages = num_messages
         self.message_queue = message_queue
         self.stop_event = stop_event
         self.num_senders = num_senders
+        self.batch_size = max(1, batch_size)
+        self.rate = rate
+        self.priorities = priorities
+        self.columnar = columnar
+        self.deduplicator = deduplicator
+        self.messages_produced = 0
+        self.finishing = False
+        self.spans = None
 
     def run(self):
         try:
             logging.info("MessageProducer started.")
 
-            for _ in range(self.num_messages):
-                if self.stop_event.is_set():
-                    break  # Check if the stop event is set, and stop if needed
+            start_time = time.monotonic()
+            while self.messages_produced < self.num_messages:
+                if self.stop_event.is_set() or self.finishing:
+                    break  # Check if the stop event is set or finish() was called, and stop if needed
 
-                message = ''.join(random.choices('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789', k=100))
-                phone_number = random.randint(1000000000, 9999999999)
-                self.message_queue.put((phone_number, message))
-                time.sleep(0.01)
-                logging.debug(f"Produced message: {message} for {phone_number}")
+                count = min(self.batch_size, self.num_messages - self.messages_produced)
+                if self.columnar:
+                    items = generate_batches(count, self.priorities)
+                else:
+                    items = generate_messages(count, self.priorities)
+                if self.deduplicator is not None:
+                    items = self.deduplicator.filter(items)
+                if self.spans is not None:
+                    self.spans.mark('generate')
+                unsent = put_many(self.message_queue, items)
+                if self.spans is not None:
+                    self.spans.mark('enqueue')
+                # Messages a stopped queue turned away were never produced, so a resumed run produces them again
+                self.messages_produced += count - message_count(unsent)
+                logging.debug("Produced %d messages (%d/%d)", count, self.messages_produced, self.num_messages)
+
+                if self.rate:
+                    # Pace against the start time so sleep overshoot does not accumulate across batches
+                    delay = start_time + self.messages_produced / self.rate - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                    if self.spans is not None:
+                        self.spans.mark('pace')
 
             logging.info("MessageProducer completed.")
             # Signal that no more messages will be produced
@@ -42,3 +147,10 @@ class MessageProducer(threading.Thread):
 
         except Exception as e:
             logging.error(f"Error in MessageProducer: {e}", exc_info=True)
+
+    def finish(self):
+        """
+        Stop producing after the current batch. Unlike the stop event, the senders still get their sentinels and send
+        what is already queued.
+        """
+        self.finishing = True
@@ -0,0 +1,232 @@
+import collections
+import cProfile
+import io
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+
+
+class SpanTimer:
+    """
+    Lap timer that splits a thread's time into named phases.
+
+    Every mark(phase) charges the time since the previous mark to phase, so marking the end of each step of a loop
+    accounts for all of the loop's time without nesting or context managers. Each instrumented thread owns its own
+    timer and is its only writer. Threads keep a spans attribute that is None unless profiling, so when profiling is
+    off a phase boundary costs one attribute check.
+
+    Attributes:
+    - totals: Time in seconds per phase.
+    - counts: Number of marks per phase.
+    """
+
+    __slots__ = ('totals', 'counts', '_last')
+
+    def __init__(self):
+        self.totals = collections.defaultdict(float)
+        self.counts = collections.defaultdict(int)
+        self._last = time.perf_counter()
+
+    def start(self):
+        """
+        Start timing the first phase now.
+        """
+        self._last = time.perf_counter()
+
+    def mark(self, phase):
+        """
+        Charge the time since the previous mark to phase.
+        """
+        now = time.perf_counter()
+        self.totals[phase] += now - self._last
+        self.counts[phase] += 1
+        self._last = now
+
+
+class StackSampler(threading.Thread):
+    """
+    Class responsible for sampling the Python stacks of every other thread at a fixed interval.
+
+    Stacks are counted in collapsed form, one 'thread;outer;...;inner' string per distinct stack, which is the input
+    format of flamegraph.pl, speedscope and similar tools. Threads are named by their class, so all senders add up to
+    one tower.
+
+    Attributes:
+    - interval: Time between samples in seconds.
+    - stacks: Number of samples per collapsed stack.
+    """
+
+    def __init__(self, interval=0.005):
+        super(StackSampler, self).__init__(daemon=True)
+        self.interval = interval
+        self.stacks = collections.Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            names = {thread.ident: type(thread).__name__ if type(thread) is not threading.Thread else thread.name
+                     for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == self.ident:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, 'unknown'))
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+class Profiler:
+    """
+    Class responsible for profiling a threaded run.
+
+    cProfile only profiles the thread that enables it, so instrument() wraps the run method of each thread before it
+    starts in one cProfile.Profile of its own, and gives threads with a spans attribute a SpanTimer. stop() merges the
+    per-thread profiles into one pstats file and writes, to output_dir:
+
+    - profile.pstats: The merged profile, for pstats, snakeviz and the like.
+    - profile.txt: The functions with the most cumulative time.
+    - profile.folded: Collapsed stacks sampled by a StackSampler, for flame graphs.
+    - phases.txt: Time per phase of every instrumented component, from the span timers.
+    - memory.txt: With memory set, the lines that allocated the most memory still held at the end, from tracemalloc.
+
+    Attributes:
+    - output_dir: Directory the results are written to.
+    - memory: Whether allocations are traced with tracemalloc.
+    - sample_interval: Time between stack samples in seconds.
+    """
+
+    def __init__(self, output_dir='profile', memory=False, sample_interval=0.005):
+        self.output_dir = output_dir
+        self.memory = memory
+        self.sample_interval = sample_interval
+        self._profiles = []
+        self._spans = []
+        self._lock = threading.Lock()
+        self._sampler = None
+
+    def instrument(self, thread):
+        """
+        Profile a thread that has not been started yet.
+
+        Args:
+            thread (threading.Thread): The thread.
+
+        Returns:
+            threading.Thread: The same thread.
+        """
+        component = type(thread).__name__
+        spans = None
+        if hasattr(thread, 'spans'):
+            spans = thread.spans = SpanTimer()
+            with self._lock:
+                self._spans.append((component, spans))
+        original_run = thread.run
+
+        def run():
+            profile = cProfile.Profile()
+            if spans is not None:
+                spans.start()
+            profile.enable()
+            try:
+                original_run()
+            finally:
+                profile.disable()
+                with self._lock:
+                    self._profiles.append(profile)
+
+        thread.run = run
+        return thread
+
+    def start(self):
+        """
+        Start the stack sampler, and tracemalloc if memory is set.
+        """
+        if self.memory:
+            tracemalloc.start()
+        self._sampler = StackSampler(self.sample_interval)
+        self._sampler.start()
+
+    def stop(self):
+        """
+        Stop profiling and write the results.
+
+        Returns:
+            dict: Time per phase, {component: {phase: {'time': seconds, 'count': marks, 'share': fraction}}}, plus the
+            output directory and, with memory set, the peak traced memory in bytes.
+        """
+        self._sampler.stop()
+        os.makedirs(self.output_dir, exist_ok=True)
+        report = {'output_dir': self.output_dir}
+
+        with self._lock:
+            profiles = list(self._profiles)
+            spans = list(self._spans)
+        if profiles:
+            stats = pstats.Stats(profiles[0])
+            for profile in profiles[1:]:
+                stats.add(profile)
+            stats.dump_stats(os.path.join(self.output_dir, 'profile.pstats'))
+            text = io.StringIO()
+            stats.stream = text
+            stats.sort_stats('cumulative').print_stats(40)
+            with open(os.path.join(self.output_dir, 'profile.txt'), 'w') as f:
+                f.write(text.getvalue())
+
+        with open(os.path.join(self.output_dir, 'profile.folded'), 'w') as f:
+            for stack, count in self._sampler.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+        phases = self.phases(spans)
+        report['phases'] = phases
+        with open(os.path.join(self.output_dir, 'phases.txt'), 'w') as f:
+            for component, component_phases in phases.items():
+                f.write(f"{component}\n")
+                for phase, values in component_phases.items():
+                    f.write(f"  {phase:<10} {values['time']:10.3f}s {values['share']:7.1%} {values['count']:10d}\n")
+
+        if self.memory:
+            snapshot = tracemalloc.take_snapshot()
+            report['memory_peak'] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            with open(os.path.join(self.output_dir, 'memory.txt'), 'w') as f:
+                f.write(f"Peak traced memory: {report['memory_peak']} bytes\n")
+                for statistic in snapshot.statistics('lineno')[:25]:
+                    f.write(f"{statistic}\n")
+
+        logging.info(f"Profile written to {self.output_dir}.")
+        return report
+
+    @staticmethod
+    def phases(spans):
+        """
+        Add up span timers per component.
+
+        Args:
+            spans (list): (component, SpanTimer) pairs.
+
+        Returns:
+            dict: {component: {phase: {'time': seconds, 'count': marks, 'share': fraction of the component's time}}}.
+        """
+        totals = {}
+        for component, timer in spans:
+            component_totals = totals.setdefault(component, {})
+            for phase, seconds in list(timer.totals.items()):
+                values = component_totals.setdefault(phase, {'time': 0.0, 'count': 0})
+                values['time'] += seconds
+                values['count'] += timer.counts[phase]
+        for component_totals in totals.values():
+            component_time = sum(values['time'] for values in component_totals.values())
+            for values in component_totals.values():
+                values['share'] = values['time'] / component_time if component_time else 0
+        return totals
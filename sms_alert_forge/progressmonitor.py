@@ -1,89 +1,254 @@
-import curses
 import logging
 import threading
 import time
 
+from sms_alert_forge.histogram import ClassStats, LatencyHistogram
+from sms_alert_forge.queues import WatermarkQueue
+
 
 class ProgressMonitor(threading.Thread):
     """
     Class responsible for displaying and logging progress information of message sending.
 
+    Every update only sums the sender counters. The latency histograms are merged and the display is refreshed only
+    when those counters changed, when refresh_interval has passed since the last refresh, or on the final update. The
+    curses view rewrites only the lines whose text changed, and headless mode logs one line per refresh.
+
     Attributes:
     - stdscr: The curses standard screen object for displaying information.
-    - senders: List of MessageSender instances being monitored.
-    - update_interval: The time interval between updates.
+    - senders: List of MessageSender instances being monitored; their latency histograms and per-class statistics are
+      merged on every refresh.
+    - update_interval: The time interval between checks of the sender counters.
+    - refresh_interval: The longest time between refreshes while the counters are unchanged.
     - should_terminate: Event to signal termination of the thread.
+    - message_queue: The queue between producer and senders, whose depth and backpressure are reported when given.
+    - retry_scheduler: The RetryScheduler of the run, whose retries are reported when given.
+    - autoscaler: The SenderAutoscaler of the run, whose pool size and scale events are reported when given.
+    - deduplicator: The producer's Deduplicator, whose suppressed duplicates are reported when given.
     """
 
-    def __init__(self, stdscr, senders, update_interval, stop_event, sms_report):
+    def __init__(self, stdscr, senders, update_interval, stop_event, sms_report, message_queue=None,
+                 refresh_interval=1.0, retry_scheduler=None, autoscaler=None, deduplicator=None):
         super(ProgressMonitor, self).__init__()
         self.stdscr = stdscr
         self.senders = senders
         self.update_interval = update_interval
+        self.refresh_interval = max(refresh_interval, update_interval)
         self.should_terminate = stop_event
         self.sms_report = sms_report
+        self.message_queue = message_queue
+        self.retry_scheduler = retry_scheduler
+        self.autoscaler = autoscaler
+        self.deduplicator = deduplicator
+        self._rendered_lines = {}
+        self._screen_size = None
+        self._queue_depth_total = 0
+        self._queue_depth_samples = 0
 
     def run(self):
         try:
             logging.info("ProgressMonitor started.")
 
             start_time = time.time()
+            last_counters = None
+            last_refresh = 0.0
 
-            while not self.should_terminate.is_set():
-                time.sleep(self.update_interval)
+            while not self.should_terminate.wait(self.update_interval):
                 elapsed_time = time.time() - start_time
 
-                total_sent = sum(sender.messages_sent for sender in self.senders)
-                total_failed = sum(sender.messages_failed for sender in self.senders)
-                average_time_per_message = sum(
-                    sender.total_processing_time for sender in self.senders) / total_sent if total_sent > 0 else 0
-
+                # Check completion before reading the counters so the final tick never reports stale totals
                 all_senders_completed = not any(sender.is_alive() for sender in self.senders)
 
+                total_sent = sum(sender.messages_sent for sender in self.senders)
+                total_failed = sum(sender.messages_failed for sender in self.senders)
+                if self.message_queue is not None:
+                    self._queue_depth_total += self.message_queue.qsize()
+                    self._queue_depth_samples += 1
 
-
-                if self.stdscr:
-                    # Calculate the center position
-                    screen_height, screen_width = self.stdscr.getmaxyx()
-                    start_y = max(0, (screen_height - 4) // 2)
-                    start_x = max(0, (screen_width - 40) // 2)
-                    self.stdscr.clear()
-                    self.stdscr.addstr(start_y, start_x, f"Elapsed Time: {elapsed_time:.2f}s", curses.A_BOLD)
-                    self.stdscr.addstr(start_y + 1, start_x, f"Messages Sent: {total_sent}", curses.A_BOLD)
-                    self.stdscr.addstr(start_y + 2, start_x, f"Messages Failed: {total_failed}", curses.A_BOLD)
-                    self.stdscr.addstr(start_y + 3, start_x,
-                                       f"Average Time per Message: {average_time_per_message:.2f}s", curses.A_BOLD)
-                    self.stdscr.refresh()
-                else:
-                    logging.info(f"Elapsed Time: {elapsed_time:.2f}s")
-                    logging.info(f"Messages Sent: {total_sent}")
-                    logging.info(f"Messages Failed: {total_failed}")
-                    logging.info(f"Average Time per Message: {average_time_per_message:.2f}s")
-
-                # Update the SMS report
-                self.sms_report['elapsed_time'] = elapsed_time
-                self.sms_report['messages_sent'] = total_sent
-                self.sms_report['messages_failed'] = total_failed
-                self.sms_report['average_time_per_message'] = average_time_per_message
-
-                logging.debug(
-                    f"Progress update. Elapsed Time: {elapsed_time:.2f}s | Messages Sent: {total_sent} | Messages Failed: {total_failed} | Average Time per Message: {average_time_per_message:.2f}s")
-
-                # Check if the termination event is set
-                if self.should_terminate.is_set():
-                    logging.info("Termination event is set.")
-                    break
+                counters = (total_sent, total_failed)
+                if (counters != last_counters or all_senders_completed
+                        or elapsed_time - last_refresh >= self.refresh_interval):
+                    self._refresh(elapsed_time, total_sent, total_failed)
+                    last_counters = counters
+                    last_refresh = elapsed_time
 
                 # Check if all sender threads have completed processing
                 if all_senders_completed:
                     self.stop()
                     logging.info("All sender threads have completed processing.")
                     break
+            else:
+                logging.info("Termination event is set.")
+                # Senders finish the message in hand before they stop; give them a moment so the final report
+                # includes it
+                give_up = time.monotonic() + self.refresh_interval
+                while any(sender.is_alive() for sender in self.senders) and time.monotonic() < give_up:
+                    time.sleep(self.update_interval)
+                self._refresh(time.time() - start_time, sum(sender.messages_sent for sender in self.senders),
+                              sum(sender.messages_failed for sender in self.senders))
 
             logging.info("ProgressMonitor completed.")
 
         except Exception as e:
             logging.error(f"Error in ProgressMonitor: {e}", exc_info=True)
 
+    def _refresh(self, elapsed_time, total_sent, total_failed):
+        average_time_per_message = sum(
+            sender.total_processing_time for sender in self.senders) / total_sent if total_sent > 0 else 0
+
+        latency = LatencyHistogram()
+        for sender in self.senders:
+            latency.merge(sender.latency_histogram)
+        latency_summary = latency.summary()
+        latency_text = " / ".join(f"{latency_summary[key]:.3f}" for key in ('p50', 'p90', 'p99', 'p99.9'))
+
+        lines = [
+            f"Elapsed Time: {elapsed_time:.2f}s",
+            f"Messages Sent: {total_sent}",
+            f"Messages Failed: {total_failed}",
+            f"Average Time per Message: {average_time_per_message:.2f}s",
+            f"Latency p50/p90/p99/p99.9: {latency_text}s",
+            f"Max Latency: {latency_summary['max']:.3f}s",
+        ]
+        if self.retry_scheduler is not None:
+            retries = sum(sender.messages_retried for sender in self.senders)
+            retry_successes = sum(sender.retry_successes for sender in self.senders)
+            lines.append(f"Retries: {retries} (recovered {retry_successes}, pending {self.retry_scheduler.pending})")
+
+        if self.autoscaler is not None:
+            scale_events = list(self.autoscaler.scale_events)
+            active_senders = len(self.autoscaler.active_senders)
+            lines.append(f"Senders: {active_senders} (peak {self.autoscaler.peak_senders}, "
+                         f"{len(scale_events)} scale events)")
+            if scale_events:
+                event = scale_events[-1]
+                lines.append(f"Last Scale: {event.senders_before} -> {event.senders_after} at {event.time:.1f}s "
+                             f"({event.reason})")
+
+        if self.deduplicator is not None:
+            dedup_stats = self.deduplicator.stats()
+            lines.append(f"Duplicates Suppressed: {dedup_stats['suppressed']} of {dedup_stats['lookups']} "
+                         f"({dedup_stats['mode']}, {dedup_stats['mean_lookup_time'] * 1e6:.1f}us per lookup)")
+
+        # Senders share their rate limiter
+        rate_limiters = list({id(r): r for r in (getattr(sender, 'rate_limiter', None) for sender in self.senders)
+                              if r is not None}.values())
+        if rate_limiters:
+            rate_limiter = rate_limiters[0]
+            throttled = sum(sender.messages_throttled for sender in self.senders)
+            deferrals = LatencyHistogram()
+            for sender in self.senders:
+                deferrals.merge(sender.deferral_histogram)
+            deferral_summary = deferrals.summary()
+            lines.append(f"Throttled: {throttled} deferrals, delay p50/p99 {deferral_summary['p50']:.3f} / "
+                         f"{deferral_summary['p99']:.3f}s, {len(rate_limiter)} buckets")
+
+        # Senders share their transport; simulated senders have none
+        transports = list({id(t): t for t in (getattr(sender, 'transport', None) for sender in self.senders)
+                           if t is not None}.values())
+        transport_stats = transports[0].stats() if len(transports) == 1 else None
+        if transport_stats:
+            lines.append(f"Gateway: {transport_stats['requests']} requests on {transport_stats['connections_opened']} "
+                         f"connections, reuse {transport_stats['connection_reuse']:.0%}, "
+                         f"pool wait {transport_stats['mean_pool_wait'] * 1000:.1f}ms, "
+                         f"p99 {transport_stats['request_latency_p99']:.3f}s")
+
+        class_stats = ClassStats()
+        for sender in self.senders:
+            if hasattr(sender, 'class_stats'):
+                class_stats.merge(sender.class_stats)
+        class_report = {}
+        for priority, (sent, failed, class_latency) in sorted(class_stats.classes.items()):
+            class_summary = class_latency.summary()
+            class_report[priority] = {
+                'messages_sent': sent,
+                'messages_failed': failed,
+                'throughput': (sent + failed) / elapsed_time if elapsed_time > 0 else 0,
+            }
+            for key, value in class_summary.items():
+                class_report[priority][f"latency_{key.replace('.', '')}"] = value
+            lines.append(f"{priority}: {sent + failed} done, {class_report[priority]['throughput']:.1f}/s, "
+                         f"p50/p99 {class_summary['p50']:.3f} / {class_summary['p99']:.3f}s")
+
+        if self.stdscr:
+            self._draw(lines)
+        else:
+            logging.info(" | ".join(lines))
+
+        # Update the SMS report
+        self.sms_report['elapsed_time'] = elapsed_time
+        self.sms_report['messages_sent'] = total_sent
+        self.sms_report['messages_failed'] = total_failed
+        self.sms_report['average_time_per_message'] = average_time_per_message
+        for key, value in latency_summary.items():
+            self.sms_report[f"latency_{key.replace('.', '')}"] = value
+        if self.retry_scheduler is not None:
+            # With retries, only messages that used up their attempts count as failed
+            self.sms_report['retries'] = retries
+            self.sms_report['retry_successes'] = retry_successes
+            self.sms_report['permanent_failures'] = total_failed
+            self.sms_report['retries_pending'] = self.retry_scheduler.pending
+        if class_report:
+            self.sms_report['classes'] = class_report
+        if transport_stats:
+            self.sms_report['transport'] = transport_stats
+        if self.deduplicator is not None:
+            self.sms_report['dedup'] = dedup_stats
+        if rate_limiters:
+            self.sms_report['rate_limits'] = {
+                'throttled': throttled,
+                'buckets': len(rate_limiter),
+                'buckets_evicted': rate_limiter.evicted,
+                'most_throttled': rate_limiter.most_throttled(),
+            }
+            for key, value in deferral_summary.items():
+                self.sms_report['rate_limits'][f"deferral_{key.replace('.', '')}"] = value
+        if self.autoscaler is not None:
+            self.sms_report['autoscaler'] = {
+                'senders': active_senders,
+                'peak_senders': self.autoscaler.peak_senders,
+                'scale_events': [event._asdict() for event in scale_events],
+            }
+        if self.message_queue is not None:
+            self.sms_report['queue_depth'] = self.message_queue.qsize()
+            # Little's law: the mean wait in the queue is its mean depth divided by the completion rate
+            mean_queue_depth = self._queue_depth_total / max(self._queue_depth_samples, 1)
+            throughput = (total_sent + total_failed) / elapsed_time if elapsed_time > 0 else 0
+            self.sms_report['mean_queue_depth'] = mean_queue_depth
+            self.sms_report['mean_queue_wait'] = mean_queue_depth / throughput if throughput > 0 else 0
+            if isinstance(self.message_queue, WatermarkQueue):
+                self.sms_report['max_queue_depth'] = self.message_queue.max_depth
+                self.sms_report['backpressure_time'] = self.message_queue.blocked_time
+                self.sms_report['backpressure_events'] = self.message_queue.throttle_count
+
+    def _draw(self, lines):
+        # Only the curses view needs curses; headless runs never import it
+        import curses
+
+        screen_size = self.stdscr.getmaxyx()
+        if screen_size != self._screen_size:
+            # The layout is centred, so a resize moves every line
+            self._screen_size = screen_size
+            self._rendered_lines = {}
+            self.stdscr.clear()
+
+        # Calculate the center position
+        screen_height, screen_width = screen_size
+        start_y = max(0, (screen_height - len(lines)) // 2)
+        start_x = max(0, (screen_width - 40) // 2)
+
+        changed = False
+        for row, line in enumerate(lines):
+            if self._rendered_lines.get(row) == line:
+                continue
+            self.stdscr.move(start_y + row, start_x)
+            self.stdscr.clrtoeol()
+            self.stdscr.addstr(start_y + row, start_x, line, curses.A_BOLD)
+            self._rendered_lines[row] = line
+            changed = True
+
+        if changed:
+            self.stdscr.refresh()
+
     def stop(self):
         self.should_terminate.set()
@@ -0,0 +1,421 @@
+import collections
+import queue
+import time
+
+from sms_alert_forge.messages import MessageBatch
+from sms_alert_forge.ringbuffer import MmapRingBuffer
+
+
+def put_many(message_queue, items):
+    """
+    Put several items on a queue.Queue, taking the queue lock once per chunk instead of once per item.
+
+    Bounded queues are honoured: the call blocks until there is room and enqueues as many items as fit each time.
+
+    Args:
+        message_queue (queue.Queue): The queue to which the items are added.
+        items (list): Items to enqueue, in order.
+
+    Returns:
+        list: The items that were not enqueued because the stop event released a producer blocked on a full
+        WatermarkQueue or DurableQueue; empty when every item was enqueued.
+    """
+    if isinstance(message_queue, (WatermarkQueue, DurableQueue)):
+        return message_queue.put_many(items)
+
+    start = 0
+    total = len(items)
+    while start < total:
+        with message_queue.not_full:
+            if message_queue.maxsize > 0:
+                while message_queue._qsize() >= message_queue.maxsize:
+                    message_queue.not_full.wait()
+                end = min(total, start + message_queue.maxsize - message_queue._qsize())
+            else:
+                end = total
+            for item in items[start:end]:
+                message_queue._put(item)
+            message_queue.unfinished_tasks += end - start
+            message_queue.not_empty.notify(end - start)
+        start = end
+    return []
+
+
+def message_count(items):
+    """
+    Count the messages in queue items: one per Message record, len() per MessageBatch, none per sentinel.
+
+    Args:
+        items (list): Queue items.
+
+    Returns:
+        int: Number of messages.
+    """
+    return sum(len(item) if isinstance(item, MessageBatch) else 1 for item in items if item is not None)
+
+
+def get_many(message_queue, max_items, timeout=0):
+    """
+    Take up to max_items items from a queue.Queue, taking the queue lock once instead of once per item.
+
+    Blocks until at least one item is available, then keeps collecting until max_items have been taken or timeout
+    seconds have passed. Collection stops right after a None sentinel so that every sender consumes exactly one.
+
+    Args:
+        message_queue (queue.Queue): The queue from which the items are taken.
+        max_items (int): Maximum number of items to take.
+        timeout (float): Seconds to wait for further items once the first one is available.
+
+    Returns:
+        list: The items taken, in queue order.
+    """
+    items = []
+    with message_queue.not_empty:
+        while not message_queue._qsize():
+            message_queue.not_empty.wait()
+        deadline = time.monotonic() + timeout
+        while len(items) < max_items:
+            if message_queue._qsize():
+                item = message_queue._get()
+                items.append(item)
+                if item is None:
+                    break
+                continue
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            message_queue.not_empty.wait(remaining)
+        message_queue.not_full.notify(len(items))
+    return items
+
+
+def task_done_many(message_queue, count):
+    """
+    Mark several items taken from a queue.Queue as done, taking the queue lock once.
+
+    Args:
+        message_queue (queue.Queue): The queue the items were taken from.
+        count (int): Number of items handled.
+    """
+    with message_queue.all_tasks_done:
+        unfinished = message_queue.unfinished_tasks - count
+        if unfinished < 0:
+            raise ValueError('task_done() called too many times')
+        if unfinished == 0:
+            message_queue.all_tasks_done.notify_all()
+        message_queue.unfinished_tasks = unfinished
+
+
+def mark_done(message_queue, messages):
+    """
+    Mark messages taken from a queue as handled.
+
+    A DurableQueue also acknowledges them, so they are not delivered again after a restart.
+
+    Args:
+        message_queue (queue.Queue): The queue the messages were taken from.
+        messages (list): The handled messages.
+    """
+    if isinstance(message_queue, DurableQueue):
+        message_queue.ack(messages)
+    else:
+        task_done_many(message_queue, len(messages))
+
+
+class DeficitRoundRobin:
+    """
+    Deque-compatible store that keeps one FIFO lane per priority class and serves the lanes by deficit round robin.
+
+    It replaces the deque inside a queue.Queue (see WeightedFairQueue and WatermarkQueue), so put/get and the bulk
+    put_many/get_many helpers schedule across classes without any change. Every message costs one unit; on its turn a
+    lane is credited its weight and serves messages until the credit is used up (an overdraft is carried into its next
+    turn), so over a busy period each class gets a share of messages proportional to its weight and no class starves. Only lanes holding messages are kept in the
+    round, which makes every scheduling decision O(1). Items without a known priority go to default_class, and None
+    sentinels wait in a separate lane that is served only once every class lane is empty.
+
+    Attributes:
+    - weights: Scheduling weight per priority class.
+    - default_class: Class of items without a priority attribute or with an unknown one.
+    """
+
+    def __init__(self, weights, default_class=None):
+        if not weights or min(weights.values()) <= 0:
+            raise ValueError("Priority classes need positive weights.")
+        self.weights = dict(weights)
+        self.default_class = default_class if default_class in self.weights else next(iter(self.weights))
+        self._lanes = {name: collections.deque() for name in self.weights}
+        self._deficits = dict.fromkeys(self.weights, 0.0)
+        self._active = collections.deque()
+        self._sentinels = collections.deque()
+        self._size = 0
+
+    def append(self, item):
+        if item is None:
+            self._sentinels.append(item)
+            return
+        name = getattr(item, 'priority', None)
+        lane = self._lanes.get(name)
+        if lane is None:
+            name = self.default_class
+            lane = self._lanes[name]
+        if not lane:
+            self._active.append(name)
+        lane.append(item)
+        self._size += 1
+
+    def popleft(self):
+        if not self._active:
+            return self._sentinels.popleft()
+
+        while True:
+            name = self._active[0]
+            if self._deficits[name] > 0:
+                break
+            self._deficits[name] += self.weights[name]
+            if self._deficits[name] > 0:
+                break
+            self._active.rotate(-1)  # Fractional weights and large batches accumulate credit over several rounds
+
+        lane = self._lanes[name]
+        item = lane.popleft()
+        self._size -= 1
+        # A MessageBatch costs one unit per message, so batching does not buy a class a larger share
+        self._deficits[name] -= len(item) if isinstance(item, MessageBatch) else 1
+        if not lane:
+            # An idle lane does not bank credit for later bursts
+            self._active.popleft()
+            self._deficits[name] = 0.0
+        elif self._deficits[name] <= 0:
+            self._active.rotate(-1)
+        return item
+
+    def depths(self):
+        """
+        Return the number of queued messages per priority class.
+        """
+        return {name: len(lane) for name, lane in self._lanes.items()}
+
+    def __len__(self):
+        return self._size + len(self._sentinels)
+
+    def __bool__(self):
+        return len(self) > 0
+
+
+class WeightedFairQueue(queue.Queue):
+    """
+    Unbounded message queue with one lane per priority class, served by deficit round robin.
+
+    Attributes:
+    - weights: Scheduling weight per priority class.
+    - default_class: Class of messages without a known priority.
+    """
+
+    def __init__(self, weights, default_class=None):
+        self.weights = weights
+        self.default_class = default_class
+        super(WeightedFairQueue, self).__init__()
+
+    def _init(self, maxsize):
+        self.queue = DeficitRoundRobin(self.weights, self.default_class)
+
+
+class WatermarkQueue(queue.Queue):
+    """
+    Bounded message queue that applies backpressure to producers with high and low watermarks.
+
+    Once the queue holds high_watermark items, puts block until consumers have drained it down to low_watermark, so a
+    throttled producer resumes with a burst of room instead of waking up for every freed slot. Puts blocked when the
+    stop event is set return without enqueuing, so a producer can never hang on a queue nobody is draining. With
+    weights, messages are kept in per-class lanes served by deficit round robin, as in WeightedFairQueue.
+
+    Attributes:
+    - high_watermark: Queue depth at which producers are blocked.
+    - low_watermark: Queue depth at which blocked producers resume.
+    - stop_event: Event to signal that blocked producers should give up.
+    - throttled: Whether producers are currently blocked.
+    - blocked_time: Total time producers have spent blocked on backpressure.
+    - throttle_count: Number of times the high watermark was reached.
+    - max_depth: Highest queue depth observed.
+    - weights: Scheduling weight per priority class, or None for a single FIFO lane.
+    - default_class: Class of messages without a known priority.
+    """
+
+    def __init__(self, high_watermark, low_watermark=None, stop_event=None, weights=None, default_class=None):
+        self.weights = weights
+        self.default_class = default_class
+        super(WatermarkQueue, self).__init__(maxsize=high_watermark)
+        self.high_watermark = high_watermark
+        self.low_watermark = high_watermark // 2 if low_watermark is None else min(low_watermark, high_watermark - 1)
+        self.stop_event = stop_event
+        self.throttled = False
+        self.blocked_time = 0.0
+        self.throttle_count = 0
+        self.max_depth = 0
+
+    def _init(self, maxsize):
+        if self.weights:
+            self.queue = DeficitRoundRobin(self.weights, self.default_class)
+        else:
+            super(WatermarkQueue, self)._init(maxsize)
+
+    def put(self, item, block=True, timeout=None):
+        with self.not_full:
+            if not self._wait_for_room(block, timeout):
+                return
+            self._put(item)
+            self.unfinished_tasks += 1
+            self.not_empty.notify()
+
+    def put_many(self, items):
+        start = 0
+        total = len(items)
+        while start < total:
+            with self.not_full:
+                if not self._wait_for_room(True, None):
+                    return items[start:]
+                end = min(total, start + self.high_watermark - self._qsize())
+                for item in items[start:end]:
+                    self._put(item)
+                self.unfinished_tasks += end - start
+                self.not_empty.notify(end - start)
+            start = end
+        return []
+
+    def _wait_for_room(self, block, timeout):
+        # Called with the queue lock held. Returns False when the stop event released a blocked producer.
+        if not self.throttled:
+            return True
+        if not block:
+            raise queue.Full
+
+        started = time.monotonic()
+        deadline = None if timeout is None else started + timeout
+        try:
+            while self.throttled:
+                if self.stop_event is not None and self.stop_event.is_set():
+                    return False
+                wait = 0.1 if deadline is None else min(0.1, deadline - time.monotonic())
+                if wait <= 0:
+                    raise queue.Full
+                self.not_full.wait(wait)
+            return True
+        finally:
+            self.blocked_time += time.monotonic() - started
+
+    def _put(self, item):
+        super(WatermarkQueue, self)._put(item)
+        if len(self.queue) > self.max_depth:
+            self.max_depth = len(self.queue)
+        if len(self.queue) >= self.high_watermark and not self.throttled:
+            self.throttled = True
+            self.throttle_count += 1
+
+    def _get(self):
+        item = super(WatermarkQueue, self)._get()
+        if self.throttled and len(self.queue) <= self.low_watermark:
+            self.throttled = False
+            self.not_full.notify_all()
+        return item
+
+
+class DurableQueue(queue.Queue):
+    """
+    Message queue stored in a memory-mapped MmapRingBuffer file, so queued messages survive a crash.
+
+    Messages are written to the file as they are put and stay there until their sender acknowledges them through
+    mark_done. Opening an existing file resumes it: every message that was not acknowledged is queued again. Puts
+    block while the ring is full of unacknowledged messages; like WatermarkQueue, a blocked put returns without
+    enqueuing once the stop event is set. Messages are delivered in FIFO order, and MessageBatch items are stored and
+    delivered as individual Messages.
+
+    Attributes:
+    - stop_event: Event to signal that blocked producers should give up.
+    - blocked_time: Total time producers have spent blocked on a full ring.
+    """
+
+    def __init__(self, path, capacity=65536, priorities=None, stop_event=None):
+        self.path = path
+        self.capacity = capacity
+        self.priorities = priorities
+        self.stop_event = stop_event
+        self.blocked_time = 0.0
+        super(DurableQueue, self).__init__()
+        # Resumed messages count as queued work like any other put
+        self.unfinished_tasks = len(self.queue)
+
+    def _init(self, maxsize):
+        self.queue = MmapRingBuffer(self.path, self.capacity, priorities=self.priorities)
+
+    def put(self, item, block=True, timeout=None):
+        if isinstance(item, MessageBatch):
+            self.put_many([item])
+            return
+        with self.not_full:
+            if item is not None and not self._wait_for_room(block, timeout):
+                return
+            self._put(item)
+            self.unfinished_tasks += 1
+            self.not_empty.notify()
+
+    def put_many(self, items):
+        # Records are stored one message each, so columnar batches are split up
+        items = [message for item in items
+                 for message in (item.messages() if isinstance(item, MessageBatch) else (item,))]
+        start = 0
+        total = len(items)
+        while start < total:
+            with self.not_full:
+                if items[start] is None:
+                    end = start + 1
+                else:
+                    if not self._wait_for_room(True, None):
+                        return items[start:]
+                    end = min(total, start + self.queue.free())
+                for item in items[start:end]:
+                    self._put(item)
+                self.unfinished_tasks += end - start
+                self.not_empty.notify(end - start)
+            start = end
+        return []
+
+    def ack(self, messages):
+        """
+        Acknowledge handled messages and mark them done.
+
+        Args:
+            messages (list): Messages returned by get or get_many.
+        """
+        with self.mutex:
+            for message in messages:
+                self.queue.ack(message)
+            self.not_full.notify_all()
+        task_done_many(self, len(messages))
+
+    def close(self):
+        """
+        Write the ring buffer back to its file and unmap it.
+        """
+        with self.mutex:
+            self.queue.close()
+
+    def _wait_for_room(self, block, timeout):
+        # Called with the queue lock held. Returns False when the stop event released a blocked producer.
+        if self.queue.free():
+            return True
+        if not block:
+            raise queue.Full
+
+        started = time.monotonic()
+        deadline = None if timeout is None else started + timeout
+        try:
+            while not self.queue.free():
+                if self.stop_event is not None and self.stop_event.is_set():
+                    return False
+                wait = 0.1 if deadline is None else min(0.1, deadline - time.monotonic())
+                if wait <= 0:
+                    raise queue.Full
+                self.not_full.wait(wait)
+            return True
+        finally:
+            self.blocked_time += time.monotonic() - started
@@ -0,0 +1,146 @@
+import collections
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    Per-destination send rate limits, enforced by token buckets keyed by carrier or phone number prefix.
+
+    A phone number belongs to the carrier with the longest matching prefix in carriers, and shares that carrier's
+    bucket. Other numbers get one bucket per prefix of prefix_length digits, limited by the default rate and burst, or
+    are not limited when no default rate is set.
+
+    Buckets are [tokens, last update] pairs in an OrderedDict ordered by last use; no bucket has a timer. A bucket is
+    refilled only when it is used, by the tokens earned since its last update, and buckets unused for idle_timeout are
+    evicted as later calls pass over them. A bucket is only evicted once it has had time to fill up, so evicting it and
+    creating it again later changes nothing but the memory it takes.
+
+    A refused message reserves the next free token: the bucket goes into debt by one token and the message is told to
+    wait until that token has been earned. Every deferred message thus gets its own due time and is sent when it comes
+    back, without asking the bucket again.
+
+    Attributes:
+    - rate: Tokens per second of prefix buckets, or None to leave numbers outside the carriers unlimited.
+    - burst: Capacity of prefix buckets.
+    - prefix_length: Number of leading digits that key prefix buckets.
+    - carriers: {name: (rate, burst)} of the configured carriers.
+    - idle_timeout: Time in seconds after which an unused bucket is evicted.
+    - throttled: Number of sends refused, per bucket key.
+    - evicted: Number of idle buckets evicted.
+    """
+
+    def __init__(self, rate=None, burst=1, prefix_length=3, carriers=None, idle_timeout=60.0):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.prefix_length = prefix_length
+        self.carriers = {}
+        self._carrier_prefixes = {}
+        for name, settings in (carriers or {}).items():
+            self.carriers[name] = (settings['rate'], max(1, settings.get('burst', 1)))
+            for prefix in settings.get('prefixes', ()):
+                self._carrier_prefixes[str(prefix)] = name
+        # Longest prefixes first, so the most specific carrier wins
+        self._prefix_lengths = sorted({len(prefix) for prefix in self._carrier_prefixes}, reverse=True)
+        self.idle_timeout = idle_timeout
+        self.throttled = collections.Counter()
+        self.evicted = 0
+        # OrderedDict rather than dict: finding the first entry of a dict slows down as deleted entries pile up there
+        self._buckets = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Create a rate limiter from the 'rate_limits' section of the configuration.
+
+        Args:
+            config (dict): Configuration parameters.
+
+        Returns:
+            RateLimiter: The rate limiter, or None when no limits are configured.
+        """
+        limits = config.get('rate_limits') or {}
+        if not limits.get('rate') and not limits.get('carriers'):
+            return None
+        return cls(rate=limits.get('rate'), burst=limits.get('burst', 1), prefix_length=limits.get('prefix_length', 3),
+                   carriers=limits.get('carriers'), idle_timeout=limits.get('idle_timeout', 60.0))
+
+    def key(self, phone_number):
+        """
+        Return the bucket key of a phone number: its carrier name, or its prefix.
+        """
+        digits = str(phone_number)
+        for length in self._prefix_lengths:
+            carrier = self._carrier_prefixes.get(digits[:length])
+            if carrier is not None:
+                return carrier
+        return digits[:self.prefix_length]
+
+    def acquire(self, phone_number, now=None):
+        """
+        Take a token for one message to a phone number, or reserve the next one.
+
+        Args:
+            phone_number (int): Destination of the message.
+            now (float): time.monotonic(), taken when not given.
+
+        Returns:
+            float: 0 if the message may be sent now, otherwise the time in seconds until its reserved token is earned.
+            The message must then be sent after that time without calling acquire again.
+        """
+        key = self.key(phone_number)
+        rate, burst = self.carriers.get(key) or (self.rate, self.burst)
+        if not rate:
+            return 0.0
+        if now is None:
+            now = time.monotonic()
+
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                self._evict(now)
+                bucket = self._buckets[key] = [burst, now]
+            else:
+                bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+                bucket[1] = now
+                # Keep the buckets ordered by last use, least recent first
+                self._buckets.move_to_end(key)
+                self._evict(now)
+
+            bucket[0] -= 1
+            if bucket[0] >= 0:
+                return 0.0
+            self.throttled[key] += 1
+            return -bucket[0] / rate
+
+    def most_throttled(self, count=10):
+        """
+        Return the bucket keys with the most refused sends.
+
+        Args:
+            count (int): Number of keys to return.
+
+        Returns:
+            dict: Refused sends per key, largest first.
+        """
+        with self._lock:
+            return dict(self.throttled.most_common(count))
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def _evict(self, now):
+        # Called with the lock held. Looks at a couple of the least recently used buckets per call, which keeps up
+        # with the buckets being created without ever scanning the whole map.
+        for _ in range(2):
+            if not self._buckets:
+                return
+            key = next(iter(self._buckets))
+            tokens, updated = self._buckets[key]
+            rate, burst = self.carriers.get(key) or (self.rate, self.burst)
+            idle = now - updated
+            if idle < self.idle_timeout or tokens + idle * rate < burst:
+                return
+            del self._buckets[key]
+            self.evicted += 1
@@ -0,0 +1,235 @@
+import csv
+import itertools
+import json
+import logging
+import threading
+import time
+from datetime import datetime
+
+from sms_alert_forge.messages import Message
+from sms_alert_forge.queues import message_count, put_many
+
+TRACE_FIELDS = ('timestamp', 'phone', 'body', 'priority')
+CHUNK_SIZE = 1 << 20
+
+
+def read_lines(path, chunk_size=CHUNK_SIZE):
+    """
+    Stream the lines of a file with fixed-size binary reads, so memory use does not depend on the file size.
+
+    Args:
+        path (str): File to read.
+        chunk_size (int): Bytes read at a time.
+
+    Yields:
+        bytes: One line at a time, without its line ending.
+    """
+    with open(path, 'rb') as f:
+        remainder = b''
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            lines = (remainder + chunk).split(b'\n')
+            remainder = lines.pop()
+            for line in lines:
+                yield line.rstrip(b'\r')
+        if remainder:
+            yield remainder.rstrip(b'\r')
+
+
+def parse_timestamp(value):
+    """
+    Convert a trace timestamp, in seconds or ISO 8601, to seconds since the epoch.
+    """
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+def parse_csv(lines):
+    """
+    Parse CSV trace lines into (timestamp, phone, body, priority) records.
+
+    Columns are taken from a header row naming them when there is one, and are otherwise expected in that order.
+    Quoted bodies may contain commas and line breaks.
+    """
+    # csv needs the line endings back to keep line breaks inside quoted fields
+    rows = csv.reader(line.decode('utf-8') + '\n' for line in lines)
+    first = next(rows, None)
+    if first is None:
+        return
+    if first and first[0].strip().lower() == 'timestamp':
+        columns = [TRACE_FIELDS.index(name.strip().lower()) if name.strip().lower() in TRACE_FIELDS else None
+                   for name in first]
+    else:
+        columns = list(range(len(first)))
+        rows = itertools.chain([first], rows)
+
+    for row in rows:
+        if not row:
+            continue
+        record = [None] * len(TRACE_FIELDS)
+        for column, value in zip(columns, row):
+            if column is not None and column < len(TRACE_FIELDS):
+                record[column] = value
+        yield parse_timestamp(record[0]), record[1], record[2] or '', record[3] or None
+
+
+def parse_jsonl(lines):
+    """
+    Parse JSON Lines trace records, one object per line with the keys timestamp, phone, body and priority.
+    """
+    for line in lines:
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        yield (parse_timestamp(str(record['timestamp'])), record.get('phone', record.get('phone_number')),
+               record.get('body', ''), record.get('priority'))
+
+
+def read_trace(path, trace_format=None, chunk_size=CHUNK_SIZE):
+    """
+    Stream the records of a CSV or JSON Lines alert trace.
+
+    Args:
+        path (str): Trace file.
+        trace_format (str): 'csv' or 'jsonl', or None to choose from the file extension.
+        chunk_size (int): Bytes read at a time.
+
+    Returns:
+        iterator: (timestamp, phone, body, priority) records, read lazily.
+    """
+    if trace_format is None:
+        trace_format = 'jsonl' if path.endswith(('.jsonl', '.ndjson', '.json')) else 'csv'
+    if trace_format not in ('csv', 'jsonl'):
+        raise ValueError(f"Unknown trace format '{trace_format}'. Expected 'csv' or 'jsonl'.")
+    parse = parse_jsonl if trace_format == 'jsonl' else parse_csv
+    return parse(read_lines(path, chunk_size))
+
+
+def _phone_number(phone):
+    try:
+        return int(phone)
+    except (TypeError, ValueError):
+        return phone
+
+
+class TraceProducer(threading.Thread):
+    """
+    Class responsible for replaying a recorded alert trace into the message queue.
+
+    The trace is streamed through a generator pipeline (chunked reads, line splitting, parsing), so a trace of any size
+    is replayed in constant memory. Messages are enqueued at their original inter-arrival times divided by speed, or
+    as fast as the queue accepts them when speed is None or 0. Messages due together are enqueued together, up to
+    batch_size at a time. It is a drop-in replacement for MessageProducer.
+
+    Attributes:
+    - path: Trace file.
+    - message_queue: The queue to which the replayed messages are added.
+    - stop_event: Event to signal the thread to stop gracefully.
+    - num_senders: Number of sender threads.
+    - speed: Replay speed relative to the recording (2 replays twice as fast), or None for as fast as possible.
+    - trace_format: 'csv' or 'jsonl', or None to choose from the file extension.
+    - num_messages: Maximum number of messages to replay, or None for the whole trace.
+    - skip: Number of records at the start of the trace to skip, e.g. because an earlier run already replayed them.
+    - shard: (index, count) pair; only every count-th record, starting at index, is replayed by this producer.
+    - batch_size: Maximum number of messages enqueued together.
+    - deduplicator: Deduplicator that replayed messages pass through before they are queued, or None.
+    - messages_produced: Number of messages replayed so far, including any dropped as duplicates.
+    - lag: Largest delay in seconds between a message's scheduled replay time and its enqueueing.
+    - finishing: Whether finish() was called.
+    """
+
+    def __init__(self, path, message_queue, stop_event, num_senders, speed=1.0, trace_format=None, num_messages=None,
+                 skip=0, shard=(0, 1), batch_size=100, deduplicator=None):
+        super(TraceProducer, self).__init__()
+        self.path = path
+        self.message_queue = message_queue
+        self.stop_event = stop_event
+        self.num_senders = num_senders
+        self.speed = speed
+        self.trace_format = trace_format
+        self.num_messages = num_messages
+        self.skip = skip
+        self.shard = shard
+        self.batch_size = max(1, batch_size)
+        self.deduplicator = deduplicator
+        self.messages_produced = 0
+        self.lag = 0.0
+        self.finishing = False
+
+    def run(self):
+        try:
+            logging.info(f"TraceProducer started replaying {self.path}.")
+
+            records = read_trace(self.path, self.trace_format)
+            shard_index, shard_count = self.shard
+            if shard_count > 1:
+                records = itertools.islice(records, shard_index, None, shard_count)
+            records = itertools.islice(records, self.skip,
+                                       None if self.num_messages is None else self.skip + self.num_messages)
+            first_timestamp = None
+            start_time = time.monotonic()
+            batch = []
+            for timestamp, phone, body, priority in records:
+                if self.stop_event.is_set() or self.finishing:
+                    break
+
+                if self.speed:
+                    if first_timestamp is None:
+                        first_timestamp = timestamp
+                    due = start_time + (timestamp - first_timestamp) / self.speed
+                    delay = due - time.monotonic()
+                    if delay > 0:
+                        # Hand over what is already due before waiting for this record
+                        self._flush(batch)
+                        batch = []
+                        if self._wait(delay):
+                            break
+                    elif -delay > self.lag:
+                        self.lag = -delay
+
+                batch.append(Message(_phone_number(phone), body, priority, time.monotonic()))
+                if len(batch) >= self.batch_size:
+                    self._flush(batch)
+                    batch = []
+            self._flush(batch)
+
+            logging.info(f"TraceProducer completed after {self.messages_produced} messages "
+                         f"(largest replay lag {self.lag:.3f}s).")
+            # Signal that no more messages will be produced
+            for _ in range(self.num_senders):
+                self.message_queue.put(None)
+
+        except Exception as e:
+            logging.error(f"Error in TraceProducer: {e}", exc_info=True)
+
+    def finish(self):
+        """
+        Stop replaying after the messages already due. Unlike the stop event, the senders still get their sentinels
+        and send what is already queued.
+        """
+        self.finishing = True
+
+    def _wait(self, delay):
+        # Wait until the next record is due; returns True if the replay should end first
+        deadline = time.monotonic() + delay
+        while not self.finishing:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            if self.stop_event.wait(min(remaining, 0.1)):
+                return True
+        return True
+
+    def _flush(self, batch):
+        if batch:
+            self.messages_produced += len(batch)
+            if self.deduplicator is not None:
+                batch = self.deduplicator.filter(batch)
+            unsent = put_many(self.message_queue, batch)
+            # Records a stopped queue turned away are replayed again by a resumed run
+            self.messages_produced -= message_count(unsent)
+            logging.debug("Replayed %d messages (%d so far)", len(batch), self.messages_produced)
@@ -0,0 +1,184 @@
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+
+from sms_alert_forge.messages import Message
+from sms_alert_forge.queues import put_many
+
+
+def backoff_delay(attempt, base_delay, max_delay, jitter, rng=random):
+    """
+    Return the delay before the next attempt of a message that has failed attempt times.
+
+    The delay doubles with every failed attempt up to max_delay, and a random fraction of up to jitter of it is taken
+    off so that messages which failed together do not all come back at the same moment.
+
+    Args:
+        attempt (int): Number of failed attempts so far (1 after the first failure).
+        base_delay (float): Delay after the first failure in seconds.
+        max_delay (float): Upper bound of the delay in seconds.
+        jitter (float): Largest fraction of the delay removed at random, between 0 and 1.
+        rng (random.Random): Source of randomness, the shared module-level generator by default.
+
+    Returns:
+        float: Delay in seconds.
+    """
+    delay = min(max_delay, base_delay * (1 << min(attempt - 1, 62)))
+    return delay * (1 - jitter * rng.random())
+
+
+class RetryScheduler(threading.Thread):
+    """
+    Class responsible for putting failed messages back on the send queue after an exponential backoff.
+
+    Senders hand a failed message to schedule(), which only pushes it onto a min-heap keyed by its next attempt time,
+    so no sender ever waits for a retry. This thread sleeps until the earliest attempt is due and re-injects every due
+    message into the queue. Because retried messages can arrive after the producer has finished, the scheduler rather
+    than the producer puts the None sentinels on the queue: once the producer is done, every message taken from the
+    queue has been marked done by its sender and no retry is pending.
+
+    Attributes:
+    - message_queue: The queue the senders take messages from.
+    - stop_event: Event to signal the thread to stop gracefully.
+    - num_senders: Number of senders to send a None sentinel to at the end.
+    - producer: The producer thread; no sentinels are sent before it has finished.
+    - max_attempts: Maximum number of attempts per message, including the first.
+    - base_delay: Delay after the first failure in seconds.
+    - max_delay: Upper bound of the delay in seconds.
+    - jitter: Largest fraction of a delay removed at random.
+    - retries_scheduled: Number of failed attempts scheduled for another try.
+    - retries_exhausted: Number of messages that failed on their last allowed attempt.
+    - deferrals: Number of messages deferred by defer().
+    """
+
+    def __init__(self, message_queue, stop_event, num_senders, producer=None, max_attempts=3, base_delay=0.1,
+                 max_delay=5.0, jitter=0.5):
+        super(RetryScheduler, self).__init__()
+        self.message_queue = message_queue
+        self.stop_event = stop_event
+        self.num_senders = num_senders
+        self.producer = producer
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = min(max(jitter, 0.0), 1.0)
+        self.retries_scheduled = 0
+        self.retries_exhausted = 0
+        self.deferrals = 0
+        self._heap = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+
+    @property
+    def pending(self):
+        """
+        Number of messages waiting for their next attempt.
+        """
+        return len(self._heap)
+
+    def schedule(self, message):
+        """
+        Schedule another attempt of a message whose send just failed.
+
+        Must be called before the sender marks the message done on the queue.
+
+        Args:
+            message (tuple): The failed message; plain (phone_number, body) tuples are wrapped in a Message.
+
+        Returns:
+            bool: True if the message will be retried, False if it has used up its attempts.
+        """
+        if not isinstance(message, Message):
+            message = Message(*message)
+        attempt = message.attempts + 1
+        with self._condition:
+            if attempt >= self.max_attempts:
+                self.retries_exhausted += 1
+                return False
+            due = time.monotonic() + backoff_delay(attempt, self.base_delay, self.max_delay, self.jitter)
+            # A new attempt asks the rate limiter for a token of its own
+            heapq.heappush(self._heap, (due, next(self._sequence), message._replace(attempts=attempt, deferred=0.0)))
+            self.retries_scheduled += 1
+            if self._heap[0][0] == due:
+                self._condition.notify()
+        return True
+
+    def defer(self, message, delay):
+        """
+        Put a message that may not be sent yet, e.g. because of a rate limit, back on the queue after a delay.
+
+        Unlike schedule(), this does not count as an attempt. The delay is added to the message's deferred time. Must be
+        called before the sender marks the message done on the queue.
+
+        Args:
+            message (tuple): The message; plain (phone_number, body) tuples are wrapped in a Message.
+            delay (float): Time in seconds until the message may be sent.
+        """
+        if not isinstance(message, Message):
+            message = Message(*message)
+        due = time.monotonic() + delay
+        with self._condition:
+            heapq.heappush(self._heap, (due, next(self._sequence), message._replace(deferred=message.deferred + delay)))
+            self.deferrals += 1
+            if self._heap[0][0] == due:
+                self._condition.notify()
+
+    def take_pending(self):
+        """
+        Remove and return every message waiting for its next attempt, e.g. to checkpoint them once the run stopped.
+
+        Returns:
+            list: The messages, earliest due first.
+        """
+        with self._condition:
+            pending = [entry[2] for entry in sorted(self._heap)]
+            self._heap = []
+        return pending
+
+    def run(self):
+        try:
+            logging.info("RetryScheduler started.")
+
+            while not self.stop_event.is_set():
+                with self._condition:
+                    now = time.monotonic()
+                    due = []
+                    while self._heap and self._heap[0][0] <= now:
+                        due.append(heapq.heappop(self._heap)[2])
+                    if not due:
+                        if self._finished():
+                            break
+                        # Wake up for the next due message, or periodically to check whether the run is finished
+                        self._condition.wait(min(self._heap[0][0] - now, 0.05) if self._heap else 0.05)
+                        continue
+
+                # Re-inject outside the lock: a full queue may block this thread, but never a sender scheduling a retry
+                unsent = put_many(self.message_queue, due)
+                if unsent:
+                    # The stop event released a blocked put; keep the rest pending so it is checkpointed
+                    with self._condition:
+                        for message in unsent:
+                            heapq.heappush(self._heap, (now, next(self._sequence), message))
+                logging.debug("Re-injected %d messages for retry", len(due) - len(unsent))
+
+            logging.info(f"RetryScheduler completed: {self.retries_scheduled} retries, "
+                         f"{self.retries_exhausted} messages out of attempts.")
+            # Signal that no more messages will be produced or retried
+            for _ in range(self.num_senders):
+                self.message_queue.put(None)
+
+        except Exception as e:
+            logging.error(f"Error in RetryScheduler: {e}", exc_info=True)
+
+    def _finished(self):
+        # Called with the lock held, only from this thread, which is the only one taking messages out of the heap.
+        # Senders schedule a retry before marking its message done, so once no message is unfinished every retry is
+        # already in the heap.
+        if self.producer is not None and self.producer.is_alive():
+            return False
+        with self.message_queue.mutex:
+            unfinished = self.message_queue.unfinished_tasks
+        return unfinished == 0 and not self._heap
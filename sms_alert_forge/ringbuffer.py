@@ -0,0 +1,193 @@
+import collections
+import mmap
+import os
+import struct
+
+from sms_alert_forge.messages import Message
+
+# Matches producer.MESSAGE_LENGTH
+DEFAULT_BODY_SIZE = 100
+
+MAGIC = b'SMSRING1'
+# magic, capacity, body_size, write_seq, read_seq, acked_seq, produced, finished
+_HEADER = struct.Struct('<8sQQQQQQQ')
+HEADER_SIZE = 64
+# phone_number, created_at, priority index, attempts, body length
+_RECORD = struct.Struct('<QdBBH')
+_NO_PRIORITY = 255
+
+
+class MmapRingBuffer:
+    """
+    Fixed-record ring buffer in a memory-mapped file, with its read, write and acknowledged offsets kept in the file.
+
+    Records are written in place into the mapping and read back with struct.unpack_from, without read() or write()
+    calls or intermediate buffers, and any process that maps the same file sees them. Offsets are sequence numbers
+    that only grow; a record lives in slot seq % capacity. A slot is reused only once its record has been
+    acknowledged, and acknowledgements may arrive out of order: acked_seq advances over the contiguous acknowledged
+    prefix. Because the offsets live in the mapping, they survive the process being killed. Reopening the file
+    delivers again every record that was written but not acknowledged, so nothing is lost and at most the messages in
+    flight at the time of the crash are sent twice.
+
+    The object is deque-compatible (append, popleft, len), so it can serve as the storage of a queue.Queue; see
+    DurableQueue. None sentinels are kept in memory and delivered once every record has been read.
+
+    Attributes:
+    - path: File backing the buffer.
+    - capacity: Number of record slots.
+    - body_size: Maximum encoded message body length in bytes.
+    - priorities: Priority class names, stored in records by index.
+    - record_size: Size of one record in bytes.
+    - resumed: Number of unacknowledged records found when the file was opened.
+    - finished: Whether a None sentinel was appended, i.e. the writer had produced everything it was going to.
+    """
+
+    def __init__(self, path, capacity=65536, body_size=DEFAULT_BODY_SIZE, priorities=None):
+        self.path = path
+        self.priorities = list(priorities or ())
+        if len(self.priorities) >= _NO_PRIORITY:
+            raise ValueError(f"At most {_NO_PRIORITY - 1} priority classes can be stored.")
+        self._priority_index = {name: i for i, name in enumerate(self.priorities)}
+
+        exists = os.path.exists(path) and os.path.getsize(path) >= HEADER_SIZE
+        with open(path, 'r+b' if exists else 'w+b') as f:
+            if exists:
+                magic, capacity, body_size = _HEADER.unpack(f.read(_HEADER.size))[:3]
+                if magic != MAGIC:
+                    raise ValueError(f"{path} is not a message ring buffer.")
+            self.capacity = capacity
+            self.body_size = body_size
+            self.record_size = _RECORD.size + body_size
+            size = HEADER_SIZE + capacity * self.record_size
+            if not exists:
+                f.truncate(size)
+            self._mmap = mmap.mmap(f.fileno(), size)
+
+        if exists:
+            header = _HEADER.unpack_from(self._mmap, 0)
+            self.write_seq, _, self.acked_seq, self.produced, finished = header[3:]
+            self.finished = bool(finished)
+        else:
+            self.write_seq = self.acked_seq = self.produced = 0
+            self.finished = False
+        # Everything written but not acknowledged before the file was closed (or the process died) is read again
+        self.read_seq = self.acked_seq
+        self.resumed = self.write_seq - self.acked_seq
+        self._acked = set()
+        self._in_flight = {}
+        self._sentinels = collections.deque()
+        self._write_header()
+
+    def free(self):
+        """
+        Return the number of slots that can be written without overwriting an unacknowledged record.
+        """
+        return self.capacity - (self.write_seq - self.acked_seq)
+
+    def pending(self):
+        """
+        Return the number of records written but not yet acknowledged.
+        """
+        return self.write_seq - self.acked_seq
+
+    def append(self, message):
+        if message is None:
+            self._sentinels.append(message)
+            if not self.finished:
+                self.finished = True
+                self._write_header()
+            return
+        if not self.free():
+            raise OverflowError(f"Ring buffer {self.path} is full.")
+
+        phone_number, body = message[0], message[1]
+        body = body.encode('utf-8') if isinstance(body, str) else bytes(body)
+        if len(body) > self.body_size:
+            raise ValueError(f"Message body of {len(body)} bytes does not fit a {self.body_size}-byte record.")
+        priority = self._priority_index.get(getattr(message, 'priority', None), _NO_PRIORITY)
+        attempts = getattr(message, 'attempts', 0)
+
+        offset = HEADER_SIZE + (self.write_seq % self.capacity) * self.record_size
+        _RECORD.pack_into(self._mmap, offset, int(phone_number), getattr(message, 'created_at', 0.0), priority,
+                          min(attempts, 255), len(body))
+        self._mmap[offset + _RECORD.size:offset + _RECORD.size + len(body)] = body
+        # Publish the record only after it is complete
+        self.write_seq += 1
+        if not attempts:
+            self.produced += 1
+        self._write_header()
+
+    def popleft(self):
+        if self.read_seq == self.write_seq:
+            return self._sentinels.popleft()
+
+        seq = self.read_seq
+        message = self._read(seq)
+        self.read_seq += 1
+        self._in_flight[id(message)] = seq
+        self._write_header()
+        return message
+
+    def view(self, seq):
+        """
+        Return a zero-copy view of a record's encoded body, valid until the slot is reused.
+
+        Args:
+            seq (int): Sequence number of a written, unacknowledged record.
+
+        Returns:
+            memoryview: The body bytes inside the mapping.
+        """
+        offset = HEADER_SIZE + (seq % self.capacity) * self.record_size
+        length = _RECORD.unpack_from(self._mmap, offset)[4]
+        return memoryview(self._mmap)[offset + _RECORD.size:offset + _RECORD.size + length]
+
+    def ack(self, message):
+        """
+        Acknowledge a message returned by popleft, freeing its slot once every earlier record is acknowledged too.
+
+        Args:
+            message (Message): The message, as returned by popleft.
+        """
+        seq = self._in_flight.pop(id(message), None)
+        if seq is None:
+            return
+        self._acked.add(seq)
+        while self.acked_seq in self._acked:
+            self._acked.remove(self.acked_seq)
+            self.acked_seq += 1
+        self._write_header()
+
+    def reset(self):
+        """
+        Discard every record and start over with empty offsets.
+        """
+        self.write_seq = self.read_seq = self.acked_seq = self.produced = self.resumed = 0
+        self.finished = False
+        self._acked.clear()
+        self._in_flight.clear()
+        self._write_header()
+
+    def close(self):
+        """
+        Write the mapping back to the file and unmap it.
+        """
+        self._mmap.flush()
+        self._mmap.close()
+
+    def _read(self, seq):
+        offset = HEADER_SIZE + (seq % self.capacity) * self.record_size
+        phone_number, created_at, priority, attempts, length = _RECORD.unpack_from(self._mmap, offset)
+        body = str(self._mmap[offset + _RECORD.size:offset + _RECORD.size + length], 'utf-8')
+        priority = self.priorities[priority] if priority != _NO_PRIORITY else None
+        return Message(phone_number, body, priority, created_at, attempts)
+
+    def _write_header(self):
+        _HEADER.pack_into(self._mmap, 0, MAGIC, self.capacity, self.body_size, self.write_seq, self.read_seq,
+                          self.acked_seq, self.produced, self.finished)
+
+    def __len__(self):
+        return self.write_seq - self.read_seq + len(self._sentinels)
+
+    def __bool__(self):
+        return len(self) > 0
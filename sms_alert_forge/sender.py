@@ -3,22 +3,76 @@ import random
 import threading
 import time
 
+from sms_alert_forge.histogram import ClassStats, LatencyHistogram
+from sms_alert_forge.messages import MessageBatch
+from sms_alert_forge.queues import get_many, mark_done
+from sms_alert_forge.tracing import FAILED, RETRIED, SENT, LatencyTrace
+
+
+def sample_processing_time(mean_processing_time, rng=random):
+    """
+    Draw the simulated time taken to send one message.
+
+    Args:
+        mean_processing_time (float): The mean time taken to process a message.
+        rng (random.Random): Source of randomness, the shared module-level generator by default.
+
+    Returns:
+        float: Processing time in seconds (may be negative; callers clamp before sleeping).
+    """
+    return rng.gauss(mean_processing_time, 0.1 * mean_processing_time)
+
 
 class MessageSender(threading.Thread):
     """
     Class responsible for simulating the sending of SMS messages from a queue.
 
+    With a batch_size above 1 the sender drains up to batch_size messages at once (waiting at most max_batch_wait
+    milliseconds for the batch to fill) and submits them as one request: the batch takes a single simulated processing
+    time, each message in it succeeds or fails independently, and the counters are updated once per batch.
+
+    A MessageBatch taken from the queue is sent straight from its columns, without building a record per message: one
+    message per processing time, or batch_size messages per processing time when batch_size is above 1.
+
+    With a retry_scheduler, a failed message is handed to the scheduler for another attempt after a backoff and the
+    sender moves straight on; only messages that have used up their attempts count as failed. Every message taken from
+    the queue is marked done once it has been handled, which lets the scheduler tell when the run is finished.
+
+    With a transport, messages are really submitted to a gateway (see sms_alert_forge.transport) instead of the
+    simulated sleep and random failure; processing times are then the measured request times.
+
+    With a rate_limiter, a message whose destination is over its rate limit is not sent: it is handed to the retry
+    scheduler to come back once its bucket has a token, and the sender moves straight on.
+
     Attributes:
     - message_queue: The queue from which messages are retrieved for sending.
     - failure_rate: The rate at which message sending can fail.
-    - mean_processing_time: The mean time taken to process a message.
+    - mean_processing_time: The mean time taken to process a message (or a batch).
     - messages_sent: Number of messages successfully sent.
     - messages_failed: Number of messages that failed to be sent.
     - total_processing_time: Total time taken to process all messages.
+    - latency_histogram: Latencies of all sent and failed messages.
+    - class_stats: Counts and end-to-end latencies per priority class.
     - stop_event: Event to signal the thread to stop gracefully.
+    - batch_size: Maximum number of messages submitted together.
+    - max_batch_wait: Maximum time in milliseconds to wait for a batch to fill.
+    - batches_sent: Number of batches submitted.
+    - retry_scheduler: RetryScheduler that failed messages are handed to, or None to drop them.
+    - messages_retried: Number of failed attempts handed to the retry scheduler.
+    - retry_successes: Number of messages sent successfully after at least one retry.
+    - transport: Transport that messages are submitted through, or None to simulate sending.
+    - busy_time: Total time spent sending, which with the message counters gives the mean service time per message.
+    - retired: Whether the sender was asked to exit early; see retire().
+    - rate_limiter: RateLimiter that every send needs a token from, or None. Requires a retry_scheduler.
+    - messages_throttled: Number of sends deferred by the rate limiter.
+    - deferral_histogram: Total time each deferred message was held back, recorded when it is sent.
+    - first_sent_at: time.perf_counter() when the first message was sent successfully, or None.
+    - spans: SpanTimer splitting the sender's time into dequeue, send and account phases when profiling, else None.
+    - trace: LatencyTrace with the enqueue, dequeue and completion time of every send attempt, or None.
     """
 
-    def __init__(self, message_queue, failure_rate, mean_processing_time, stop_event):
+    def __init__(self, message_queue, failure_rate, mean_processing_time, stop_event, batch_size=1, max_batch_wait=0,
+                 retry_scheduler=None, transport=None, rate_limiter=None, trace_capacity=None):
         super(MessageSender, self).__init__()
         self.message_queue = message_queue
         self.failure_rate = failure_rate
@@ -26,34 +80,262 @@ class MessageSender(threading.Thread):
         self.messages_sent = 0
         self.messages_failed = 0
         self.total_processing_time = 0
+        self.latency_histogram = LatencyHistogram()
+        self.class_stats = ClassStats()
         self.stop_event = stop_event
+        self.batch_size = max(1, batch_size)
+        self.max_batch_wait = max_batch_wait
+        self.batches_sent = 0
+        self.retry_scheduler = retry_scheduler
+        self.messages_retried = 0
+        self.retry_successes = 0
+        self.transport = transport
+        self.busy_time = 0.0
+        self.retired = False
+        self.rate_limiter = rate_limiter
+        self.messages_throttled = 0
+        self.deferral_histogram = LatencyHistogram()
+        self.first_sent_at = None
+        self.spans = None
+        self.trace = LatencyTrace(trace_capacity) if trace_capacity is not None else None
 
     def run(self):
         try:
             logging.info("MessageSender started.")
 
-            while not self.stop_event.is_set():
-                message = self.message_queue.get()
+            if self.batch_size > 1:
+                self._run_batched()
+            else:
+                self._run_single()
+
+            logging.info("MessageSender completed.")
+
+        except Exception as e:
+            logging.error(f"Error in MessageSender: {e}", exc_info=True)
+
+    def retire(self):
+        """
+        Ask the sender to exit once it has handled the message it is sending, or the next one it takes.
+        """
+        self.retired = True
+
+    def _run_single(self):
+        while not self.stop_event.is_set() and not self.retired:
+            message = self.message_queue.get()
+            if self.trace is not None:
+                dequeued = time.monotonic()
+            if self.spans is not None:
+                self.spans.mark('dequeue')
+
+            if message is None:
+                break  # No more messages to send
 
-                if message is None:
-                    break  # No more messages to send
+            if isinstance(message, MessageBatch):
+                self._send_columnar(message)
+                continue
 
-                phone_number, _ = message
+            phone_number = message[0]
 
-                processing_time = random.gauss(self.mean_processing_time, 0.1 * self.mean_processing_time)
-                time.sleep(max(processing_time, 0))
+            delay = self._throttle(phone_number, getattr(message, 'deferred', 0.0))
+            if delay:
+                self.retry_scheduler.defer(message, delay)
+                mark_done(self.message_queue, (message,))
+                if self.spans is not None:
+                    self.spans.mark('account')
+                continue
 
-                if random.random() < self.failure_rate:
+            processing_time, (failed,) = self._deliver((message,))
+            self.latency_histogram.record(processing_time)
+
+            if failed and self._retry(message):
+                logging.debug("Message to %s failed, retry scheduled", phone_number)
+                outcome = RETRIED
+            else:
+                outcome = FAILED if failed else SENT
+                self.class_stats.record(message, failed, time.monotonic())
+                if failed:
                     self.messages_failed += 1
                     logging.warning("Message sending failed.")
-                    logging.debug(f"Debug statement: Failed to send message to {phone_number}")
+                    logging.debug("Debug statement: Failed to send message to %s", phone_number)
                 else:
                     self.messages_sent += 1
                     self.total_processing_time += processing_time
-                    logging.debug(f"Message sent successfully to {phone_number}. Processing time: {processing_time}")
+                    if getattr(message, 'attempts', 0):
+                        self.retry_successes += 1
+                    logging.debug("Message sent successfully to %s. Processing time: %s", phone_number,
+                                  processing_time)
+            if self.trace is not None:
+                self.trace.record((getattr(message, 'created_at', 0.0),), dequeued, time.monotonic(), (outcome,),
+                                  (getattr(message, 'attempts', 0),))
+            mark_done(self.message_queue, (message,))
+            if self.spans is not None:
+                self.spans.mark('account')
 
-            logging.info("MessageSender completed.")
+    def _run_batched(self):
+        while not self.stop_event.is_set() and not self.retired:
+            messages = get_many(self.message_queue, self.batch_size, self.max_batch_wait / 1000)
+            dequeued = time.monotonic() if self.trace is not None else None
+            if self.spans is not None:
+                self.spans.mark('dequeue')
 
-        except Exception as e:
-            logging.error(f"Error in MessageSender: {e}", exc_info=True)
+            finished = messages[-1] is None
+            if finished:
+                messages.pop()  # No more messages to send
+
+            columnar = [message for message in messages if isinstance(message, MessageBatch)]
+            if columnar:
+                messages = [message for message in messages if not isinstance(message, MessageBatch)]
+                for batch in columnar:
+                    self._send_columnar(batch)
+
+            if messages and self.rate_limiter is not None:
+                allowed = []
+                deferred = []
+                for message in messages:
+                    delay = self._throttle(message[0], getattr(message, 'deferred', 0.0))
+                    if delay:
+                        self.retry_scheduler.defer(message, delay)
+                        deferred.append(message)
+                    else:
+                        allowed.append(message)
+                if deferred:
+                    mark_done(self.message_queue, deferred)
+                messages = allowed
+
+            if messages:
+                self._send_batch(messages, dequeued)
+
+            if finished:
+                break
+
+    def _send_batch(self, messages, dequeued=None):
+        processing_time, failures = self._deliver(messages)
+        self.latency_histogram.record(processing_time, len(messages))
+
+        now = time.monotonic()
+        failed = retried = 0
+        outcomes = [SENT] * len(messages) if self.trace is not None else None
+        for index, (message, message_failed) in enumerate(zip(messages, failures)):
+            if message_failed and self._retry(message):
+                retried += 1
+                if outcomes:
+                    outcomes[index] = RETRIED
+                continue
+            if message_failed and outcomes:
+                outcomes[index] = FAILED
+            self.class_stats.record(message, message_failed, now)
+            if message_failed:
+                failed += 1
+            elif getattr(message, 'attempts', 0):
+                self.retry_successes += 1
+        sent = len(messages) - failed - retried
+
+        self.batches_sent += 1
+        self.messages_failed += failed
+        self.messages_sent += sent
+        self.total_processing_time += processing_time * sent
+
+        if self.trace is not None:
+            self.trace.record([getattr(message, 'created_at', 0.0) for message in messages], dequeued, now, outcomes,
+                              [getattr(message, 'attempts', 0) for message in messages])
+        mark_done(self.message_queue, messages)
+
+        if failed:
+            logging.warning("%d of %d messages in batch failed.", failed, len(messages))
+        logging.debug("Batch of %d messages sent. Processing time: %s", len(messages), processing_time)
+        if self.spans is not None:
+            self.spans.mark('account')
+
+    def _send_columnar(self, batch):
+        # Every chunk of the batch is one send request: a single message, or batch_size messages when batching
+        for start in range(0, len(batch), self.batch_size):
+            end = min(start + self.batch_size, len(batch))
+            indexes = range(start, end)
+            if self.rate_limiter is not None:
+                allowed = []
+                for index in indexes:
+                    delay = self._throttle(batch.phone_numbers[index])
+                    if delay:
+                        self.retry_scheduler.defer(batch.message(index), delay)
+                    else:
+                        allowed.append(index)
+                if not allowed:
+                    continue
+                indexes = allowed
+
+            # The simulated send only needs the count; a real one needs the records
+            chunk = indexes if self.transport is None else [batch.message(i) for i in indexes]
+            # A chunk is taken up when its send starts; until then it waits in the sender behind the earlier chunks
+            dequeued = time.monotonic() if self.trace is not None else None
+            processing_time, failures = self._deliver(chunk)
+            self.latency_histogram.record(processing_time, len(indexes))
+
+            failed = retried = 0
+            outcomes = [SENT] * len(indexes) if self.trace is not None else None
+            for position, (index, message_failed) in enumerate(zip(indexes, failures)):
+                if message_failed:
+                    if self._retry(batch.message(index)):
+                        retried += 1
+                        if outcomes:
+                            outcomes[position] = RETRIED
+                    else:
+                        failed += 1
+                        if outcomes:
+                            outcomes[position] = FAILED
+            sent = len(indexes) - failed - retried
+
+            if batch.priority is not None:
+                self.class_stats.add(batch.priority, sent, failed, time.monotonic() - batch.created_at)
+            if self.batch_size > 1:
+                self.batches_sent += 1
+            self.messages_failed += failed
+            self.messages_sent += sent
+            self.total_processing_time += processing_time * sent
+
+            if self.trace is not None:
+                self.trace.record([batch.created_at] * len(indexes), dequeued, time.monotonic(), outcomes)
+            if failed:
+                logging.warning("%d of %d messages in batch failed.", failed, len(indexes))
+            if self.spans is not None:
+                self.spans.mark('account')
+        mark_done(self.message_queue, (batch,))
+        logging.debug("Columnar batch of %d messages sent.", len(batch))
+
+    def _deliver(self, messages):
+        # Send messages as one request; returns the processing time and whether each message failed
+        if self.transport is not None:
+            start = time.perf_counter()
+            accepted = self.transport.send(messages)
+            processing_time = time.perf_counter() - start
+            self.busy_time += processing_time
+            failures = [not ok for ok in accepted]
+        else:
+            processing_time = sample_processing_time(self.mean_processing_time)
+            time.sleep(max(processing_time, 0))
+            self.busy_time += max(processing_time, 0)
+            failures = [random.random() < self.failure_rate for _ in messages]
+        if self.first_sent_at is None and not all(failures):
+            self.first_sent_at = time.perf_counter()
+        if self.spans is not None:
+            self.spans.mark('send')
+        return processing_time, failures
+
+    def _throttle(self, phone_number, deferred=0.0):
+        # Time until a rate-limited destination may be sent to, 0 when it may be sent to now. A message that was
+        # deferred before comes back when its reserved token is due.
+        if self.rate_limiter is None:
+            return 0.0
+        if deferred:
+            self.deferral_histogram.record(deferred)
+            return 0.0
+        delay = self.rate_limiter.acquire(phone_number)
+        if delay:
+            self.messages_throttled += 1
+        return delay
 
+    def _retry(self, message):
+        # Hand a failed message to the retry scheduler; False when there is none or the message is out of attempts
+        if self.retry_scheduler is None or not self.retry_scheduler.schedule(message):
+            return False
+        self.messages_retried += 1
+        return True
@@ -0,0 +1,300 @@
+import copy
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+from array import array
+from multiprocessing import shared_memory
+
+from sms_alert_forge.histogram import BUCKET_COUNT, LatencyHistogram
+from sms_alert_forge.logpipeline import flush_logging
+from sms_alert_forge.pipeline import build_pipeline
+from sms_alert_forge.queues import DurableQueue, put_many
+from sms_alert_forge.shutdown import GracefulShutdown, read_checkpoint, save_checkpoint
+from sms_alert_forge.tracing import trace_report
+
+COUNTER_FIELDS = ('messages_sent', 'messages_failed', 'total_processing_time', 'max_latency')
+
+
+class SharedCounters:
+    """
+    Per-worker sender counters and latency histograms stored in a multiprocessing.shared_memory block.
+
+    Every worker owns one slot and is its only writer, so slots are updated without locks and the monitor reads them
+    directly from shared memory. The block holds all counter slots followed by all histogram bucket arrays.
+
+    Attributes:
+    - num_workers: Number of worker slots in the block.
+    - name: Name of the shared memory block.
+    """
+
+    def __init__(self, num_workers):
+        self.num_workers = num_workers
+        self._shm = shared_memory.SharedMemory(create=True, size=self._block_size(num_workers))
+        self._attach()
+        for i in range(len(self._values)):
+            self._values[i] = 0.0
+        for i in range(len(self._buckets)):
+            self._buckets[i] = 0
+        self.name = self._shm.name
+
+    @staticmethod
+    def _block_size(num_workers):
+        return num_workers * (len(COUNTER_FIELDS) + BUCKET_COUNT) * 8
+
+    def _attach(self):
+        split = self.num_workers * len(COUNTER_FIELDS) * 8
+        self._values = self._shm.buf[:split].cast('d')
+        self._buckets = self._shm.buf[split:self._block_size(self.num_workers)].cast('Q')
+
+    def write(self, worker, messages_sent, messages_failed, total_processing_time, latency_histogram):
+        offset = worker * len(COUNTER_FIELDS)
+        self._values[offset] = messages_sent
+        self._values[offset + 1] = messages_failed
+        self._values[offset + 2] = total_processing_time
+        self._values[offset + 3] = latency_histogram.max_value
+        self._buckets[worker * BUCKET_COUNT:(worker + 1) * BUCKET_COUNT] = latency_histogram.counts
+
+    def read(self, worker):
+        offset = worker * len(COUNTER_FIELDS)
+        return tuple(self._values[offset:offset + len(COUNTER_FIELDS)])
+
+    def read_histogram(self, worker):
+        latency_histogram = LatencyHistogram(array('Q', self._buckets[worker * BUCKET_COUNT:(worker + 1) * BUCKET_COUNT]))
+        latency_histogram.max_value = self.read(worker)[3]
+        return latency_histogram
+
+    def close(self, unlink=False):
+        self._values.release()
+        self._buckets.release()
+        self._shm.close()
+        if unlink:
+            self._shm.unlink()
+
+    def __getstate__(self):
+        return {'num_workers': self.num_workers, 'name': self.name}
+
+    def __setstate__(self, state):
+        # Workers started with the spawn method attach to the block by name
+        self.num_workers = state['num_workers']
+        self.name = state['name']
+        self._shm = shared_memory.SharedMemory(name=self.name)
+        self._attach()
+
+
+def run_shard(config, worker, num_messages, counters, stop_flag, drain_flag=None, resume=False):
+    """
+    Run one shard of the workload: a producer and a sender pool inside the current worker process.
+
+    Counters are published to the worker's shared memory slot every progress monitor update interval and once more
+    when the shard has finished. Signals are left to the parent process, which drains or stops the shards through
+    drain_flag and stop_flag; a shard that was drained or stopped writes its own checkpoint.
+
+    Args:
+        config (dict): Configuration parameters, with the producer rate already scaled to this shard.
+        worker (int): Index of this worker's counter slot.
+        num_messages (int): Number of messages this shard produces, or None to replay its whole share of a trace.
+        counters (SharedCounters): Shared memory block holding the per-worker counters.
+        stop_flag (multiprocessing.Event): Event set by the parent process to stop the shard.
+        drain_flag (multiprocessing.Event): Event set by the parent process to drain the shard, or None.
+        resume (bool): Whether to continue from this shard's checkpoint, if there is one.
+    """
+    try:
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        logging.info(f"Shard {worker} started with "
+                     f"{'its share of the trace' if num_messages is None else f'{num_messages} messages'}.")
+
+        shutdown_config = config.get('shutdown') or {}
+        checkpoint_path = shutdown_config.get('checkpoint_path', 'checkpoint.bin')
+        backlog = []
+        previous = None
+        if resume and os.path.exists(checkpoint_path):
+            backlog, previous = read_checkpoint(checkpoint_path)
+            logging.info(f"Shard {worker} resuming from {checkpoint_path} with {len(backlog)} unsent messages.")
+
+        stop_event = threading.Event()
+        message_queue, producer, senders, retry_scheduler, autoscaler = build_pipeline(
+            config, stop_event, num_messages=num_messages, produced=previous['messages_produced'] if previous else 0)
+        shutdown = GracefulShutdown(stop_event, producer, senders, shutdown_config.get('drain_timeout', 10.0))
+
+        for sender in senders:
+            sender.start()
+        if backlog:
+            put_many(message_queue, backlog)
+        producer.start()
+        if retry_scheduler:
+            retry_scheduler.start()
+        if autoscaler:
+            autoscaler.start()
+
+        update_interval = config['progress_monitor']['update_interval']
+        while any(sender.is_alive() for sender in senders):
+            if stop_flag.wait(update_interval):
+                stop_event.set()
+                break
+            if drain_flag is not None and drain_flag.is_set() and not shutdown.requested.is_set():
+                shutdown.request()
+            counters.write(worker, *_sender_totals(senders))
+
+        producer.join()
+        if retry_scheduler:
+            retry_scheduler.join()
+        if autoscaler:
+            autoscaler.join()
+        for sender in senders:
+            sender.join()
+        counters.write(worker, *_sender_totals(senders))
+        counters.close()
+        tracing_config = config.get('tracing') or {}
+        if tracing_config.get('enabled'):
+            latency_breakdown = trace_report([sender.trace for sender in senders], tracing_config.get('path'))
+            logging.info(f"Shard {worker} latency breakdown: {latency_breakdown}")
+        if shutdown.requested.is_set() or stop_event.is_set():
+            save_checkpoint(checkpoint_path, message_queue, retry_scheduler, producer, senders, previous)
+        elif previous:
+            os.remove(checkpoint_path)
+        if isinstance(message_queue, DurableQueue):
+            message_queue.close()
+        transport = getattr(senders[0], 'transport', None) if senders else None
+        if transport:
+            transport.close()
+        logging.info(f"Shard {worker} completed.")
+
+    except Exception as e:
+        logging.error(f"Error in shard {worker}: {e}", exc_info=True)
+
+    finally:
+        # Worker processes exit without running atexit handlers, so write out the queued log records here
+        flush_logging()
+
+
+def _sender_totals(senders):
+    latency_histogram = LatencyHistogram()
+    for sender in senders:
+        latency_histogram.merge(sender.latency_histogram)
+    return (sum(sender.messages_sent for sender in senders),
+            sum(sender.messages_failed for sender in senders),
+            sum(sender.total_processing_time for sender in senders),
+            latency_histogram)
+
+
+class WorkerShard:
+    """
+    View of one worker process that ProgressMonitor can watch like a sender.
+
+    Attributes:
+    - process: The worker process running the shard.
+    - counters: Shared memory block holding the per-worker counters.
+    - worker: Index of this worker's counter slot.
+    """
+
+    def __init__(self, process, counters, worker):
+        self.process = process
+        self.counters = counters
+        self.worker = worker
+
+    @property
+    def messages_sent(self):
+        return int(self.counters.read(self.worker)[0])
+
+    @property
+    def messages_failed(self):
+        return int(self.counters.read(self.worker)[1])
+
+    @property
+    def total_processing_time(self):
+        return self.counters.read(self.worker)[2]
+
+    @property
+    def latency_histogram(self):
+        return self.counters.read_histogram(self.worker)
+
+    def start(self):
+        # Empty the log buffers first so the forked worker does not inherit and re-write pending records
+        flush_logging()
+        self.process.start()
+
+    def join(self, timeout=None):
+        self.process.join(timeout)
+
+    def is_alive(self):
+        return self.process.is_alive()
+
+
+class ShardedSenderPool:
+    """
+    Class responsible for sharding the workload across worker processes, each with its own producer and senders.
+
+    Every worker keeps its own checkpoint, at the configured checkpoint_path followed by the worker index, and exports
+    its own trace, with the worker index before the extension of the configured tracing path. The message rate and the
+    per-destination rate limits are divided between the workers.
+
+    Attributes:
+    - num_workers: Number of worker processes.
+    - counters: Shared memory block the workers publish their counters to.
+    - shards: WorkerShard views, one per worker process.
+    """
+
+    def __init__(self, config, num_workers, resume=False):
+        self.num_workers = num_workers
+        self.counters = SharedCounters(num_workers)
+        self._stop_flag = multiprocessing.Event()
+        self._drain_flag = multiprocessing.Event()
+
+        # Unset when a trace is replayed in full; every shard then replays all of its share
+        num_messages = config['messages'].get('num_messages')
+        shard_config = copy.deepcopy(config)
+        if shard_config['messages'].get('rate'):
+            shard_config['messages']['rate'] /= num_workers
+        rate_limits = shard_config.get('rate_limits')
+        if rate_limits:
+            # Every worker keeps its own token buckets and sends an even share of each destination's messages, so it
+            # gets an even share of every limit. Bursts are kept at one message or more.
+            for limit in (rate_limits, *(rate_limits.get('carriers') or {}).values()):
+                for key in ('rate', 'burst'):
+                    if limit.get(key):
+                        limit[key] /= num_workers
+
+        self.shards = []
+        for worker in range(num_workers):
+            # Spread the remainder over the first shards so every message is produced exactly once
+            shard_messages = None if num_messages is None else (
+                num_messages // num_workers + (1 if worker < num_messages % num_workers else 0))
+            worker_config = copy.deepcopy(shard_config)
+            durable_path = (shard_config.get('queue') or {}).get('durable_path')
+            if durable_path:
+                # Every worker keeps its own ring buffer file
+                worker_config['queue']['durable_path'] = f"{durable_path}.{worker}"
+            checkpoint_path = (shard_config.get('shutdown') or {}).get('checkpoint_path', 'checkpoint.bin')
+            worker_config['shutdown'] = dict(worker_config.get('shutdown') or {},
+                                             checkpoint_path=f"{checkpoint_path}.{worker}")
+            trace_path = (shard_config.get('tracing') or {}).get('path')
+            if trace_path:
+                root, extension = os.path.splitext(trace_path)
+                worker_config['tracing']['path'] = f"{root}.{worker}{extension}"
+            if shard_config['messages'].get('trace'):
+                # Every worker replays its own interleaved share of the trace
+                worker_config['messages']['trace_shard'] = (worker, num_workers)
+            process = multiprocessing.Process(
+                target=run_shard,
+                args=(worker_config, worker, shard_messages, self.counters, self._stop_flag, self._drain_flag, resume),
+                name=f"sms-shard-{worker}",
+            )
+            self.shards.append(WorkerShard(process, self.counters, worker))
+
+    def drain(self):
+        """
+        Ask every worker to stop producing and send what it has queued.
+        """
+        self._drain_flag.set()
+
+    def stop(self):
+        """
+        Ask every worker to stop after the messages in hand.
+        """
+        self._stop_flag.set()
+
+    def close(self):
+        self.counters.close(unlink=True)
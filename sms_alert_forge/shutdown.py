@@ -0,0 +1,206 @@
+import json
+import logging
+import os
+import queue
+import struct
+import threading
+import time
+
+from sms_alert_forge.messages import Message, MessageBatch
+from sms_alert_forge.queues import DurableQueue
+
+MAGIC = b'SMSCKPT1'
+# magic, length of the JSON header
+_HEADER = struct.Struct('<8sI')
+# phone_number, priority index, attempts, body length
+_RECORD = struct.Struct('<qBBH')
+_NO_PRIORITY = 255
+
+
+def write_checkpoint(path, messages, counters):
+    """
+    Write unsent messages and run counters to a checkpoint file.
+
+    The file holds a small JSON header with the counters and the priority class names, followed by one packed record
+    per message: phone number, priority index, attempts, body length and the UTF-8 body. It is written to a temporary
+    file and renamed over path, so an interrupted write never leaves a partial checkpoint behind.
+
+    Args:
+        path (str): Checkpoint file.
+        messages (list): Unsent Message records.
+        counters (dict): Counters to carry over, keyed by name.
+    """
+    priorities = sorted({message.priority for message in messages if message.priority is not None})
+    priority_index = {name: i for i, name in enumerate(priorities)}
+    header = json.dumps({'counters': counters, 'priorities': priorities, 'messages': len(messages)}).encode('utf-8')
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temporary = f"{path}.tmp"
+    with open(temporary, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, len(header)))
+        f.write(header)
+        for message in messages:
+            body = message.body.encode('utf-8') if isinstance(message.body, str) else bytes(message.body)
+            f.write(_RECORD.pack(message.phone_number, priority_index.get(message.priority, _NO_PRIORITY),
+                                 min(message.attempts, 255), len(body)))
+            f.write(body)
+    os.replace(temporary, path)
+
+
+def read_checkpoint(path):
+    """
+    Read a checkpoint written by write_checkpoint.
+
+    Args:
+        path (str): Checkpoint file.
+
+    Returns:
+        tuple: (messages, counters). The messages' created_at is the time they were read, since the monotonic clock
+        of the interrupted run means nothing to this one.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    magic, header_length = _HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a checkpoint.")
+    offset = _HEADER.size
+    header = json.loads(data[offset:offset + header_length])
+    offset += header_length
+
+    priorities = header['priorities']
+    now = time.monotonic()
+    messages = []
+    for _ in range(header['messages']):
+        phone_number, priority, attempts, length = _RECORD.unpack_from(data, offset)
+        offset += _RECORD.size
+        body = data[offset:offset + length].decode('utf-8')
+        offset += length
+        messages.append(Message(phone_number, body, None if priority == _NO_PRIORITY else priorities[priority], now,
+                                attempts))
+    return messages, header['counters']
+
+
+def collect_unsent(message_queue, retry_scheduler=None):
+    """
+    Take every message still waiting on the queue or for a retry, once the run's threads have stopped.
+
+    A DurableQueue keeps its messages in its own file until they are acknowledged, so only pending retries are taken
+    from a run that uses one.
+
+    Args:
+        message_queue (queue.Queue): The queue between producer and senders.
+        retry_scheduler (RetryScheduler): The run's retry scheduler, or None.
+
+    Returns:
+        list: The unsent Message records.
+    """
+    messages = []
+    if not isinstance(message_queue, DurableQueue):
+        while True:
+            try:
+                item = message_queue.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(item, MessageBatch):
+                messages.extend(item.messages())
+            elif item is not None:
+                messages.append(item if isinstance(item, Message) else Message(*item))
+    if retry_scheduler is not None:
+        messages.extend(retry_scheduler.take_pending())
+    return messages
+
+
+class GracefulShutdown:
+    """
+    Class responsible for draining a run that is asked to stop, e.g. on SIGINT or SIGTERM.
+
+    The first request stops the producer and lets the senders work through what is already queued or waiting for a
+    retry. If they have not finished after drain_timeout seconds, the stop event is set and every thread stops after
+    the message in hand. A second request stops the run at once. Whatever is left unsent is then taken with
+    collect_unsent and written to a checkpoint by the caller.
+
+    Attributes:
+    - stop_event: Event that stops every thread of the run.
+    - producer: The run's producer, or None.
+    - senders: The run's senders, or worker shard views.
+    - drain_timeout: Time in seconds the senders get to drain the queue.
+    - shard_pool: ShardedSenderPool whose workers are drained and stopped along with the run, or None.
+    - requested: Event set by the first request.
+    - timed_out: Whether the drain timeout ran out before the senders finished.
+    """
+
+    def __init__(self, stop_event, producer=None, senders=(), drain_timeout=10.0, shard_pool=None):
+        self.stop_event = stop_event
+        self.producer = producer
+        self.senders = senders
+        self.drain_timeout = drain_timeout
+        self.shard_pool = shard_pool
+        self.requested = threading.Event()
+        self.timed_out = False
+
+    def request(self):
+        """
+        Ask the run to stop: drain on the first request, stop at once on the next.
+
+        Safe to call from a signal handler; the drain runs in a thread of its own.
+        """
+        if self.requested.is_set():
+            logging.warning("Stop requested again. Stopping without draining.")
+            self._stop()
+            return
+        self.requested.set()
+        logging.info(f"Stop requested. Draining for up to {self.drain_timeout}s.")
+        threading.Thread(target=self._drain, name='GracefulShutdown', daemon=True).start()
+
+    def _drain(self):
+        try:
+            if self.producer is not None:
+                self.producer.finish()
+            if self.shard_pool is not None:
+                self.shard_pool.drain()
+            deadline = time.monotonic() + self.drain_timeout
+            while any(sender.is_alive() for sender in self.senders):
+                if self.stop_event.wait(min(0.05, max(0.0, deadline - time.monotonic()))):
+                    return
+                if time.monotonic() >= deadline:
+                    self.timed_out = True
+                    logging.warning(f"Drain timeout of {self.drain_timeout}s reached. Stopping.")
+                    self._stop()
+                    return
+            logging.info("Drained.")
+        except Exception as e:
+            logging.error(f"Error in GracefulShutdown: {e}", exc_info=True)
+
+    def _stop(self):
+        self.stop_event.set()
+        if self.shard_pool is not None:
+            self.shard_pool.stop()
+
+
+def save_checkpoint(path, message_queue, retry_scheduler, producer, senders, previous=None):
+    """
+    Write the unsent messages and counters of a stopped run to a checkpoint.
+
+    Args:
+        path (str): Checkpoint file.
+        message_queue (queue.Queue): The queue between producer and senders.
+        retry_scheduler (RetryScheduler): The run's retry scheduler, or None.
+        producer (threading.Thread): The run's producer.
+        senders (list): The run's senders.
+        previous (dict): Counters of the checkpoint this run resumed from, or None.
+
+    Returns:
+        dict: The checkpoint's counters, plus its path and number of unsent messages.
+    """
+    messages = collect_unsent(message_queue, retry_scheduler)
+    previous = previous or {}
+    counters = {
+        'messages_produced': previous.get('messages_produced', 0) + producer.messages_produced,
+        'messages_sent': previous.get('messages_sent', 0) + sum(sender.messages_sent for sender in senders),
+        'messages_failed': previous.get('messages_failed', 0) + sum(sender.messages_failed for sender in senders),
+    }
+    write_checkpoint(path, messages, counters)
+    logging.info(f"Checkpoint with {len(messages)} unsent messages written to {path}.")
+    return dict(counters, path=path, unsent=len(messages))
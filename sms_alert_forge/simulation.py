@@ -0,0 +1,157 @@
+import heapq
+import logging
+import random
+import time
+
+from sms_alert_forge.histogram import LatencyHistogram
+from sms_alert_forge.sender import sample_processing_time
+
+
+class DiscreteEventSimulation:
+    """
+    Class responsible for simulating the producer and sender pool in virtual time.
+
+    Instead of sleeping, every send schedules its completion on a heap-ordered event list and the simulated clock jumps
+    from one event to the next. It uses the same latency model (sample_processing_time) and failure model as
+    MessageSender, drawn from one generator seeded with seed, so a given configuration and seed always produce the same
+    report. Messages arrive at the producer's configured rate, or all at time zero when no rate is set, and are served
+    in FIFO order by num_senders senders.
+
+    Attributes:
+    - num_messages: Number of messages to simulate.
+    - num_senders: Number of simulated senders.
+    - failure_rate: The rate at which message sending can fail.
+    - mean_processing_time: The mean time taken to process a message.
+    - rate: Messages produced per second, or None for all messages arriving at once.
+    - seed: Seed of the random generator, or None for a different run every time.
+    - clock: Current simulated time in seconds.
+    - messages_sent: Number of messages successfully sent.
+    - messages_failed: Number of messages that failed to be sent.
+    - total_processing_time: Total time taken to process all successfully sent messages.
+    - latency_histogram: Latencies of all sent and failed messages.
+    """
+
+    def __init__(self, num_messages, num_senders, failure_rate, mean_processing_time, rate=None, seed=None):
+        self.num_messages = num_messages
+        self.num_senders = num_senders
+        self.failure_rate = failure_rate
+        self.mean_processing_time = mean_processing_time
+        self.rate = rate
+        self.seed = seed
+        self.clock = 0.0
+        self._rng = random.Random(seed)
+        self._events = []
+        self._sequence = 0
+        self._reset()
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Create a simulation from the configuration used for threaded runs.
+
+        Args:
+            config (dict): Configuration parameters.
+
+        Returns:
+            DiscreteEventSimulation: The simulation, not yet run.
+        """
+        return cls(
+            num_messages=config['messages']['num_messages'],
+            num_senders=config['senders']['num_senders'],
+            failure_rate=config['senders']['failure_rate'],
+            mean_processing_time=config['senders']['mean_processing_time'],
+            rate=config['messages'].get('rate'),
+            seed=(config.get('simulation') or {}).get('seed'),
+        )
+
+    def schedule(self, delay, handler, *args):
+        """
+        Schedule handler(*args) to run delay simulated seconds from now.
+
+        Events at the same time run in the order they were scheduled.
+        """
+        self._sequence += 1
+        heapq.heappush(self._events, (self.clock + delay, self._sequence, handler, args))
+
+    def arrival_time(self, index):
+        return index / self.rate if self.rate else 0.0
+
+    def run(self):
+        """
+        Run the simulation to completion.
+
+        Returns:
+            dict: An sms_report with the same fields as a threaded run, plus the wall-clock time the simulation took.
+        """
+        logging.info(f"DiscreteEventSimulation started with {self.num_messages} messages and seed {self.seed}.")
+        wall_start = time.perf_counter()
+
+        if self.num_messages > 0:
+            self.schedule(self.arrival_time(0), self._arrive)
+        while self._events:
+            self.clock, _, handler, args = heapq.heappop(self._events)
+            handler(*args)
+
+        total = self.messages_sent + self.messages_failed
+        sms_report = {
+            'elapsed_time': self.clock,
+            'messages_sent': self.messages_sent,
+            'messages_failed': self.messages_failed,
+            'average_time_per_message': self.total_processing_time / self.messages_sent if self.messages_sent else 0,
+        }
+        for key, value in self.latency_histogram.summary().items():
+            sms_report[f"latency_{key.replace('.', '')}"] = value
+        sms_report['mean_queue_wait'] = self.total_queue_wait / total if total else 0
+        sms_report['max_queue_wait'] = self.max_queue_wait
+        # Little's law: time-averaged queue depth is the total waiting time spread over the run
+        sms_report['mean_queue_depth'] = self.total_queue_wait / self.clock if self.clock > 0 else 0
+        sms_report['wall_time'] = time.perf_counter() - wall_start
+
+        logging.info(f"DiscreteEventSimulation completed {self.clock:.2f}s of simulated time in "
+                     f"{sms_report['wall_time']:.2f}s.")
+        return sms_report
+
+    def _reset(self):
+        self.messages_sent = 0
+        self.messages_failed = 0
+        self.total_processing_time = 0.0
+        self.total_queue_wait = 0.0
+        self.max_queue_wait = 0.0
+        self.latency_histogram = LatencyHistogram()
+        self._idle_senders = self.num_senders
+        # The waiting messages are always the contiguous index range [_next_start, _arrived)
+        self._arrived = 0
+        self._next_start = 0
+
+    def _arrive(self):
+        self._arrived += 1
+        if self._arrived < self.num_messages:
+            self.schedule(self.arrival_time(self._arrived) - self.clock, self._arrive)
+        if self._idle_senders:
+            self._idle_senders -= 1
+            self._start_next()
+
+    def _start_next(self):
+        index = self._next_start
+        self._next_start += 1
+
+        queue_wait = self.clock - self.arrival_time(index)
+        self.total_queue_wait += queue_wait
+        if queue_wait > self.max_queue_wait:
+            self.max_queue_wait = queue_wait
+
+        processing_time = sample_processing_time(self.mean_processing_time, self._rng)
+        self.schedule(max(processing_time, 0), self._complete, processing_time)
+
+    def _complete(self, processing_time):
+        self.latency_histogram.record(processing_time)
+        if self._rng.random() < self.failure_rate:
+            self.messages_failed += 1
+        else:
+            self.messages_sent += 1
+            self.total_processing_time += processing_time
+
+        if self._next_start < self._arrived:
+            self._start_next()
+        else:
+            self._idle_senders += 1
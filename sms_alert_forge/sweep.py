@@ -0,0 +1,199 @@
+"""
+Parallel parameter sweep for SMSAlertForge.
+
+Runs the simulation once per point of a parameter grid, like bench, but runs the points side by side in a pool of
+worker processes, one per core by default. Every worker runs a single point and exits, so each run gets a fresh
+interpreter with its own peak RSS and CPU time. Each run's scalar sms_report values end up in one row of a CSV or JSON
+table, together with its throughput and latency.
+
+Every swept option takes comma-separated values or a range. start:stop:step is an arithmetic range, and start:stop:xF
+a geometric one. Both include stop when the steps reach it exactly:
+
+    python -m sms_alert_forge sweep --config conf/config.yaml --num-senders 1:64:x2 --failure-rate 0,0.1 \\
+        --mean-processing-time 0.01,0.05 --num-messages 2000 --output sweep.csv
+
+"""
+
+import argparse
+import csv
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+
+from sms_alert_forge.bench import SWEEP_PARAMETERS as BENCH_PARAMETERS, expand_grid, run_point
+
+# Command line option -> (config section, config key, value type)
+SWEEP_PARAMETERS = dict(BENCH_PARAMETERS, **{
+    'num_messages': ('messages', 'num_messages', int),
+    'update_interval': ('progress_monitor', 'update_interval', float),
+})
+# Leading columns of the table, after the swept parameters; other scalar sms_report values follow in sorted order
+COLUMNS = ('messages_sent', 'messages_failed', 'wall_time', 'messages_per_second', 'cpu_per_message', 'peak_rss_kb',
+           'latency_p50', 'latency_p90', 'latency_p99', 'latency_p999', 'latency_max', 'mean_queue_wait',
+           'time_to_first_message', 'error')
+
+
+def parse_values(text, value_type):
+    """
+    Parse the values of one swept parameter.
+
+    Args:
+        text (str): Comma-separated values, 'start:stop:step' or 'start:stop:xFACTOR'.
+        value_type (type): Type of the values.
+
+    Returns:
+        list: The values, in order.
+    """
+    if ':' not in text:
+        return [value_type(value) for value in text.split(',')]
+    start, stop, step = text.split(':')
+    start, stop = value_type(start), value_type(stop)
+    geometric = step.startswith('x')
+    step = value_type(step[1:] if geometric else step)
+    if (step <= 1 or start <= 0) if geometric else step <= 0:
+        raise ValueError(f"Range '{text}' does not advance.")
+    values = []
+    value = start
+    # Allow for rounding of float steps, so 0:0.3:0.1 includes 0.3
+    while value <= stop * (1 + 1e-9):
+        values.append(round(value, 12) if value_type is float else value)
+        value = value * step if geometric else value + step
+    return values
+
+
+def _run_point(item):
+    index, config = item
+    try:
+        return index, run_point(config)
+    except Exception as e:
+        return index, {'error': str(e)}
+
+
+def run_sweep(points, processes=None):
+    """
+    Run every point of a grid in a pool of worker processes.
+
+    Args:
+        points (list): (parameters, config) tuples, as returned by expand_grid.
+        processes (int): Number of worker processes; defaults to the number of cores.
+
+    Returns:
+        list: {'parameters': ..., 'metrics': ...} per point, in the order of points. Failed runs have metrics
+        {'error': ...}.
+    """
+    processes = min(processes or os.cpu_count() or 1, max(1, len(points)))
+    results = [None] * len(points)
+    # One run per worker process, so no run inherits another's memory, threads or module state
+    with multiprocessing.Pool(processes, maxtasksperchild=1) as pool:
+        for index, metrics in pool.imap_unordered(_run_point, [(index, config) for index, (_, config)
+                                                               in enumerate(points)]):
+            parameters = points[index][0]
+            results[index] = {'parameters': parameters, 'metrics': metrics}
+            if 'error' in metrics:
+                logging.error(f"Sweep point {parameters} failed: {metrics['error']}")
+            else:
+                logging.info(f"Sweep point {parameters}: {metrics['messages_per_second']:.1f} messages/s")
+    return results
+
+
+def to_rows(results):
+    """
+    Flatten sweep results into table rows.
+
+    Args:
+        results (list): Results of run_sweep.
+
+    Returns:
+        tuple: (columns, rows), where each row maps column names to the swept parameters and scalar measurements of
+        one point. Nested sms_report values such as per-class statistics are left out.
+    """
+    parameter_columns = []
+    metric_columns = set()
+    rows = []
+    for entry in results:
+        row = dict(entry['parameters'])
+        for name in entry['parameters']:
+            if name not in parameter_columns:
+                parameter_columns.append(name)
+        for name, value in entry['metrics'].items():
+            if isinstance(value, (int, float, str)):
+                row[name] = value
+                metric_columns.add(name)
+        rows.append(row)
+    leading = [name for name in COLUMNS if name in metric_columns]
+    columns = parameter_columns + leading + sorted(metric_columns - set(leading) - set(parameter_columns))
+    return columns, rows
+
+
+def write_table(results, path):
+    """
+    Write sweep results to a CSV file, or to a JSON file when path ends in .json.
+
+    Args:
+        results (list): Results of run_sweep.
+        path (str): File to write.
+    """
+    columns, rows = to_rows(results)
+    if path.endswith('.json'):
+        with open(path, 'w') as f:
+            json.dump({
+                'created': datetime.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'columns': columns,
+                'rows': rows,
+            }, f, indent=2)
+        return
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog='python -m sms_alert_forge sweep',
+                                     description='Run SMSAlertForge over a parameter grid in parallel.')
+    parser.add_argument('--config', default='conf/config.yaml', help='Base configuration file in YAML format.')
+    for name, (_, _, value_type) in SWEEP_PARAMETERS.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", dest=name,
+                            type=lambda text, value_type=value_type: parse_values(text, value_type),
+                            help=f"{name} values to sweep: comma-separated, start:stop:step or start:stop:xFACTOR.")
+    parser.add_argument('--processes', type=int, help='Worker processes (default: one per core).')
+    parser.add_argument('--output', default='sweep.csv', help='File the table is written to; .json for JSON.')
+    return parser.parse_args(argv)
+
+
+def run_sweep_command(argv):
+    """
+    Entry point of the sweep command.
+
+    Args:
+        argv (list): Command line arguments after 'sweep'.
+
+    Returns:
+        int: Exit status, 1 when any point failed.
+    """
+    from sms_alert_forge.__main__ import read_config, setup_logging
+
+    args = parse_args(argv)
+    base_config = read_config(args.config)
+    setup_logging(base_config)
+
+    grid = {name: getattr(args, name) for name in SWEEP_PARAMETERS}
+    points = expand_grid(base_config, grid, SWEEP_PARAMETERS)
+    start = time.perf_counter()
+    results = run_sweep(points, args.processes)
+    write_table(results, args.output)
+
+    failed = sum(1 for entry in results if 'error' in entry['metrics'])
+    print(f"{len(points)} points in {time.perf_counter() - start:.1f}s, {failed} failed. Results written to "
+          f"{args.output}.")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(run_sweep_command(sys.argv[1:]))
@@ -0,0 +1,250 @@
+import logging
+import math
+import operator
+import os
+from array import array
+from collections import Counter
+from itertools import repeat
+
+from sms_alert_forge.histogram import LatencyHistogram
+
+# Outcome column values
+SENT = 0
+FAILED = 1
+RETRIED = 2
+OUTCOMES = ('sent', 'failed', 'retried')
+# Column name -> array typecode
+COLUMNS = {'enqueued': 'd', 'dequeued': 'd', 'completed': 'd', 'outcome': 'B', 'attempts': 'B'}
+EXPORT_COLUMNS = ('enqueued', 'dequeued', 'completed', 'queue_wait', 'service_time', 'outcome', 'attempts')
+# Durations are grouped into 2 ** (1 / _STEPS) wide buckets before they are added to a LatencyHistogram, so building
+# the breakdown costs a Python call per bucket rather than per message
+_STEPS = 256
+_FLOOR = 1e-7
+# One exported row; formatting rows with a template is several times faster than csv.writer
+_ROW = '%.6f,%.6f,%.6f,%.6f,%.6f,%s,%d\n'
+
+
+class LatencyTrace:
+    """
+    Per-message timings of one sender, kept in preallocated array columns.
+
+    Every send attempt adds one row: when the message was enqueued (its created_at), when the sender took it up, when
+    its send completed, how it ended and how many attempts it had failed before. Rows are written in place into
+    columns allocated up front, at 26 bytes a message and without an object per message; a full trace doubles its
+    columns. Like the sender counters, a trace has a single writer, its sender, and is only read once the sender has
+    stopped.
+
+    Attributes:
+    - enqueued: time.monotonic() when each message was enqueued.
+    - dequeued: time.monotonic() when the sender took each message up.
+    - completed: time.monotonic() when each send completed.
+    - outcome: SENT, FAILED or RETRIED per row.
+    - attempts: Failed attempts of each message before this one.
+    - count: Number of rows recorded.
+    """
+
+    def __init__(self, capacity=65536):
+        capacity = max(1, capacity)
+        for name, typecode in COLUMNS.items():
+            setattr(self, name, array(typecode, bytes(array(typecode).itemsize * capacity)))
+        self.count = 0
+
+    @property
+    def capacity(self):
+        return len(self.outcome)
+
+    def record(self, enqueued, dequeued, completed, outcomes, attempts=None):
+        """
+        Record the send attempts of messages that were taken up and completed together.
+
+        Args:
+            enqueued (list): Enqueue time of each message.
+            dequeued (float): time.monotonic() when the messages were taken up.
+            completed (float): time.monotonic() when their send completed.
+            outcomes (list): SENT, FAILED or RETRIED per message.
+            attempts (list): Failed attempts of each message so far, or None when all are first attempts.
+        """
+        start = self.count
+        count = len(outcomes)
+        if start + count > self.capacity:
+            self._grow(start + count)
+        if count == 1:
+            self.enqueued[start] = enqueued[0]
+            self.dequeued[start] = dequeued
+            self.completed[start] = completed
+            self.outcome[start] = outcomes[0]
+            if attempts:
+                self.attempts[start] = min(attempts[0], 255)
+        else:
+            end = start + count
+            self.enqueued[start:end] = array('d', enqueued)
+            self.dequeued[start:end] = array('d', (dequeued,)) * count
+            self.completed[start:end] = array('d', (completed,)) * count
+            self.outcome[start:end] = array('B', outcomes)
+            if attempts:
+                self.attempts[start:end] = array('B', (min(attempt, 255) for attempt in attempts))
+        self.count += count
+
+    def _grow(self, needed):
+        extra = max(self.capacity, needed - self.capacity)
+        for name in COLUMNS:
+            column = getattr(self, name)
+            column.frombytes(bytes(column.itemsize * extra))
+
+    def columns(self):
+        """
+        Return the recorded part of every column.
+
+        Returns:
+            dict: Arrays keyed by column name, each count rows long.
+        """
+        return {name: getattr(self, name)[:self.count] for name in COLUMNS}
+
+
+def breakdown(traces):
+    """
+    Split the latency of the traced sends into time waiting in the queue and time being sent.
+
+    Queue wait runs from enqueue to dequeue and service time from dequeue to completion. A retried message keeps its
+    created_at, so the queue wait of a later attempt includes the earlier attempts and the backoff between them.
+
+    Args:
+        traces (list): LatencyTrace instances.
+
+    Returns:
+        dict: Row count, queue wait and service time mean, percentiles and maximum in seconds, the share of the total
+        latency spent waiting in the queue, and the number of rows per outcome.
+    """
+    histograms = {'queue_wait': LatencyHistogram(), 'service_time': LatencyHistogram()}
+    totals = {'queue_wait': 0.0, 'service_time': 0.0}
+    outcomes = dict.fromkeys(OUTCOMES, 0)
+    count = 0
+    for trace in traces:
+        columns = trace.columns()
+        for name, start, end in (('queue_wait', 'enqueued', 'dequeued'), ('service_time', 'dequeued', 'completed')):
+            durations = array('d', map(operator.sub, columns[end], columns[start]))
+            _record(histograms[name], durations)
+            totals[name] += math.fsum(durations)
+        for outcome, name in enumerate(OUTCOMES):
+            outcomes[name] += columns['outcome'].count(outcome)
+        count += trace.count
+
+    report = {'messages': count}
+    for name, histogram in histograms.items():
+        report[f"{name}_mean"] = totals[name] / count if count else 0.0
+        for key, value in histogram.summary().items():
+            report[f"{name}_{key.replace('.', '')}"] = value
+    latency = totals['queue_wait'] + totals['service_time']
+    report['queue_wait_share'] = totals['queue_wait'] / latency if latency > 0 else 0.0
+    report.update(outcomes)
+    return report
+
+
+def _record(histogram, durations):
+    # Count the durations per log bucket with C-level iteration, then record each bucket at its midpoint
+    if not durations:
+        return
+    if min(durations) < 0:
+        durations = array('d', map(max, durations, repeat(0.0)))
+    buckets = Counter(map(math.floor, map(operator.mul, map(math.log2, map(operator.add, durations, repeat(_FLOOR))),
+                                          repeat(_STEPS))))
+    for bucket, count in buckets.items():
+        histogram.record(2 ** ((bucket + 0.5) / _STEPS) - _FLOOR, count)
+    histogram.max_value = max(histogram.max_value, max(durations))
+
+
+def _relative_columns(columns, epoch):
+    # Times in seconds since epoch, plus the queue wait and service time of each row
+    enqueued = array('d', map(operator.sub, columns['enqueued'], repeat(epoch)))
+    dequeued = array('d', map(operator.sub, columns['dequeued'], repeat(epoch)))
+    completed = array('d', map(operator.sub, columns['completed'], repeat(epoch)))
+    return {
+        'enqueued': enqueued,
+        'dequeued': dequeued,
+        'completed': completed,
+        'queue_wait': array('d', map(operator.sub, dequeued, enqueued)),
+        'service_time': array('d', map(operator.sub, completed, dequeued)),
+        'outcome': columns['outcome'],
+        'attempts': columns['attempts'],
+    }
+
+
+def write_trace(traces, path):
+    """
+    Export traces to a CSV file, or to a Parquet file when path ends in .parquet.
+
+    Each row holds the enqueue, dequeue and completion times in seconds since the first enqueue, the queue wait and
+    service time, the outcome and the earlier attempts of one send. CSV times are written to the microsecond. The traces are written one after another, so the
+    rows are grouped by sender. Parquet needs pyarrow; without it the traces are written as CSV next to path instead.
+
+    Args:
+        traces (list): LatencyTrace instances.
+        path (str): File to write.
+
+    Returns:
+        str: The file written.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    epoch = min((min(trace.enqueued[:trace.count]) for trace in traces if trace.count), default=0.0)
+    if path.endswith('.parquet'):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            path = f"{os.path.splitext(path)[0]}.csv"
+            logging.warning(f"pyarrow is not installed. Writing the trace to {path} instead.")
+        else:
+            _write_parquet(traces, path, epoch, pyarrow)
+            return path
+
+    with open(path, 'w') as f:
+        f.write(','.join(EXPORT_COLUMNS) + '\n')
+        for trace in traces:
+            columns = _relative_columns(trace.columns(), epoch)
+            columns['outcome'] = map(OUTCOMES.__getitem__, columns['outcome'])
+            f.writelines(map(_ROW.__mod__, zip(*(columns[name] for name in EXPORT_COLUMNS))))
+    return path
+
+
+def _write_parquet(traces, path, epoch, pyarrow):
+    # The array columns are handed to pyarrow as buffers, without a Python object per value
+    types = {'d': pyarrow.float64(), 'B': pyarrow.uint8()}
+    writer = None
+    try:
+        for trace in traces:
+            if not trace.count:
+                continue
+            columns = _relative_columns(trace.columns(), epoch)
+            arrays = {name: pyarrow.Array.from_buffers(types[column.typecode], len(column),
+                                                       [None, pyarrow.py_buffer(column)])
+                      for name, column in columns.items()}
+            arrays['outcome'] = pyarrow.DictionaryArray.from_arrays(arrays['outcome'], pyarrow.array(OUTCOMES))
+            table = pyarrow.table({name: arrays[name] for name in EXPORT_COLUMNS})
+            if writer is None:
+                writer = pyarrow.parquet.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is None:
+        logging.warning(f"No sends were traced. {path} was not written.")
+
+
+def trace_report(traces, path=None):
+    """
+    Return the latency breakdown of a run's traces, exporting them first if a path is given.
+
+    Args:
+        traces (list): LatencyTrace instances.
+        path (str): File to export the traces to, or None.
+
+    Returns:
+        dict: The breakdown, plus the path of the exported file when one was written.
+    """
+    report = breakdown(traces)
+    if path:
+        report['path'] = write_trace(traces, path)
+        logging.info(f"Trace of {report['messages']} sends written to {report['path']}.")
+    return report
@@ -0,0 +1,180 @@
+import http.client
+import json
+import logging
+import queue
+import threading
+import time
+from urllib.parse import urlsplit
+
+from sms_alert_forge.histogram import LatencyHistogram
+
+
+class Transport:
+    """
+    Interface between MessageSender and a real SMS gateway.
+
+    A transport replaces the simulated send (a sleep plus a random failure). One instance is shared by all senders of
+    a run, so implementations must be thread-safe.
+    """
+
+    def send(self, messages):
+        """
+        Submit messages to the gateway as one request.
+
+        Args:
+            messages (list): Message records to send.
+
+        Returns:
+            list: For each message, True if the gateway accepted it.
+        """
+        raise NotImplementedError
+
+    def stats(self):
+        """
+        Return transport measurements for sms_report.
+
+        Returns:
+            dict: Measurements keyed by name.
+        """
+        return {}
+
+    def close(self):
+        """
+        Release the transport's resources.
+        """
+
+
+class HttpTransport(Transport):
+    """
+    Transport that posts messages as JSON to an HTTP gateway over a pool of keep-alive connections.
+
+    Each send is one POST of {"messages": [{"phone": ..., "body": ..., "priority": ...}, ...]}; with a sender
+    batch_size above 1, a batch goes out as a single request. The gateway answers with {"results": [true, false, ...]}
+    per message, and any other response fails the whole request. Connections are opened lazily up to pool_size and
+    reused for later requests; a sender waits for a free connection when all of them are busy. When the server has
+    closed an idle connection, the request is retried once on a new one.
+
+    Attributes:
+    - url: Gateway endpoint, e.g. http://127.0.0.1:8025/send.
+    - pool_size: Maximum number of open connections.
+    - timeout: Socket timeout in seconds.
+    - requests: Number of requests sent.
+    - request_errors: Number of requests that failed as a whole (connection errors and non-200 responses).
+    - connections_opened: Number of connections opened.
+    - reused_requests: Number of requests sent on a connection that had already served a request.
+    - pool_wait_time: Total time senders waited for a free connection.
+    - max_pool_wait: Longest wait for a free connection.
+    - latency_histogram: Latency of every request, including pool wait.
+    - gateway: Local GatewayServer serving url, stopped when the transport is closed, or None.
+    """
+
+    def __init__(self, url, pool_size=8, timeout=5.0, gateway=None):
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https'):
+            raise ValueError(f"Unsupported gateway URL '{url}'. Expected http:// or https://.")
+        self.url = url
+        self.pool_size = max(1, pool_size)
+        self.timeout = timeout
+        self.gateway = gateway
+        self._connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self._host = parts.hostname
+        self._port = parts.port
+        self._path = parts.path or '/'
+        self._idle = queue.LifoQueue()
+        self._connections = 0
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.request_errors = 0
+        self.connections_opened = 0
+        self.reused_requests = 0
+        self.pool_wait_time = 0.0
+        self.max_pool_wait = 0.0
+        self.latency_histogram = LatencyHistogram()
+
+    def send(self, messages):
+        start = time.perf_counter()
+        connection = self._acquire()
+        pool_wait = time.perf_counter() - start
+        body = json.dumps({'messages': [
+            {'phone': message[0], 'body': message[1], 'priority': getattr(message, 'priority', None)}
+            for message in messages]}).encode('utf-8')
+
+        results = None
+        reused = connection.sock is not None
+        try:
+            try:
+                results = self._post(connection, body)
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                if not reused:
+                    raise
+                # The server closed an idle keep-alive connection: retry once on a fresh one
+                connection.close()
+                reused = False
+                results = self._post(connection, body)
+        except (OSError, http.client.HTTPException, ValueError, KeyError) as e:
+            logging.warning("Gateway request failed: %s", e)
+            connection.close()  # Reconnects on its next request
+        finally:
+            self._idle.put(connection)
+
+        latency = time.perf_counter() - start
+        with self._lock:
+            self.requests += 1
+            self.reused_requests += reused
+            self.pool_wait_time += pool_wait
+            if pool_wait > self.max_pool_wait:
+                self.max_pool_wait = pool_wait
+            if results is None:
+                self.request_errors += 1
+            self.latency_histogram.record(latency)
+        if results is None or len(results) != len(messages):
+            return [False] * len(messages)
+        return [bool(result) for result in results]
+
+    def stats(self):
+        with self._lock:
+            stats = {
+                'requests': self.requests,
+                'request_errors': self.request_errors,
+                'connections_opened': self.connections_opened,
+                'connection_reuse': self.reused_requests / self.requests if self.requests else 0,
+                'pool_wait_time': self.pool_wait_time,
+                'mean_pool_wait': self.pool_wait_time / self.requests if self.requests else 0,
+                'max_pool_wait': self.max_pool_wait,
+            }
+            for key, value in self.latency_histogram.summary().items():
+                stats[f"request_latency_{key.replace('.', '')}"] = value
+        return stats
+
+    def close(self):
+        while True:
+            try:
+                connection = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            connection.close()
+        if self.gateway is not None:
+            self.gateway.stop()
+
+    def _post(self, connection, body):
+        if connection.sock is None:
+            # http.client connects lazily, on the first request and after a close
+            with self._lock:
+                self.connections_opened += 1
+        connection.request('POST', self._path, body, {'Content-Type': 'application/json'})
+        response = connection.getresponse()
+        payload = response.read()  # Always drain the response so the connection can be reused
+        if response.status != 200:
+            raise ValueError(f"gateway answered {response.status} {response.reason}")
+        return json.loads(payload)['results']
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._connections < self.pool_size:
+                self._connections += 1
+                return self._connection_class(self._host, self._port, timeout=self.timeout)
+        return self._idle.get()
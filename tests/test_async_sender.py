@@ -0,0 +1,76 @@
+import queue
+import threading
+import time
+
+from sms_alert_forge.async_sender import AsyncMessageSender
+
+
+def test_async_sender_success():
+    message_queue = queue.Queue()
+    stop_event = threading.Event()
+
+    sender = AsyncMessageSender(message_queue, 0.0, 0.1, stop_event, concurrency=10)
+    sender.start()
+
+    message_queue.put(('1234567890', 'Test message 1'))
+    message_queue.put(('9876543210', 'Test message 2'))
+    message_queue.put(None)
+
+    sender.join()
+
+    assert not sender.is_alive()
+    assert sender.messages_sent == 2
+    assert sender.messages_failed == 0
+
+
+def test_async_sender_failure():
+    message_queue = queue.Queue()
+    stop_event = threading.Event()
+
+    sender = AsyncMessageSender(message_queue, 1.0, 0.1, stop_event, concurrency=10)
+    sender.start()
+
+    message_queue.put(('1234567890', 'Test message'))
+    message_queue.put(None)
+
+    sender.join()
+
+    assert sender.messages_sent == 0
+    assert sender.messages_failed == 1
+
+
+def test_async_sender_concurrent_sends():
+    message_queue = queue.Queue()
+    stop_event = threading.Event()
+    num_messages = 500
+
+    sender = AsyncMessageSender(message_queue, 0.0, 0.2, stop_event, concurrency=num_messages)
+    for _ in range(num_messages):
+        message_queue.put(('1234567890', 'Test message'))
+    message_queue.put(None)
+
+    start_time = time.monotonic()
+    sender.start()
+    sender.join()
+
+    # 500 sends of ~200ms each only finish this quickly if they overlap on the event loop
+    assert time.monotonic() - start_time < 2
+    assert sender.messages_sent == num_messages
+
+
+def test_async_sender_interrupted():
+    message_queue = queue.Queue()
+    stop_event = threading.Event()
+
+    sender = AsyncMessageSender(message_queue, 0.0, 0.1, stop_event, concurrency=2)
+    sender.start()
+
+    for _ in range(1000):
+        message_queue.put(('1234567890', 'Test message'))
+    message_queue.put(None)
+    time.sleep(0.5)
+    stop_event.set()
+    sender.join()
+
+    assert not sender.is_alive()
+    assert sender.messages_sent < 1000
@@ -0,0 +1,100 @@
+import queue
+import threading
+
+import pytest
+
+from sms_alert_forge.autoscaler import SenderAutoscaler
+from sms_alert_forge.pipeline import build_pipeline
+from sms_alert_forge.producer import Message
+from sms_alert_forge.sender import MessageSender
+
+
+def make_autoscaler(message_queue, upstream, num_senders, **kwargs):
+    stop_event = threading.Event()
+
+    def sender_factory():
+        return MessageSender(message_queue, 0.0, 0.01, stop_event)
+
+    senders = [sender_factory() for _ in range(num_senders)]
+    autoscaler = SenderAutoscaler(message_queue, senders, sender_factory, stop_event, upstream, interval=0.05,
+                                  **kwargs)
+    return senders, autoscaler
+
+
+def run(senders, autoscaler):
+    for sender in senders:
+        sender.start()
+    autoscaler.start()
+    autoscaler.join()
+    for sender in senders:
+        sender.join(timeout=5)
+
+
+@pytest.mark.parametrize('policy', ['littles', 'aimd'])
+def test_autoscaler_grows_under_backlog(policy):
+    message_queue = queue.Queue()
+    for i in range(300):
+        message_queue.put(Message(i, f"Message {i}"))
+    upstream = threading.Thread(target=lambda: None)
+    upstream.start()
+
+    senders, autoscaler = make_autoscaler(message_queue, upstream, 1, max_senders=8, policy=policy,
+                                          latency_target=0.2, increase=2)
+    run(senders, autoscaler)
+
+    assert autoscaler.peak_senders > 1
+    assert autoscaler.scale_events[0].senders_before == 1
+    assert len(senders) == autoscaler.peak_senders
+    assert not any(sender.is_alive() for sender in senders)
+    assert sum(sender.messages_sent for sender in senders) == 300
+
+
+def test_autoscaler_shrinks_when_idle():
+    message_queue = queue.Queue()
+    producing = threading.Event()
+    upstream = threading.Thread(target=producing.wait)
+    upstream.start()
+
+    senders, autoscaler = make_autoscaler(message_queue, upstream, 6, min_senders=2, policy='aimd')
+    for sender in senders:
+        sender.start()
+    autoscaler.start()
+    # Senders need a little work before there is a service time to size the pool on
+    for i in range(12):
+        message_queue.put(Message(i, f"Message {i}"))
+    threading.Event().wait(0.6)
+    producing.set()
+    autoscaler.join()
+    for sender in senders:
+        sender.join(timeout=5)
+
+    assert autoscaler.scale_events[-1].senders_after == 2
+    assert all(event.senders_after < event.senders_before for event in autoscaler.scale_events)
+    assert not any(sender.is_alive() for sender in senders)
+    assert sum(sender.messages_sent for sender in senders) == 12
+
+
+def test_pipeline_with_autoscaler_and_retries():
+    config = {
+        'messages': {'num_messages': 200, 'batch_size': 50},
+        'senders': {'num_senders': 1, 'failure_rate': 0.2, 'mean_processing_time': 0.005},
+        'retry': {'max_attempts': 3, 'base_delay': 0.01},
+        'autoscaler': {'enabled': True, 'min_senders': 1, 'max_senders': 6, 'interval': 0.05,
+                       'latency_target': 0.2},
+    }
+    stop_event = threading.Event()
+    message_queue, producer, senders, retry_scheduler, autoscaler = build_pipeline(config, stop_event)
+    producer.start()
+    retry_scheduler.start()
+    run(senders, autoscaler)
+    producer.join()
+    retry_scheduler.join()
+
+    assert autoscaler.peak_senders > 1
+    assert sum(sender.messages_sent + sender.messages_failed for sender in senders) == 200
+    assert not any(sender.is_alive() for sender in senders)
+
+
+def test_autoscaler_rejects_unknown_policy():
+    with pytest.raises(ValueError):
+        SenderAutoscaler(queue.Queue(), [], None, threading.Event(), None, policy='pid')
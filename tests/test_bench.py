@@ -0,0 +1,54 @@
+from sms_alert_forge.bench import compare, expand_grid, measure_queue_memory, run_point
+
+
+def make_config():
+    return {
+        'logging': {'level': 'WARNING'},
+        'messages': {'num_messages': 20, 'batch_size': 10},
+        'senders': {'num_senders': 2, 'failure_rate': 0.0, 'mean_processing_time': 0.001},
+        'progress_monitor': {'update_interval': 0.01},
+    }
+
+
+def test_expand_grid():
+    points = expand_grid(make_config(), {'num_senders': [1, 4], 'engine': ['thread', 'asyncio'],
+                                         'failure_rate': None, 'high_watermark': [100]})
+
+    assert len(points) == 4
+    assert [parameters for parameters, _ in points][1] == {'num_senders': 1, 'engine': 'asyncio',
+                                                           'high_watermark': 100}
+    _, config = points[3]
+    assert config['senders']['num_senders'] == 4
+    assert config['senders']['engine'] == 'asyncio'
+    assert config['queue']['high_watermark'] == 100
+    assert config['senders']['failure_rate'] == 0.0
+
+
+def test_compare_flags_regressions_beyond_threshold():
+    baseline = [{'parameters': {'num_senders': 1}, 'metrics': {'messages_per_second': 1000, 'cpu_per_message': 1e-4}},
+                {'parameters': {'num_senders': 4}, 'metrics': {'messages_per_second': 4000, 'cpu_per_message': 1e-4}}]
+    results = [{'parameters': {'num_senders': 1}, 'metrics': {'messages_per_second': 950, 'cpu_per_message': 1e-4}},
+               {'parameters': {'num_senders': 4}, 'metrics': {'messages_per_second': 3000, 'cpu_per_message': 2e-4}}]
+
+    regressions = compare(results, baseline, 0.1)
+
+    assert len(regressions) == 2
+    assert all("'num_senders': 4" in regression for regression in regressions)
+
+
+def test_run_point_measures_throughput():
+    metrics = run_point(make_config())
+
+    assert metrics['messages_sent'] == 20
+    assert metrics['messages_per_second'] > 0
+    assert metrics['cpu_per_message'] > 0
+    assert metrics['peak_rss_kb'] > 0
+
+
+def test_columnar_batches_hold_less_memory():
+    per_message = measure_queue_memory(10000, columnar=False) / 10000
+    columnar_per_message = measure_queue_memory(10000, columnar=True) / 10000
+
+    # A body is 100 bytes; the columns add a phone number and an offset per message
+    assert columnar_per_message < 120
+    assert columnar_per_message < per_message / 2
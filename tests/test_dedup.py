@@ -0,0 +1,88 @@
+import queue
+import threading
+
+import pytest
+
+from sms_alert_forge.dedup import Deduplicator, TtlCache, WindowedBloomFilter, message_digest
+from sms_alert_forge.producer import Message, generate_batches
+from sms_alert_forge.replay import TraceProducer
+
+
+def test_message_digest_depends_on_phone_and_body():
+    assert message_digest(5551234567, 'alert') == message_digest(5551234567, b'alert')
+    assert message_digest(5551234567, 'alert') != message_digest(5551234568, 'alert')
+    assert message_digest(5551234567, 'alert') != message_digest(5551234567, 'alert!')
+
+
+@pytest.mark.parametrize('seen', [TtlCache(10), WindowedBloomFilter(10, capacity=1000)])
+def test_window_is_not_extended_by_duplicates(seen):
+    key = message_digest(5551234567, 'alert')
+    if isinstance(seen, TtlCache):
+        key = key[0]
+
+    assert not seen.check_and_add(key, 0.0)
+    assert seen.check_and_add(key, 5.0)
+    assert seen.check_and_add(key, 9.0)
+    # A storm still gets the alert through once its window has passed; the Bloom filter forgets within two windows
+    assert not seen.check_and_add(key, 25.0)
+
+
+def test_ttl_cache_is_bounded():
+    cache = TtlCache(60, max_entries=3)
+    for key in range(5):
+        cache.check_and_add(key, 0.0)
+
+    assert not cache.check_and_add(0, 1.0)
+    assert cache.check_and_add(4, 1.0)
+
+
+def test_bloom_filter_false_positive_rate():
+    bloom = WindowedBloomFilter(60, capacity=10000, error_rate=0.01)
+    false_positives = sum(bloom.check_and_add(message_digest(i, 'alert'), 0.0) for i in range(10000))
+
+    assert false_positives < 300
+    assert bloom.memory < 30000
+
+
+@pytest.mark.parametrize('mode', ['exact', 'bloom'])
+def test_deduplicator_filters_messages_and_batches(mode):
+    deduplicator = Deduplicator(window=60, mode=mode, capacity=1000)
+    messages = [Message(5550000000 + i % 3, f"alert {i % 3}") for i in range(9)]
+
+    assert deduplicator.filter(messages) == messages[:3]
+    batch = generate_batches(10)[0]
+    kept = deduplicator.filter([batch, batch])
+    assert kept == [batch]
+    partial = deduplicator.filter([Message(batch.phone_numbers[0], batch.body(0).decode('ascii')),
+                                   Message(1, 'new')])
+    assert partial == [Message(1, 'new')]
+
+    stats = deduplicator.stats()
+    assert stats['lookups'] == 31
+    assert stats['suppressed'] == 17
+    assert stats['mean_lookup_time'] > 0
+
+
+def test_deduplicator_rebuilds_partly_duplicate_batches():
+    deduplicator = Deduplicator(window=60)
+    batch = generate_batches(5)[0]
+    deduplicator.filter([Message(batch.phone_numbers[1], batch.body(1).decode('ascii'))])
+
+    kept = deduplicator.filter([batch])[0]
+    assert len(kept) == 4
+    assert list(kept.messages()) == [batch.message(i) for i in (0, 2, 3, 4)]
+
+
+def test_trace_producer_drops_duplicates(tmp_path):
+    path = tmp_path / 'storm.csv'
+    path.write_text(''.join(f'{1700000000 + i},5551234567,"disk full on db{i % 2}"\n' for i in range(20)))
+    message_queue = queue.Queue()
+
+    producer = TraceProducer(str(path), message_queue, threading.Event(), 1, speed=None,
+                             deduplicator=Deduplicator(window=60))
+    producer.start()
+    producer.join()
+
+    assert producer.messages_produced == 20
+    assert [message_queue.get().body for _ in range(2)] == ['disk full on db0', 'disk full on db1']
+    assert message_queue.get() is None
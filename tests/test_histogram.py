@@ -0,0 +1,59 @@
+import random
+
+from sms_alert_forge.histogram import LatencyHistogram
+
+
+def test_histogram_empty():
+    latency_histogram = LatencyHistogram()
+
+    assert latency_histogram.percentile(99) == 0.0
+    assert latency_histogram.summary() == {'p50': 0.0, 'p90': 0.0, 'p99': 0.0, 'p99.9': 0.0, 'max': 0.0}
+
+
+def test_histogram_percentiles_within_bucket_precision():
+    rng = random.Random(42)
+    values = sorted(rng.uniform(0.001, 2.0) for _ in range(20000))
+    latency_histogram = LatencyHistogram()
+    for value in values:
+        latency_histogram.record(value)
+
+    for percentile in (50, 90, 99, 99.9):
+        expected = values[int(len(values) * percentile / 100) - 1]
+        assert abs(latency_histogram.percentile(percentile) - expected) / expected < 0.02
+    assert latency_histogram.summary()['max'] == values[-1]
+
+
+def test_histogram_merge():
+    fast = LatencyHistogram()
+    slow = LatencyHistogram()
+    fast.record(0.01, 99)
+    slow.record(1.5)
+
+    merged = LatencyHistogram()
+    merged.merge(fast)
+    merged.merge(slow)
+
+    assert merged.total_count == 100
+    assert abs(merged.percentile(50) - 0.01) < 0.0002
+    assert merged.percentile(100) == 1.5
+    assert merged.max_value == 1.5
+
+
+def test_histogram_clamps_out_of_range_values():
+    latency_histogram = LatencyHistogram()
+    latency_histogram.record(-0.5)
+    latency_histogram.record(10 ** 9)
+
+    assert latency_histogram.total_count == 2
+    assert latency_histogram.percentile(50) == 0.0
+
+
+def test_histogram_cumulative_counts():
+    latency_histogram = LatencyHistogram()
+    latency_histogram.record(0.002, 3)
+    latency_histogram.record(0.2)
+    latency_histogram.record(20.0)
+
+    counts, total = latency_histogram.cumulative_counts([0.001, 0.01, 1.0])
+    assert counts == [0, 3, 4]
+    assert abs(total - 20.206) < 0.1
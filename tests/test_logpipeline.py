@@ -0,0 +1,40 @@
+import logging
+
+from sms_alert_forge.logpipeline import (BufferedFileHandler, RateLimitFilter, flush_logging, start_logging,
+                                         stop_logging)
+
+
+def make_record(msg, level=logging.WARNING):
+    return logging.LogRecord('root', level, __file__, 1, msg, None, None)
+
+
+def test_rate_limit_filter_drops_excess_records():
+    rate_limit = RateLimitFilter(3)
+
+    passed = [rate_limit.filter(make_record("Message sending failed.")) for _ in range(10)]
+
+    assert passed.count(True) <= 6  # the limit may reset once if the loop crosses a second boundary
+    assert rate_limit.filter(make_record("Another message."))
+    assert rate_limit.filter(make_record("Message sending failed.", logging.ERROR))
+
+
+def test_pipeline_writes_records_on_flush(tmp_path):
+    log_file = tmp_path / 'pipeline.log'
+    file_handler = BufferedFileHandler(str(log_file))
+    file_handler.setFormatter(logging.Formatter('%(levelname)s - %(message)s'))
+    root_logger = logging.getLogger()
+    previous_level = root_logger.level
+    root_logger.setLevel(logging.INFO)
+
+    try:
+        start_logging([file_handler])
+        for i in range(100):
+            logging.info("Record %d", i)
+        flush_logging()
+
+        lines = log_file.read_text().splitlines()
+        assert lines[0] == 'INFO - Record 0'
+        assert lines[-1] == 'INFO - Record 99'
+    finally:
+        stop_logging()
+        root_logger.setLevel(previous_level)
@@ -0,0 +1,71 @@
+import queue
+import threading
+import urllib.request
+
+from sms_alert_forge.histogram import LatencyHistogram
+from sms_alert_forge.metrics import (MetricsRegistry, MetricsServer, MetricsSnapshotWriter, pipeline_collector,
+                                     start_exporters)
+from sms_alert_forge.producer import Message
+
+
+class FakeSender:
+    def __init__(self, messages_sent, messages_failed):
+        self.messages_sent = messages_sent
+        self.messages_failed = messages_failed
+        self.messages_retried = 1
+        self.busy_time = 0.5
+        self.latency_histogram = LatencyHistogram()
+        self.latency_histogram.record(0.02, messages_sent + messages_failed)
+
+    def is_alive(self):
+        return True
+
+
+def make_registry():
+    message_queue = queue.Queue()
+    message_queue.put(Message(1, 'x'))
+    registry = MetricsRegistry()
+    registry.register(pipeline_collector([FakeSender(3, 1), FakeSender(5, 0)], message_queue))
+    return registry
+
+
+def test_registry_renders_openmetrics():
+    text = make_registry().render()
+    lines = text.splitlines()
+
+    assert lines[-1] == '# EOF'
+    assert '# TYPE smsalertforge_messages_sent counter' in lines
+    assert 'smsalertforge_messages_sent_total{sender="1"} 5' in lines
+    assert 'smsalertforge_messages_failed_total{sender="0"} 1' in lines
+    assert 'smsalertforge_queue_depth 1' in lines
+    assert 'smsalertforge_senders_running 2' in lines
+    assert 'smsalertforge_send_latency_seconds_bucket{le="0.01"} 0' in lines
+    assert 'smsalertforge_send_latency_seconds_bucket{le="0.025"} 9' in lines
+    assert 'smsalertforge_send_latency_seconds_bucket{le="+Inf"} 9' in lines
+    assert 'smsalertforge_send_latency_seconds_count 9' in lines
+
+
+def test_metrics_endpoint():
+    server = MetricsServer(make_registry(), port=0).start()
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.port}/metrics") as response:
+            assert response.headers['Content-Type'].startswith('application/openmetrics-text')
+            assert 'smsalertforge_messages_sent_total{sender="0"} 3' in response.read().decode('utf-8')
+    finally:
+        server.stop()
+
+
+def test_snapshot_writer(tmp_path):
+    path = tmp_path / 'metrics' / 'snapshot.prom'
+    writer = MetricsSnapshotWriter(make_registry(), str(path), interval=0.01)
+    writer.start()
+    threading.Event().wait(0.05)
+    assert path.read_text().endswith('# EOF\n')
+    writer.stop()
+
+    assert not writer.is_alive()
+    assert 'smsalertforge_queue_depth 1' in path.read_text()
+
+
+def test_exporters_are_optional():
+    assert start_exporters({}, MetricsRegistry()) == []
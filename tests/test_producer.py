@@ -1,7 +1,8 @@
 import queue
 import threading
 import time
-from sms_alert_forge.producer import MessageProducer
+from sms_alert_forge.messages import MessageBatch
+from sms_alert_forge.producer import MessageProducer, generate_batches
 
 
 def test_producer_no_messages():
@@ -72,3 +73,77 @@ def test_producer_interrupted():
     assert not producer.is_alive()
     assert message_queue.qsize() > 0
 
+
+
+def test_producer_batches():
+    message_queue = queue.Queue()
+    stop_event = threading.Event()
+    num_messages = 25
+    num_senders = 2
+
+    producer = MessageProducer(num_messages, message_queue, stop_event, num_senders, batch_size=10)
+    producer.start()
+    producer.join()
+
+    messages = [message_queue.get() for _ in range(num_messages)]
+    assert producer.messages_produced == num_messages
+    assert all(1000000000 <= message.phone_number <= 9999999999 for message in messages)
+    assert all(len(message.body) == 100 and message.body.isalnum() for message in messages)
+    assert all(message.priority is None for message in messages)
+    assert all(message_queue.get() is None for _ in range(num_senders))
+
+
+def test_producer_rate():
+    message_queue = queue.Queue()
+    stop_event = threading.Event()
+
+    producer = MessageProducer(20, message_queue, stop_event, 1, batch_size=5, rate=100)
+    start_time = time.monotonic()
+    producer.start()
+    producer.join()
+
+    assert time.monotonic() - start_time >= 0.15
+    assert message_queue.qsize() == 21
+
+
+def test_producer_priorities():
+    message_queue = queue.Queue()
+    stop_event = threading.Event()
+
+    producer = MessageProducer(2000, message_queue, stop_event, 1, batch_size=100,
+                               priorities={'critical': 0.1, 'bulk': 0.9})
+    producer.start()
+    producer.join()
+
+    messages = [message_queue.get() for _ in range(2000)]
+    critical = sum(1 for message in messages if message.priority == 'critical')
+    assert 100 < critical < 300
+    assert all(message.priority in ('critical', 'bulk') for message in messages)
+    assert all(message.created_at <= time.monotonic() for message in messages)
+
+
+def test_generate_batches_per_class():
+    batches = generate_batches(1000, {'critical': 0.2, 'bulk': 0.8})
+
+    assert sorted(batch.priority for batch in batches) == ['bulk', 'critical']
+    assert sum(len(batch) for batch in batches) == 1000
+    batch = batches[0]
+    assert batch.phone_numbers.typecode == 'q'
+    assert len(batch.bodies) == 100 * len(batch)
+    assert all(1000000000 <= phone_number <= 9999999999 for phone_number in batch.phone_numbers)
+    message = batch.message(3)
+    assert message.body == batch.bodies[300:400].decode('ascii')
+    assert message.priority == batch.priority
+    assert generate_batches(0) == []
+
+
+def test_producer_columnar():
+    message_queue = queue.Queue()
+    producer = MessageProducer(25, message_queue, threading.Event(), 2, batch_size=10, columnar=True)
+    producer.start()
+    producer.join()
+
+    items = [message_queue.get() for _ in range(5)]
+    assert [len(item) for item in items[:3]] == [10, 10, 5]
+    assert all(isinstance(item, MessageBatch) for item in items[:3])
+    assert items[3:] == [None, None]
@@ -0,0 +1,65 @@
+import os
+import pstats
+import queue
+import threading
+
+from sms_alert_forge.producer import Message, MessageProducer
+from sms_alert_forge.profiling import Profiler, SpanTimer
+from sms_alert_forge.sender import MessageSender
+
+
+def test_span_timer_charges_time_to_phases():
+    spans = SpanTimer()
+    spans.start()
+    spans.mark('dequeue')
+    threading.Event().wait(0.02)
+    spans.mark('send')
+    spans.mark('send')
+
+    assert spans.counts == {'dequeue': 1, 'send': 2}
+    assert spans.totals['send'] >= 0.02
+    assert spans.totals['dequeue'] < spans.totals['send']
+
+
+def test_spans_are_off_by_default():
+    message_queue = queue.Queue()
+    stop_event = threading.Event()
+    assert MessageSender(message_queue, 0.0, 0.01, stop_event).spans is None
+    assert MessageProducer(10, message_queue, stop_event, 1).spans is None
+
+
+def test_profiler_writes_profile_stacks_and_phases(tmp_path):
+    message_queue = queue.Queue()
+    for i in range(20):
+        message_queue.put(Message(i, f"Message {i}"))
+    message_queue.put(None)
+
+    profiler = Profiler(str(tmp_path), sample_interval=0.001)
+    sender = profiler.instrument(MessageSender(message_queue, 0.0, 0.005, threading.Event()))
+    profiler.start()
+    sender.start()
+    sender.join()
+    report = profiler.stop()
+
+    assert sender.messages_sent == 20
+    stats = pstats.Stats(str(tmp_path / 'profile.pstats'))
+    assert any(name == '_deliver' for _, _, name in stats.stats)
+    with open(tmp_path / 'profile.folded') as f:
+        assert any(line.startswith('MessageSender;') for line in f)
+    phases = report['phases']['MessageSender']
+    assert {'dequeue', 'send', 'account'} <= set(phases)
+    assert phases['send']['count'] == 20
+    assert phases['send']['time'] > phases['account']['time']
+    assert abs(sum(values['share'] for values in phases.values()) - 1) < 1e-9
+    assert os.path.exists(tmp_path / 'phases.txt')
+
+
+def test_profiler_traces_memory(tmp_path):
+    profiler = Profiler(str(tmp_path), memory=True)
+    profiler.start()
+    data = [bytearray(1024) for _ in range(100)]
+    report = profiler.stop()
+
+    assert len(data) == 100
+    assert report['memory_peak'] >= 100 * 1024
+    assert os.path.exists(tmp_path / 'memory.txt')
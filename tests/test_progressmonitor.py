@@ -0,0 +1,110 @@
+import logging
+import threading
+
+from sms_alert_forge.autoscaler import ScaleEvent
+from sms_alert_forge.histogram import ClassStats, LatencyHistogram
+from sms_alert_forge.producer import Message
+from sms_alert_forge.progressmonitor import ProgressMonitor
+
+
+class FakeSender:
+    def __init__(self, messages_sent, messages_failed, alive=True):
+        self.messages_sent = messages_sent
+        self.messages_failed = messages_failed
+        self.total_processing_time = 0.1 * messages_sent
+        self.latency_histogram = LatencyHistogram()
+        self.latency_histogram.record(0.1, messages_sent + messages_failed)
+        self.alive = alive
+
+    def is_alive(self):
+        return self.alive
+
+
+def test_monitor_final_report():
+    sms_report = {}
+    senders = [FakeSender(3, 1, alive=False), FakeSender(2, 0, alive=False)]
+
+    monitor = ProgressMonitor(None, senders, 0.01, threading.Event(), sms_report)
+    monitor.start()
+    monitor.join()
+
+    assert sms_report['messages_sent'] == 5
+    assert sms_report['messages_failed'] == 1
+    assert abs(sms_report['average_time_per_message'] - 0.1) < 1e-9
+    assert abs(sms_report['latency_p99'] - 0.1) < 0.001
+    assert monitor.should_terminate.is_set()
+
+
+def test_monitor_logs_only_on_change(caplog):
+    sender = FakeSender(1, 0)
+    stop_event = threading.Event()
+    monitor = ProgressMonitor(None, [sender], 0.01, stop_event, {}, refresh_interval=10)
+
+    with caplog.at_level(logging.INFO):
+        monitor.start()
+        threading.Event().wait(0.2)
+        sender.messages_sent = 2
+        threading.Event().wait(0.2)
+        sender.alive = False
+        monitor.join()
+
+    progress_lines = [record.getMessage() for record in caplog.records if 'Messages Sent' in record.getMessage()]
+    # One line for the first update, one for the change and one for the final update
+    assert len(progress_lines) == 3
+    assert 'Messages Sent: 2 | Messages Failed: 0' in progress_lines[-1]
+
+
+def test_monitor_reports_priority_classes():
+    sms_report = {}
+    senders = [FakeSender(2, 0, alive=False), FakeSender(1, 1, alive=False)]
+    for sender, (priority, failed) in zip(senders, [('critical', False), ('critical', True)]):
+        sender.class_stats = ClassStats()
+        sender.class_stats.record(Message(1, 'x', priority, 10.0), failed, 10.5)
+        sender.class_stats.record(Message(1, 'x', 'bulk', 10.0), False, 12.0)
+
+    monitor = ProgressMonitor(None, senders, 0.01, threading.Event(), sms_report)
+    monitor.start()
+    monitor.join()
+
+    assert sms_report['classes']['critical']['messages_sent'] == 1
+    assert sms_report['classes']['critical']['messages_failed'] == 1
+    assert abs(sms_report['classes']['critical']['latency_p99'] - 0.5) < 0.01
+    assert abs(sms_report['classes']['bulk']['latency_max'] - 2.0) < 1e-9
+    assert sms_report['classes']['bulk']['throughput'] > 0
+
+
+def test_monitor_reports_transport():
+    class FakeTransport:
+        def stats(self):
+            return {'requests': 10, 'connections_opened': 2, 'connection_reuse': 0.8, 'mean_pool_wait': 0.001,
+                    'request_latency_p99': 0.05}
+
+    sms_report = {}
+    transport = FakeTransport()
+    senders = [FakeSender(5, 0, alive=False), FakeSender(5, 0, alive=False)]
+    for sender in senders:
+        sender.transport = transport
+
+    monitor = ProgressMonitor(None, senders, 0.01, threading.Event(), sms_report)
+    monitor.start()
+    monitor.join()
+
+    assert sms_report['transport']['requests'] == 10
+    assert sms_report['transport']['connection_reuse'] == 0.8
+
+
+def test_monitor_reports_scale_events():
+    class FakeAutoscaler:
+        active_senders = [None, None, None]
+        peak_senders = 4
+        scale_events = [ScaleEvent(0.5, 1, 4, 'queue 100'), ScaleEvent(2.0, 4, 3, 'queue 0')]
+
+    sms_report = {}
+    monitor = ProgressMonitor(None, [FakeSender(5, 0, alive=False)], 0.01, threading.Event(), sms_report,
+                              autoscaler=FakeAutoscaler())
+    monitor.start()
+    monitor.join()
+
+    assert sms_report['autoscaler']['peak_senders'] == 4
+    assert sms_report['autoscaler']['senders'] == 3
+    assert sms_report['autoscaler']['scale_events'][0]['senders_after'] == 4
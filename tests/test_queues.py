@@ -0,0 +1,152 @@
+import queue
+import threading
+import time
+
+import pytest
+
+from sms_alert_forge.producer import Message, generate_batches
+from sms_alert_forge.queues import DeficitRoundRobin, WatermarkQueue, WeightedFairQueue, get_many, put_many, task_done_many
+
+
+def test_put_many_and_get_many():
+    message_queue = queue.Queue()
+    put_many(message_queue, [1, 2, 3, None, None])
+
+    assert get_many(message_queue, 10) == [1, 2, 3, None]
+    assert get_many(message_queue, 10) == [None]
+    assert message_queue.unfinished_tasks == 5
+
+
+def test_task_done_many():
+    message_queue = queue.Queue()
+    put_many(message_queue, [1, 2, 3])
+    get_many(message_queue, 3)
+
+    task_done_many(message_queue, 3)
+    message_queue.join()
+    with pytest.raises(ValueError):
+        task_done_many(message_queue, 1)
+
+
+def test_put_many_respects_maxsize():
+    message_queue = queue.Queue(maxsize=2)
+
+    producer = threading.Thread(target=put_many, args=(message_queue, [1, 2, 3, 4, 5]))
+    producer.start()
+    received = []
+    while len(received) < 5:
+        received.extend(get_many(message_queue, 10))
+    producer.join()
+
+    assert received == [1, 2, 3, 4, 5]
+
+
+def test_watermark_queue_resumes_at_low_watermark():
+    message_queue = WatermarkQueue(4, 1)
+    put_many(message_queue, [1, 2, 3, 4])
+    assert message_queue.throttled
+
+    with pytest.raises(queue.Full):
+        message_queue.put(5, block=False)
+
+    message_queue.get()
+    message_queue.get()
+    # Depth 2 is below the high watermark but still above the low one
+    assert message_queue.throttled
+
+    message_queue.get()
+    assert not message_queue.throttled
+    message_queue.put(5, block=False)
+    assert message_queue.max_depth == 4
+    assert message_queue.throttle_count == 1
+
+
+def test_watermark_queue_records_blocked_time():
+    message_queue = WatermarkQueue(2, 0)
+    message_queue.put(1)
+    message_queue.put(2)
+
+    def drain():
+        time.sleep(0.2)
+        message_queue.get()
+        message_queue.get()
+
+    consumer = threading.Thread(target=drain)
+    consumer.start()
+    message_queue.put(3)
+    consumer.join()
+
+    assert message_queue.blocked_time >= 0.15
+    assert message_queue.get() == 3
+
+
+def test_watermark_queue_releases_on_stop():
+    stop_event = threading.Event()
+    message_queue = WatermarkQueue(1, 0, stop_event)
+    message_queue.put(1)
+
+    threading.Timer(0.1, stop_event.set).start()
+    message_queue.put(2)
+
+    assert message_queue.qsize() == 1
+
+
+def test_deficit_round_robin_serves_lanes_by_weight():
+    lanes = DeficitRoundRobin({'critical': 3, 'bulk': 1})
+    for i in range(8):
+        lanes.append(Message(i, 'bulk', 'bulk'))
+    for i in range(6):
+        lanes.append(Message(i, 'critical', 'critical'))
+
+    order = [lanes.popleft().priority for _ in range(14)]
+
+    # Bulk arrived first but only gets one dequeue per three critical ones until critical runs dry
+    assert order[:8] == ['bulk', 'critical', 'critical', 'critical', 'bulk', 'critical', 'critical', 'critical']
+    assert order[8:] == ['bulk'] * 6
+    assert not lanes
+
+
+def test_deficit_round_robin_keeps_fifo_within_a_class():
+    lanes = DeficitRoundRobin({'a': 1.5, 'b': 0.5}, default_class='b')
+    for i in range(4):
+        lanes.append(Message(i, 'a', 'a'))
+        lanes.append(('plain', i))
+
+    popped = [lanes.popleft() for _ in range(8)]
+
+    assert [message.phone_number for message in popped if getattr(message, 'priority', None) == 'a'] == [0, 1, 2, 3]
+    assert [message[1] for message in popped if message[0] == 'plain'] == [0, 1, 2, 3]
+    with pytest.raises(ValueError):
+        DeficitRoundRobin({'a': 0})
+
+
+def test_weighted_fair_queue_delivers_sentinels_last():
+    message_queue = WeightedFairQueue({'critical': 2, 'bulk': 1})
+    put_many(message_queue, [Message(1, 'x', 'bulk'), None, Message(2, 'x', 'critical'), None])
+
+    assert message_queue.queue.depths() == {'critical': 1, 'bulk': 1}
+    assert get_many(message_queue, 10) == [Message(1, 'x', 'bulk'), Message(2, 'x', 'critical'), None]
+    assert message_queue.get() is None
+
+
+def test_watermark_queue_with_priority_lanes():
+    message_queue = WatermarkQueue(3, 1, weights={'critical': 4, 'bulk': 1})
+    put_many(message_queue, [Message(i, 'x', 'bulk') for i in range(2)] + [Message(9, 'x', 'critical')])
+    assert message_queue.throttled
+
+    assert message_queue.get().phone_number == 0
+    assert message_queue.get().priority == 'critical'
+    assert not message_queue.throttled
+
+
+def test_deficit_round_robin_charges_batches_per_message():
+    lanes = DeficitRoundRobin({'critical': 4, 'bulk': 4})
+    for _ in range(3):
+        lanes.append(generate_batches(8, {'bulk': 1})[0])
+    for i in range(12):
+        lanes.append(Message(i, 'critical', 'critical'))
+
+    order = [getattr(lanes.popleft(), 'priority') for _ in range(6)]
+
+    # A batch of 8 overdraws the bulk lane's credit of 4, so it waits a round while critical catches up
+    assert order == ['bulk', 'critical', 'critical', 'critical', 'critical', 'critical']
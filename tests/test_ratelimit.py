@@ -0,0 +1,127 @@
+import queue
+import threading
+import time
+
+from sms_alert_forge.histogram import LatencyHistogram
+from sms_alert_forge.pipeline import build_pipeline
+from sms_alert_forge.producer import Message
+from sms_alert_forge.ratelimit import RateLimiter
+from sms_alert_forge.retry import RetryScheduler
+from sms_alert_forge.sender import MessageSender
+
+
+def test_bucket_allows_burst_then_defers():
+    limiter = RateLimiter(rate=10, burst=3)
+
+    assert [limiter.acquire(5551234567, now=100.0) for _ in range(3)] == [0.0, 0.0, 0.0]
+    # Every refused message reserves its own token, due one interval after the one before
+    delays = [limiter.acquire(5551234567, now=100.0) for _ in range(3)]
+    assert all(abs(delay - expected) < 1e-9 for delay, expected in zip(delays, (0.1, 0.2, 0.3)))
+    # Refilled lazily from the time elapsed since the last use, once the reserved tokens are paid back
+    assert limiter.acquire(5559999999, now=100.45) == 0.0
+    assert abs(limiter.acquire(5559999999, now=100.45) - 0.05) < 1e-9
+    # Other prefixes have their own bucket
+    assert limiter.acquire(4441234567, now=100.45) == 0.0
+    assert limiter.throttled == {'555': 4}
+
+
+def test_carriers_match_longest_prefix():
+    limiter = RateLimiter(carriers={'acme': {'prefixes': ['55'], 'rate': 1, 'burst': 1},
+                                    'zeta': {'prefixes': [555], 'rate': 100, 'burst': 5}})
+
+    assert limiter.key(5551234567) == 'zeta'
+    assert limiter.key(5501234567) == 'acme'
+    assert limiter.acquire(5501234567, now=0.0) == 0.0
+    assert limiter.acquire(5511234567, now=0.5) == 0.5
+    # Numbers outside the carriers are not limited without a default rate
+    assert all(limiter.acquire(1234567890, now=0.0) == 0.0 for _ in range(10))
+
+
+def test_idle_buckets_are_evicted():
+    limiter = RateLimiter(rate=1, burst=2, prefix_length=4, idle_timeout=5)
+    for prefix in range(1000, 1100):
+        limiter.acquire(prefix * 1000000, now=0.0)
+    assert len(limiter) == 100
+
+    for prefix in range(2000, 2100):
+        limiter.acquire(prefix * 1000000, now=10.0)
+    assert limiter.evicted > 0
+    assert len(limiter) < 200
+
+
+def test_sender_defers_throttled_messages():
+    message_queue = queue.Queue()
+    stop_event = threading.Event()
+    limiter = RateLimiter(rate=50, burst=5)
+    producer = threading.Thread(target=lambda: [message_queue.put(Message(5550000000 + i, f"Message {i}"))
+                                                for i in range(30)])
+    scheduler = RetryScheduler(message_queue, stop_event, 2, producer=producer, max_attempts=1)
+    senders = [MessageSender(message_queue, 0.0, 0.001, stop_event, retry_scheduler=scheduler, rate_limiter=limiter)
+               for _ in range(2)]
+
+    start = time.monotonic()
+    producer.start()
+    scheduler.start()
+    for sender in senders:
+        sender.start()
+    for sender in senders:
+        sender.join()
+    scheduler.join()
+
+    assert sum(sender.messages_sent for sender in senders) == 30
+    # Each message is deferred at most once, for as long as its reserved token takes
+    assert sum(sender.messages_throttled for sender in senders) == 25
+    deferrals = LatencyHistogram()
+    for sender in senders:
+        deferrals.merge(sender.deferral_histogram)
+    assert deferrals.total_count == 25
+    assert 0.45 <= deferrals.max_value <= 0.55
+    assert scheduler.deferrals == sum(sender.messages_throttled for sender in senders)
+    # 5 messages go out in the burst and the other 25 at 50 per second
+    assert time.monotonic() - start >= 0.45
+
+
+def test_pipeline_rate_limits_columnar_batches():
+    config = {
+        'messages': {'num_messages': 40, 'batch_size': 20, 'columnar': True},
+        'senders': {'num_senders': 2, 'batch_size': 5, 'failure_rate': 0.0, 'mean_processing_time': 0.001},
+        'rate_limits': {'rate': 400, 'burst': 2, 'prefix_length': 1},
+    }
+    stop_event = threading.Event()
+    _, producer, senders, retry_scheduler, _ = build_pipeline(config, stop_event)
+    assert retry_scheduler is not None
+
+    producer.start()
+    retry_scheduler.start()
+    for sender in senders:
+        sender.start()
+    for sender in senders:
+        sender.join()
+    retry_scheduler.join()
+
+    assert sum(sender.messages_sent for sender in senders) == 40
+    assert sum(sender.messages_throttled for sender in senders) > 0
+
+
+def test_durable_queue_keeps_reservations_of_deferred_messages(tmp_path):
+    config = {
+        'messages': {'num_messages': 30, 'batch_size': 10},
+        'senders': {'num_senders': 2, 'failure_rate': 0.0, 'mean_processing_time': 0.001},
+        'queue': {'durable_path': str(tmp_path / 'queue.ring'), 'durable_capacity': 64},
+        'rate_limits': {'rate': 50, 'burst': 5, 'prefix_length': 0},
+    }
+    stop_event = threading.Event()
+    message_queue, producer, senders, retry_scheduler, _ = build_pipeline(config, stop_event)
+
+    start = time.monotonic()
+    for thread in (producer, retry_scheduler, *senders):
+        thread.start()
+    for thread in (producer, retry_scheduler, *senders):
+        thread.join(timeout=5)
+
+    assert sum(sender.messages_sent for sender in senders) == 30
+    # Deferred messages come back from the file's requeue with their reserved token, so each is deferred once
+    assert sum(sender.messages_throttled for sender in senders) == 25
+    assert time.monotonic() - start < 2
+    assert (message_queue.queue.pending(), message_queue.queue.produced) == (0, 30)
+    message_queue.close()
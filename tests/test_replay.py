@@ -0,0 +1,120 @@
+import json
+import queue
+import threading
+import time
+
+from sms_alert_forge.pipeline import build_pipeline
+from sms_alert_forge.replay import TraceProducer, read_lines, read_trace
+from sms_alert_forge.sharding import ShardedSenderPool
+
+
+def write_csv_trace(path, count, interval=1.0):
+    with open(path, 'w') as f:
+        f.write('timestamp,phone,body,priority\n')
+        for i in range(count):
+            f.write(f'{1700000000 + i * interval},555000{i:04d},"alert {i}, see runbook",{"critical" if i % 2 else "bulk"}\n')
+
+
+def test_read_lines_across_chunks(tmp_path):
+    path = tmp_path / 'lines.txt'
+    path.write_bytes(b'first line\r\nsecond\n\nthird without newline')
+
+    assert list(read_lines(str(path), chunk_size=3)) == [b'first line', b'second', b'', b'third without newline']
+
+
+def test_read_csv_trace(tmp_path):
+    path = tmp_path / 'trace.csv'
+    write_csv_trace(path, 3)
+    headerless = tmp_path / 'headerless.csv'
+    headerless.write_text('2024-01-01T00:00:01+00:00,5551234567,"multi\nline body"\n')
+
+    records = list(read_trace(str(path), chunk_size=16))
+    assert records[1] == (1700000001.0, '5550000001', 'alert 1, see runbook', 'critical')
+    assert len(records) == 3
+    assert list(read_trace(str(headerless))) == [(1704067201.0, '5551234567', 'multi\nline body', None)]
+
+
+def test_read_jsonl_trace(tmp_path):
+    path = tmp_path / 'trace.jsonl'
+    path.write_text('\n'.join(json.dumps({'timestamp': 10 + i, 'phone': 5550000000 + i, 'body': f'alert {i}'})
+                              for i in range(3)) + '\n')
+
+    records = list(read_trace(str(path)))
+    assert records[2] == (12.0, 5550000002, 'alert 2', None)
+
+
+def test_trace_producer_honours_inter_arrival_times(tmp_path):
+    path = tmp_path / 'trace.csv'
+    write_csv_trace(path, 4, interval=1.0)
+    message_queue = queue.Queue()
+
+    producer = TraceProducer(str(path), message_queue, threading.Event(), 1, speed=10)
+    start_time = time.monotonic()
+    producer.start()
+    producer.join()
+
+    # Three one-second gaps replayed ten times faster
+    assert 0.25 < time.monotonic() - start_time < 1.0
+    messages = [message_queue.get() for _ in range(4)]
+    assert [message.phone_number for message in messages] == [5550000000, 5550000001, 5550000002, 5550000003]
+    assert messages[1].priority == 'critical'
+    assert message_queue.get() is None
+
+
+def test_trace_producer_as_fast_as_possible_with_skip_and_shard(tmp_path):
+    path = tmp_path / 'trace.csv'
+    write_csv_trace(path, 10, interval=60.0)
+    message_queue = queue.Queue()
+
+    producer = TraceProducer(str(path), message_queue, threading.Event(), 0, speed=None, skip=1, shard=(1, 2),
+                             num_messages=3, batch_size=2)
+    producer.start()
+    producer.join(timeout=5)
+
+    assert not producer.is_alive()
+    assert [message_queue.get().body for _ in range(3)] == ['alert 3, see runbook', 'alert 5, see runbook',
+                                                            'alert 7, see runbook']
+    assert message_queue.empty()
+
+
+def test_pipeline_replays_trace(tmp_path):
+    path = tmp_path / 'trace.csv'
+    write_csv_trace(path, 20, interval=0.001)
+    config = {
+        'messages': {'num_messages': None, 'trace': str(path), 'trace_speed': None},
+        'senders': {'num_senders': 2, 'failure_rate': 0.0, 'mean_processing_time': 0.001},
+        'priorities': {'critical': {'weight': 2}, 'bulk': {'weight': 1}},
+    }
+
+    _, producer, senders, _, _ = build_pipeline(config, threading.Event())
+    producer.start()
+    for sender in senders:
+        sender.start()
+    producer.join()
+    for sender in senders:
+        sender.join()
+
+    assert sum(sender.messages_sent for sender in senders) == 20
+    assert sum(sender.class_stats.classes['critical'][0] for sender in senders) == 10
+
+
+def test_sharded_pool_replays_whole_trace(tmp_path):
+    path = tmp_path / 'trace.csv'
+    write_csv_trace(path, 21, interval=0.001)
+    config = {
+        'messages': {'trace': str(path), 'trace_speed': None},
+        'senders': {'num_senders': 2, 'failure_rate': 0.0, 'mean_processing_time': 0.001},
+        'progress_monitor': {'update_interval': 0.05},
+        'shutdown': {'checkpoint_path': str(tmp_path / 'checkpoint.bin')},
+    }
+
+    pool = ShardedSenderPool(config, 3)
+    try:
+        for shard in pool.shards:
+            shard.start()
+        for shard in pool.shards:
+            shard.join()
+
+        assert [shard.messages_sent for shard in pool.shards] == [7, 7, 7]
+    finally:
+        pool.close()
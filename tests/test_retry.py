@@ -0,0 +1,82 @@
+import queue
+import random
+import threading
+import time
+
+from sms_alert_forge.producer import Message
+from sms_alert_forge.retry import RetryScheduler, backoff_delay
+from sms_alert_forge.sender import MessageSender
+
+
+def test_backoff_delay_doubles_up_to_max():
+    rng = random.Random(1)
+
+    assert backoff_delay(1, 0.1, 1.0, 0.0) == 0.1
+    assert backoff_delay(3, 0.1, 1.0, 0.0) == 0.4
+    assert backoff_delay(10, 0.1, 1.0, 0.0) == 1.0
+    assert all(0.1 <= backoff_delay(2, 0.1, 1.0, 0.5, rng) <= 0.2 for _ in range(100))
+
+
+def test_scheduler_reinjects_and_ends_senders():
+    message_queue = queue.Queue()
+    scheduler = RetryScheduler(message_queue, threading.Event(), 2, max_attempts=3, base_delay=0.05, jitter=0)
+
+    # A sender took the message from the queue and failed to send it
+    message_queue.put(Message(1, 'x'))
+    message = message_queue.get()
+    assert scheduler.schedule(message)
+    message_queue.task_done()
+    scheduler.start()
+
+    retried = message_queue.get(timeout=1)
+    assert retried.attempts == 1
+    assert not scheduler.schedule(retried._replace(attempts=2))
+    message_queue.task_done()
+    scheduler.join(timeout=1)
+
+    assert not scheduler.is_alive()
+    assert [message_queue.get_nowait(), message_queue.get_nowait()] == [None, None]
+    assert (scheduler.retries_scheduled, scheduler.retries_exhausted) == (1, 1)
+
+
+def test_senders_do_not_wait_for_retries():
+    message_queue = queue.Queue()
+    stop_event = threading.Event()
+    scheduler = RetryScheduler(message_queue, stop_event, 1, max_attempts=4, base_delay=0.2, jitter=0)
+    sender = MessageSender(message_queue, 1.0, 0.001, stop_event, retry_scheduler=scheduler)
+    for i in range(5):
+        message_queue.put(('1234567890', f'Test message {i}'))
+
+    start_time = time.monotonic()
+    scheduler.start()
+    sender.start()
+    sender.join()
+    scheduler.join()
+
+    # Five messages failing four times each: the backoffs of 0.2, 0.4 and 0.8s overlap instead of adding up
+    assert time.monotonic() - start_time < 2.5
+    assert sender.messages_failed == 5
+    assert sender.messages_retried == 15
+    assert sender.messages_sent == 0
+    assert scheduler.pending == 0
+
+
+def test_retried_messages_can_succeed():
+    message_queue = queue.Queue()
+    stop_event = threading.Event()
+    scheduler = RetryScheduler(message_queue, stop_event, 2, max_attempts=10, base_delay=0.001, max_delay=0.01)
+    senders = [MessageSender(message_queue, 0.5, 0.001, stop_event, batch_size=4, retry_scheduler=scheduler)
+               for _ in range(2)]
+    for i in range(50):
+        message_queue.put(Message(i, 'x'))
+
+    scheduler.start()
+    for sender in senders:
+        sender.start()
+    for sender in senders:
+        sender.join()
+    scheduler.join()
+
+    assert sum(sender.messages_sent + sender.messages_failed for sender in senders) == 50
+    assert sum(sender.retry_successes for sender in senders) > 0
+    assert sum(sender.messages_retried for sender in senders) == scheduler.retries_scheduled
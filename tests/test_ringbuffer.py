@@ -0,0 +1,145 @@
+import multiprocessing
+import os
+import queue
+import threading
+
+import pytest
+
+from sms_alert_forge.pipeline import build_pipeline
+from sms_alert_forge.producer import Message, generate_batches
+from sms_alert_forge.queues import DurableQueue, get_many, mark_done, put_many
+from sms_alert_forge.ringbuffer import MmapRingBuffer
+
+
+def test_ring_buffer_round_trip(tmp_path):
+    ring = MmapRingBuffer(str(tmp_path / 'ring'), capacity=4, priorities=['critical', 'bulk'])
+    ring.append(Message(1234567890, 'hello', 'bulk', 1.5, 2))
+    ring.append(('9876543210', 'plain'))
+    ring.append(None)
+
+    assert len(ring) == 3
+    assert bytes(ring.view(0)) == b'hello'
+    assert ring.popleft() == Message(1234567890, 'hello', 'bulk', 1.5, 2)
+    assert ring.popleft() == Message(9876543210, 'plain', None, 0.0, 0)
+    assert ring.popleft() is None
+    with pytest.raises(ValueError):
+        ring.append(Message(1, 'x' * 101))
+    ring.close()
+
+
+def test_ring_buffer_reuses_slots_only_after_ack(tmp_path):
+    ring = MmapRingBuffer(str(tmp_path / 'ring'), capacity=2)
+    ring.append(Message(1, 'a'))
+    ring.append(Message(2, 'b'))
+    first, second = ring.popleft(), ring.popleft()
+
+    with pytest.raises(OverflowError):
+        ring.append(Message(3, 'c'))
+
+    # Out of order: acknowledging the second record frees nothing until the first is acknowledged too
+    ring.ack(second)
+    assert ring.free() == 0
+    ring.ack(first)
+    assert ring.free() == 2
+    ring.append(Message(3, 'c'))
+    assert ring.popleft().phone_number == 3
+    ring.close()
+
+
+def test_ring_buffer_resumes_unacknowledged(tmp_path):
+    path = str(tmp_path / 'ring')
+    ring = MmapRingBuffer(path, capacity=8)
+    for i in range(5):
+        ring.append(Message(i, f'message {i}'))
+    messages = [ring.popleft() for _ in range(3)]
+    ring.ack(messages[0])
+    ring.ack(messages[2])
+    ring.close()
+
+    ring = MmapRingBuffer(path)
+
+    assert ring.capacity == 8
+    assert ring.resumed == 4
+    assert ring.produced == 5
+    assert [ring.popleft().phone_number for _ in range(4)] == [1, 2, 3, 4]
+    ring.close()
+
+
+def _write_and_crash(path):
+    ring = MmapRingBuffer(path, capacity=16)
+    for i in range(10):
+        ring.append(Message(i, 'x'))
+    for _ in range(6):
+        ring.ack(ring.popleft())
+    os._exit(0)  # Die without closing or flushing the mapping
+
+
+def test_ring_buffer_survives_process_exit(tmp_path):
+    path = str(tmp_path / 'ring')
+    process = multiprocessing.Process(target=_write_and_crash, args=(path,))
+    process.start()
+    process.join()
+
+    ring = MmapRingBuffer(path)
+    assert ring.resumed == 4
+    assert ring.popleft().phone_number == 6
+    ring.close()
+
+
+def test_durable_queue_blocks_until_ack(tmp_path):
+    message_queue = DurableQueue(str(tmp_path / 'ring'), capacity=2)
+    put_many(message_queue, [Message(1, 'a'), Message(2, 'b')])
+    with pytest.raises(queue.Full):
+        message_queue.put(Message(3, 'c'), block=False)
+    message_queue.put(None, block=False)  # Sentinels never need a slot
+
+    messages = get_many(message_queue, 2)
+    threading.Timer(0.1, mark_done, args=(message_queue, messages)).start()
+    message_queue.put(Message(3, 'c'))
+
+    assert message_queue.blocked_time > 0.05
+    assert message_queue.get().phone_number == 3
+    assert message_queue.get() is None
+    message_queue.close()
+
+
+def test_pipeline_resumes_durable_queue(tmp_path):
+    path = str(tmp_path / 'ring')
+    config = {
+        'messages': {'num_messages': 10},
+        'senders': {'num_senders': 1, 'failure_rate': 0.0, 'mean_processing_time': 0.001},
+        'queue': {'durable_path': path, 'durable_capacity': 32},
+    }
+    # An earlier run produced 6 messages and acknowledged 2 before it died
+    ring = MmapRingBuffer(path, capacity=32)
+    for i in range(6):
+        ring.append(Message(i, 'x'))
+    ring.ack(ring.popleft())
+    ring.ack(ring.popleft())
+    ring.close()
+
+    message_queue, producer, senders, _, _ = build_pipeline(config, threading.Event())
+    producer.start()
+    senders[0].start()
+    producer.join()
+    senders[0].join()
+
+    assert producer.num_messages == 4
+    assert senders[0].messages_sent == 8
+    assert message_queue.queue.pending() == 0
+    message_queue.close()
+
+    # A finished file starts over on the next run
+    message_queue, producer, _, _, _ = build_pipeline(config, threading.Event())
+    assert producer.num_messages == 10
+    message_queue.close()
+
+
+def test_durable_queue_stores_batches_as_messages(tmp_path):
+    message_queue = DurableQueue(str(tmp_path / 'ring'), capacity=8)
+    batch = generate_batches(3)[0]
+    message_queue.put(batch)
+
+    assert message_queue.qsize() == 3
+    assert message_queue.get() == batch.message(0)
+    message_queue.close()
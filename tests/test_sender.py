@@ -5,6 +5,10 @@ import warnings
 
 import pytest
 
+from sms_alert_forge.histogram import ClassStats
+from sms_alert_forge.producer import Message, generate_batches
+from sms_alert_forge.queues import WeightedFairQueue, put_many
+from sms_alert_forge.retry import RetryScheduler
 from sms_alert_forge.sender import MessageSender
 
 
@@ -113,7 +117,7 @@ def test_sender_interrupted():
     assert not sender.is_alive()
 
 
-def test_sender_unexpected_exception():
+def test_sender_unexpected_exception(monkeypatch):
     class CustomException(Exception):
         pass
 
@@ -126,7 +130,7 @@ def test_sender_unexpected_exception():
     mean_processing_time = 0.1
 
     # Override the run method to raise a custom exception
-    MessageSender.run = raise_custom_exception
+    monkeypatch.setattr(MessageSender, 'run', raise_custom_exception)
 
     sender = MessageSender(message_queue, failure_rate, mean_processing_time, stop_event)
     sender.start()
@@ -161,3 +165,96 @@ def test_sender_graceful_stop():
 
     # Ensure the sender stops gracefully, and the message is not sent
     assert not sender.is_alive()
+
+
+def test_sender_batches():
+    message_queue = queue.Queue()
+    stop_event = threading.Event()
+
+    sender = MessageSender(message_queue, 0.0, 0.05, stop_event, batch_size=4, max_batch_wait=10)
+    for _ in range(10):
+        message_queue.put(('1234567890', 'Test message'))
+    message_queue.put(None)
+    message_queue.put(None)
+
+    sender.start()
+    sender.join()
+
+    assert sender.messages_sent == 10
+    assert sender.messages_failed == 0
+    assert sender.batches_sent == 3
+    # The sentinel left for another sender must stay on the queue
+    assert message_queue.qsize() == 1
+
+
+def test_sender_batch_failures():
+    message_queue = queue.Queue()
+    stop_event = threading.Event()
+
+    sender = MessageSender(message_queue, 1.0, 0.05, stop_event, batch_size=5)
+    for _ in range(5):
+        message_queue.put(('1234567890', 'Test message'))
+    message_queue.put(None)
+
+    sender.start()
+    sender.join()
+
+    assert sender.messages_sent == 0
+    assert sender.messages_failed == 5
+    assert sender.total_processing_time == 0
+
+
+def test_sender_priority_latency_under_bulk_load():
+    message_queue = WeightedFairQueue({'critical': 8, 'bulk': 1})
+    stop_event = threading.Event()
+    now = time.monotonic()
+    # A backlog of bulk messages queued ahead of a handful of critical alerts
+    put_many(message_queue, [Message(i, 'bulk', 'bulk', now) for i in range(200)]
+             + [Message(i, 'critical', 'critical', now) for i in range(10)] + [None, None])
+
+    senders = [MessageSender(message_queue, 0.0, 0.002, stop_event) for _ in range(2)]
+    for sender in senders:
+        sender.start()
+    for sender in senders:
+        sender.join()
+
+    class_stats = ClassStats()
+    for sender in senders:
+        class_stats.merge(sender.class_stats)
+    critical_sent, _, critical_latency = class_stats.classes['critical']
+    bulk_sent, _, bulk_latency = class_stats.classes['bulk']
+    assert (critical_sent, bulk_sent) == (10, 200)
+    assert critical_latency.max_value < bulk_latency.percentile(50)
+
+
+@pytest.mark.parametrize('batch_size', [1, 4])
+def test_sender_columnar_batches(batch_size):
+    message_queue = queue.Queue()
+    stop_event = threading.Event()
+    put_many(message_queue, generate_batches(10, {'critical': 1}) + [('1234567890', 'Test message'), None])
+
+    sender = MessageSender(message_queue, 0.0, 0.001, stop_event, batch_size=batch_size)
+    sender.start()
+    sender.join()
+
+    assert sender.messages_sent == 11
+    assert sender.latency_histogram.total_count == 11
+    assert sender.class_stats.classes['critical'][0] == 10
+    assert sender.batches_sent == (0 if batch_size == 1 else 4)
+    assert message_queue.unfinished_tasks == 1  # Only the sentinel is never marked done
+
+
+def test_sender_columnar_retries_single_messages():
+    message_queue = queue.Queue()
+    stop_event = threading.Event()
+    scheduler = RetryScheduler(message_queue, stop_event, 1, max_attempts=2, base_delay=0.001)
+    put_many(message_queue, generate_batches(5))
+
+    sender = MessageSender(message_queue, 1.0, 0.001, stop_event, retry_scheduler=scheduler)
+    scheduler.start()
+    sender.start()
+    sender.join()
+    scheduler.join()
+
+    assert sender.messages_retried == 5
+    assert sender.messages_failed == 5
@@ -0,0 +1,63 @@
+import pickle
+
+from sms_alert_forge.histogram import LatencyHistogram
+from sms_alert_forge.sharding import SharedCounters, ShardedSenderPool
+
+
+def make_config(num_messages):
+    return {
+        'messages': {'num_messages': num_messages, 'batch_size': 10},
+        'senders': {'num_senders': 2, 'failure_rate': 0.0, 'mean_processing_time': 0.01},
+        'progress_monitor': {'update_interval': 0.05},
+    }
+
+
+def test_shared_counters_round_trip():
+    counters = SharedCounters(2)
+    try:
+        latency_histogram = LatencyHistogram()
+        latency_histogram.record(0.1, 7)
+        counters.write(1, 5, 2, 0.5, latency_histogram)
+
+        attached = pickle.loads(pickle.dumps(counters))
+        assert attached.read(0) == (0.0, 0.0, 0.0, 0.0)
+        assert attached.read(1) == (5.0, 2.0, 0.5, 0.1)
+        assert attached.read_histogram(0).total_count == 0
+        assert attached.read_histogram(1).total_count == 7
+        assert abs(attached.read_histogram(1).percentile(50) - 0.1) < 0.001
+        attached.close()
+    finally:
+        counters.close(unlink=True)
+
+
+def test_sharded_pool_processes_every_message():
+    pool = ShardedSenderPool(make_config(21), 3)
+    try:
+        for shard in pool.shards:
+            shard.start()
+        for shard in pool.shards:
+            shard.join()
+
+        assert not any(shard.is_alive() for shard in pool.shards)
+        assert sum(shard.messages_sent for shard in pool.shards) == 21
+        assert all(shard.messages_sent == 7 for shard in pool.shards)
+        assert sum(shard.messages_failed for shard in pool.shards) == 0
+        assert all(shard.total_processing_time > 0 for shard in pool.shards)
+        assert all(shard.latency_histogram.total_count == 7 for shard in pool.shards)
+    finally:
+        pool.close()
+
+
+def test_sharded_pool_divides_rate_limits():
+    config = make_config(20)
+    config['rate_limits'] = {'rate': 20, 'burst': 8, 'carriers': {'acme': {'prefixes': ['201'], 'rate': 50}}}
+
+    pool = ShardedSenderPool(config, 4)
+    try:
+        worker_config = pool.shards[0].process._args[0]
+        assert worker_config['rate_limits']['rate'] == 5
+        assert worker_config['rate_limits']['burst'] == 2
+        assert worker_config['rate_limits']['carriers']['acme'] == {'prefixes': ['201'], 'rate': 12.5}
+        assert config['rate_limits']['rate'] == 20
+    finally:
+        pool.close()
@@ -0,0 +1,109 @@
+import os
+import queue
+import signal
+import threading
+
+from sms_alert_forge.__main__ import main
+from sms_alert_forge.pipeline import build_pipeline
+from sms_alert_forge.producer import Message, MessageProducer, generate_batches
+from sms_alert_forge.queues import WatermarkQueue
+from sms_alert_forge.retry import RetryScheduler
+from sms_alert_forge.shutdown import GracefulShutdown, collect_unsent, read_checkpoint, write_checkpoint
+
+
+def make_config(tmp_path, num_messages=300, drain_timeout=0.1):
+    return {
+        'logging': {'level': 'WARNING'},
+        'messages': {'num_messages': num_messages, 'batch_size': 20, 'rate': 500},
+        'senders': {'num_senders': 2, 'failure_rate': 0.0, 'mean_processing_time': 0.01},
+        'progress_monitor': {'update_interval': 0.05, 'refresh_interval': 0.2},
+        'shutdown': {'drain_timeout': drain_timeout, 'checkpoint_path': str(tmp_path / 'checkpoint.bin')},
+    }
+
+
+def test_checkpoint_round_trip(tmp_path):
+    messages = [Message(15550001, 'Disk full', 'critical', 12.5, 2), Message(15550002, 'Café closed'),
+                Message(15550003, 'Backup done', 'bulk')]
+    path = str(tmp_path / 'checkpoint.bin')
+
+    write_checkpoint(path, messages, {'messages_produced': 10, 'messages_sent': 7, 'messages_failed': 0})
+    restored, counters = read_checkpoint(path)
+
+    assert counters == {'messages_produced': 10, 'messages_sent': 7, 'messages_failed': 0}
+    assert [message[:3] + (message.attempts,) for message in restored] == [
+        (15550001, 'Disk full', 'critical', 2), (15550002, 'Café closed', None, 0),
+        (15550003, 'Backup done', 'bulk', 0)]
+    assert not os.path.exists(path + '.tmp')
+
+
+def test_collect_unsent_takes_queue_and_pending_retries():
+    message_queue = queue.Queue()
+    message_queue.put(Message(1, 'One'))
+    for batch in generate_batches(3):
+        message_queue.put(batch)
+    message_queue.put(None)
+    retry_scheduler = RetryScheduler(message_queue, threading.Event(), 0, base_delay=60)
+    retry_scheduler.schedule(Message(2, 'Two'))
+
+    messages = collect_unsent(message_queue, retry_scheduler)
+
+    assert len(messages) == 5
+    assert messages[-1][:2] == (2, 'Two') and messages[-1].attempts == 1
+    assert retry_scheduler.pending == 0
+
+
+def test_stopped_producer_counts_only_enqueued_messages():
+    stop_event = threading.Event()
+    message_queue = WatermarkQueue(10, 5, stop_event)
+    producer = MessageProducer(100, message_queue, stop_event, 1, batch_size=50)
+    producer.start()
+
+    threading.Event().wait(0.1)
+    stop_event.set()
+    producer.join()
+
+    assert producer.messages_produced == 10
+    assert len(collect_unsent(message_queue)) == producer.messages_produced
+
+
+def test_graceful_shutdown_drains_queued_messages(tmp_path):
+    stop_event = threading.Event()
+    config = make_config(tmp_path, drain_timeout=5.0)
+    message_queue, producer, senders, _, _ = build_pipeline(config, stop_event)
+    shutdown = GracefulShutdown(stop_event, producer, senders, drain_timeout=5.0)
+    producer.start()
+    for sender in senders:
+        sender.start()
+
+    threading.Event().wait(0.2)
+    shutdown.request()
+    producer.join()
+    for sender in senders:
+        sender.join()
+
+    assert producer.messages_produced < 300
+    assert sum(sender.messages_sent for sender in senders) == producer.messages_produced
+    assert not shutdown.timed_out
+    assert not stop_event.is_set()
+    assert collect_unsent(message_queue) == []
+
+
+def test_interrupted_run_resumes_from_checkpoint(tmp_path):
+    config = make_config(tmp_path)
+    path = config['shutdown']['checkpoint_path']
+
+    threading.Timer(0.2, os.kill, (os.getpid(), signal.SIGINT)).start()
+    first = main(None, config)
+
+    checkpoint = first['checkpoint']
+    assert os.path.exists(path)
+    assert not checkpoint['drained']
+    assert checkpoint['unsent'] > 0
+    assert checkpoint['messages_sent'] + checkpoint['unsent'] == checkpoint['messages_produced']
+    assert first['messages_sent'] == checkpoint['messages_sent']
+
+    second = main(None, config, resume=True)
+
+    assert second['resumed']['messages_produced'] == checkpoint['messages_produced']
+    assert first['messages_sent'] + second['messages_sent'] == 300
+    assert not os.path.exists(path)
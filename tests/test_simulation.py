@@ -0,0 +1,53 @@
+from sms_alert_forge.simulation import DiscreteEventSimulation
+
+
+def test_simulation_is_deterministic_for_a_seed():
+    first = DiscreteEventSimulation(1000, 5, 0.3, 0.2, seed=7).run()
+    second = DiscreteEventSimulation(1000, 5, 0.3, 0.2, seed=7).run()
+    other = DiscreteEventSimulation(1000, 5, 0.3, 0.2, seed=8).run()
+
+    first.pop('wall_time')
+    second.pop('wall_time')
+    other.pop('wall_time')
+    assert first == second
+    assert first != other
+
+
+def test_simulation_report_fields():
+    sms_report = DiscreteEventSimulation(100000, 5, 0.3, 0.2, seed=1).run()
+
+    assert sms_report['messages_sent'] + sms_report['messages_failed'] == 100000
+    assert 0.25 < sms_report['messages_failed'] / 100000 < 0.35
+    assert abs(sms_report['average_time_per_message'] - 0.2) < 0.01
+    # 100k messages at 0.2s over 5 senders take about 4000 simulated seconds
+    assert 3900 < sms_report['elapsed_time'] < 4100
+    assert sms_report['latency_p50'] < sms_report['latency_p99'] <= sms_report['latency_max']
+    assert sms_report['wall_time'] < 30
+
+
+def test_simulation_with_rate_has_no_queue_wait_below_capacity():
+    sms_report = DiscreteEventSimulation(1000, 5, 0.0, 0.2, rate=10, seed=3).run()
+
+    assert sms_report['messages_sent'] == 1000
+    assert sms_report['mean_queue_wait'] == 0
+    assert 99.9 < sms_report['elapsed_time'] < 100.5
+
+
+def test_simulation_no_messages():
+    sms_report = DiscreteEventSimulation(0, 3, 0.2, 0.1, seed=1).run()
+
+    assert sms_report['messages_sent'] == 0
+    assert sms_report['messages_failed'] == 0
+    assert sms_report['elapsed_time'] == 0
+
+
+def test_simulated_engine_through_main():
+    from sms_alert_forge.__main__ import main, read_config
+
+    config = read_config('tests/conf/config.yaml')
+    config['senders']['engine'] = 'simulated'
+    config['simulation'] = {'seed': 5}
+
+    sms_report = main(None, config)
+
+    assert sms_report['messages_sent'] + sms_report['messages_failed'] == config['messages']['num_messages']
@@ -1,13 +1,15 @@
 import glob
 import os
 import signal
+import subprocess
+import sys
 import threading
 import time
 import warnings
 
 import pytest
 from unittest.mock import patch
-from sms_alert_forge.__main__ import read_config, main, setup_logging
+from sms_alert_forge.__main__ import cli, read_config, main, setup_logging
 
 config_file_path = 'tests/conf/config.yaml'
 
@@ -38,8 +40,10 @@ def get_latest_log_file():
 
 
 def clean_logs_directory():
-    # Remove all files in the 'logs' directory
+    # Remove all files in the 'logs' directory, which only exists once a run has logged to a file
     log_dir = 'logs'
+    if not os.path.isdir(log_dir):
+        return
     for file in os.listdir(log_dir):
         file_path = os.path.join(log_dir, file)
         try:
@@ -99,6 +103,32 @@ def test_invalid_config():
         run_main()
 
 
+def test_e2e_reports_startup_timings():
+    generate_and_save_config_file(5, 2, 0.0, 0.01, 0.05)
+    sms_report = run_main()
+
+    assert 0 < sms_report['startup_time'] <= sms_report['time_to_first_message']
+
+
+def test_headless_cli():
+    generate_and_save_config_file(5, 2, 0.0, 0.01, 0.05)
+
+    assert cli(['--config', config_file_path, '--headless']) == 0
+    assert get_latest_log_file(), "No log file found in the 'logs' directory."
+
+
+def test_import_has_no_side_effects(tmp_path):
+    # A fresh interpreter, so modules imported by other tests do not count
+    code = ("import sys, sms_alert_forge.__main__; "
+            "print(sorted(name for name in ('curses', 'yaml', 'asyncio', 'http.server') if name in sys.modules))")
+    env = dict(os.environ, PYTHONPATH=os.getcwd())
+    output = subprocess.run([sys.executable, '-c', code], cwd=tmp_path, env=env, capture_output=True, text=True,
+                            check=True).stdout
+
+    assert output.strip() == '[]'
+    assert not os.path.exists(tmp_path / 'logs')
+
+
 def test_e2e_failure_zero_messages():
     generate_and_save_config_file(0, 3, 0.2, 0.1, 0.1)
     run_main()
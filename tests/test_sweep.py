@@ -0,0 +1,57 @@
+import csv
+import json
+
+import pytest
+
+from sms_alert_forge.bench import expand_grid
+from sms_alert_forge.sweep import SWEEP_PARAMETERS, parse_values, run_sweep, write_table
+
+
+def make_config():
+    return {
+        'logging': {'level': 'WARNING'},
+        'messages': {'num_messages': 20, 'batch_size': 10},
+        'senders': {'num_senders': 2, 'failure_rate': 0.0, 'mean_processing_time': 0.001},
+        'progress_monitor': {'update_interval': 0.01},
+    }
+
+
+def test_parse_values():
+    assert parse_values('1,4,16', int) == [1, 4, 16]
+    assert parse_values('1:64:x2', int) == [1, 2, 4, 8, 16, 32, 64]
+    assert parse_values('2:10:3', int) == [2, 5, 8]
+    assert parse_values('0:0.3:0.1', float) == [0.0, 0.1, 0.2, 0.3]
+    with pytest.raises(ValueError):
+        parse_values('1:10:x1', int)
+
+
+def test_sweep_runs_every_point_and_writes_table(tmp_path):
+    grid = {'num_senders': [1, 2], 'num_messages': [10, 30], 'update_interval': [0.01]}
+    points = expand_grid(make_config(), grid, SWEEP_PARAMETERS)
+
+    results = run_sweep(points, processes=2)
+
+    assert [entry['parameters'] for entry in results] == [parameters for parameters, _ in points]
+    assert [entry['metrics']['messages_sent'] for entry in results] == [10, 30, 10, 30]
+
+    write_table(results, str(tmp_path / 'sweep.csv'))
+    with open(tmp_path / 'sweep.csv', newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == 4
+    assert list(rows[0])[:5] == ['num_senders', 'num_messages', 'update_interval', 'messages_sent', 'messages_failed']
+    assert float(rows[3]['messages_per_second']) > 0
+    assert 'latency_p99' in rows[0]
+
+    write_table(results, str(tmp_path / 'sweep.json'))
+    with open(tmp_path / 'sweep.json') as f:
+        table = json.load(f)
+    assert table['rows'][1]['num_messages'] == 30
+
+
+def test_sweep_reports_failed_points():
+    config = make_config()
+    config['senders']['engine'] = 'unknown'
+
+    results = run_sweep([({'engine': 'unknown'}, config)])
+
+    assert 'error' in results[0]['metrics']
@@ -0,0 +1,84 @@
+import csv
+import queue
+import threading
+import time
+
+from sms_alert_forge.__main__ import main
+from sms_alert_forge.producer import Message, generate_batches
+from sms_alert_forge.sender import MessageSender
+from sms_alert_forge.tracing import FAILED, RETRIED, SENT, LatencyTrace, breakdown, write_trace
+
+
+def test_trace_grows_past_its_capacity():
+    trace = LatencyTrace(capacity=2)
+    trace.record([1.0], 1.5, 2.0, [SENT])
+    trace.record([1.0, 1.25], 3.0, 3.5, [FAILED, RETRIED], [0, 3])
+
+    assert trace.count == 3 and trace.capacity >= 3
+    columns = trace.columns()
+    assert list(columns['dequeued']) == [1.5, 3.0, 3.0]
+    assert list(columns['outcome']) == [SENT, FAILED, RETRIED]
+    assert list(columns['attempts']) == [0, 0, 3]
+
+    report = breakdown([trace])
+    assert report['messages'] == 3
+    assert report['queue_wait_mean'] == (0.5 + 2.0 + 1.75) / 3
+    assert report['service_time_mean'] == 0.5
+    assert (report['sent'], report['failed'], report['retried']) == (1, 1, 1)
+
+
+def test_sender_traces_queue_wait_and_service_time():
+    message_queue = queue.Queue()
+    created_at = time.monotonic()
+    for i in range(10):
+        message_queue.put(Message(i, f"Message {i}", None, created_at))
+    for batch in generate_batches(20):
+        message_queue.put(batch)
+    message_queue.put(None)
+
+    sender = MessageSender(message_queue, 0.0, 0.005, threading.Event(), batch_size=5, trace_capacity=4)
+    sender.start()
+    sender.join()
+
+    assert sender.trace.count == 30
+    report = breakdown([sender.trace])
+    assert report['sent'] == 30
+    assert report['service_time_p50'] >= 0.004
+    # Later batches wait for the earlier ones to be sent
+    assert report['queue_wait_max'] > report['queue_wait_p50'] > 0
+
+
+def test_write_trace_exports_csv_and_falls_back_from_parquet(tmp_path):
+    trace = LatencyTrace()
+    trace.record([10.0, 10.5], 11.0, 11.25, [SENT, FAILED])
+
+    path = write_trace([trace], str(tmp_path / 'trace.csv'))
+    with open(path) as f:
+        rows = list(csv.DictReader(f))
+    assert [(float(row['enqueued']), float(row['queue_wait']), row['outcome']) for row in rows] == [
+        (0.0, 1.0, 'sent'), (0.5, 0.5, 'failed')]
+    assert float(rows[0]['service_time']) == 0.25
+
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        assert write_trace([trace], str(tmp_path / 'trace.parquet')).endswith('trace.csv')
+
+
+def test_e2e_reports_latency_breakdown(tmp_path):
+    config = {
+        'logging': {'level': 'WARNING'},
+        'messages': {'num_messages': 200, 'batch_size': 50},
+        'senders': {'num_senders': 2, 'failure_rate': 0.1, 'mean_processing_time': 0.002},
+        'progress_monitor': {'update_interval': 0.05},
+        'tracing': {'enabled': True, 'path': str(tmp_path / 'trace.csv')},
+    }
+
+    sms_report = main(None, config)
+
+    latency_breakdown = sms_report['latency_breakdown']
+    assert latency_breakdown['messages'] == 200
+    assert latency_breakdown['sent'] == sms_report['messages_sent']
+    assert latency_breakdown['queue_wait_share'] > 0.5
+    with open(latency_breakdown['path']) as f:
+        assert sum(1 for _ in f) == 201
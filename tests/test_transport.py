@@ -0,0 +1,104 @@
+import queue
+import threading
+
+import pytest
+
+from sms_alert_forge.gateway import GatewayServer
+from sms_alert_forge.pipeline import build_transport
+from sms_alert_forge.producer import Message, generate_batches
+from sms_alert_forge.sender import MessageSender
+from sms_alert_forge.transport import HttpTransport
+
+
+@pytest.fixture
+def gateway():
+    server = GatewayServer(latency=0.002).start()
+    yield server
+    server.stop()
+
+
+def run_senders(transport, messages, num_senders=1, batch_size=1):
+    message_queue = queue.Queue()
+    for message in messages:
+        message_queue.put(message)
+    for _ in range(num_senders):
+        message_queue.put(None)
+    senders = [MessageSender(message_queue, 0.0, 0.0, threading.Event(), batch_size=batch_size, transport=transport)
+               for _ in range(num_senders)]
+    for sender in senders:
+        sender.start()
+    for sender in senders:
+        sender.join()
+    return senders
+
+
+def test_transport_reuses_connections(gateway):
+    transport = HttpTransport(gateway.url, pool_size=2)
+    senders = run_senders(transport, [Message(i, f"Message {i}") for i in range(40)], num_senders=2)
+    transport.close()
+
+    assert sum(sender.messages_sent for sender in senders) == 40
+    assert gateway.messages_received == 40
+    stats = transport.stats()
+    assert stats['requests'] == 40
+    assert stats['request_errors'] == 0
+    assert stats['connections_opened'] <= 2
+    assert stats['connection_reuse'] >= 0.9
+    assert stats['request_latency_max'] > 0
+
+
+def test_transport_batches_messages_into_one_request(gateway):
+    transport = HttpTransport(gateway.url)
+    senders = run_senders(transport, [Message(i, f"Message {i}") for i in range(20)], batch_size=10)
+    transport.close()
+
+    assert senders[0].messages_sent == 20
+    assert gateway.requests == 2
+
+
+def test_transport_sends_columnar_batches(gateway):
+    transport = HttpTransport(gateway.url)
+    senders = run_senders(transport, generate_batches(30), batch_size=10)
+    transport.close()
+
+    assert senders[0].messages_sent == 30
+    assert gateway.requests == 3
+
+
+def test_transport_reports_gateway_failures():
+    server = GatewayServer(latency=0.001, error_rate=1.0).start()
+    transport = HttpTransport(server.url)
+    assert transport.send([Message(1, 'Hello'), Message(2, 'World')]) == [False, False]
+    server.stop()
+
+    server = GatewayServer(latency=0.001, http_error_rate=1.0).start()
+    transport = HttpTransport(server.url)
+    assert transport.send([Message(1, 'Hello')]) == [False]
+    assert transport.stats()['request_errors'] == 1
+    server.stop()
+
+
+def test_transport_measures_pool_wait(gateway):
+    transport = HttpTransport(gateway.url, pool_size=1)
+    run_senders(transport, [Message(i, f"Message {i}") for i in range(20)], num_senders=4)
+    transport.close()
+
+    stats = transport.stats()
+    assert stats['connections_opened'] == 1
+    assert stats['pool_wait_time'] > 0
+    assert stats['max_pool_wait'] >= stats['mean_pool_wait'] > 0
+
+
+def test_build_transport_starts_local_gateway():
+    config = {'senders': {'mean_processing_time': 0.001, 'failure_rate': 0.0},
+              'transport': {'type': 'http', 'local_gateway': True, 'pool_size': 3}}
+    transport = build_transport(config)
+    try:
+        assert transport.pool_size == 3
+        assert transport.send([Message(1, 'Hello')]) == [True]
+    finally:
+        transport.close()
+
+    assert build_transport({'senders': {}}) is None
+    with pytest.raises(ValueError):
+        build_transport({'senders': {}, 'transport': {'type': 'smpp'}})